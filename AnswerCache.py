@@ -0,0 +1,208 @@
+import os  # Import os for file path handling.
+import re  # Import re to find time-dependent answers.
+import time  # Import time for expiry and LRU bookkeeping.
+import sqlite3  # Import sqlite3 for a persistent cache shared by every process.
+import datetime  # Import datetime to recognize answers that mention the current date.
+import threading  # Import threading to guard the index and the database.
+from Startup import Lazy  # Import the lazy import helper.
+from Vectorizer import HashingVectorizer, Tokenize  # Import the shared hashing TF-IDF vectorizer.
+from IntentClassifier import LabelledCorpus, FollowUpWords  # Import the sample questions and follow-up pronouns.
+import Tracing  # Import tracing to count hits and misses.
+
+# numpy is loaded when the index is first built.
+np = Lazy("numpy")
+
+# Database file holding the cached answers.
+AnswerCachePath = os.path.join("Data", "AnswerCache.sqlite")
+
+# Smallest cosine similarity between two questions for one to be answered with the other's answer.
+DefaultThreshold = 0.9
+
+# Maximum number of cached answers, and how long an answer is kept, in seconds.
+DefaultMaxEntries = 1000
+DefaultTTL = 30 * 24 * 3600
+
+# Size of the hashed question vectors; small, since questions are short.
+VectorFeatures = 2 ** 12
+
+# Words that make a question depend on the moment it is asked.
+TimeWords = {"time", "date", "day", "today", "today's", "tonight", "tomorrow", "yesterday", "now", "current", "currently",
+             "week", "weekend", "month", "year", "latest", "recent", "recently", "news", "weather", "score", "price"}
+
+# Words that make a question depend on the conversation or on the user.
+ContextWords = FollowUpWords | {"my", "mine", "our", "us", "we", "again", "earlier", "before", "previous", "previously",
+                                "last", "above", "said", "remember", "else"}
+
+# Words asking for something new every time, which a cached answer would repeat.
+VariedWords = {"joke", "jokes", "story", "poem", "riddle", "random", "another", "suggest", "surprise"}
+
+# Openings of follow-up questions.
+FollowUpOpenings = ("tell me more", "what about", "how about", "and ", "also ", "why not", "go on", "continue", "explain more")
+
+# Pattern matching a clock time or a spelled-out time in an answer.
+ClockPattern = re.compile(r"\b\d{1,2}:\d{2}\b|\bhours?\b.*\bminutes?\b", re.IGNORECASE)
+
+# Function to decide whether the answer to a question can be reused for other users and later turns.
+def CacheableQuestion(question):
+    lowered = " ".join(question.lower().split())
+    words = set(Tokenize(lowered))
+    return bool(words) and not (words & TimeWords or words & ContextWords or words & VariedWords or lowered.startswith(FollowUpOpenings))
+
+# Function to decide whether an answer can be reused, which it cannot if it mentions the current time or date.
+def CacheableAnswer(answer):
+    if len(answer.strip()) < 20 or ClockPattern.search(answer):
+        return False
+    now = datetime.datetime.now()
+    words = set(Tokenize(answer))
+    return not ({now.strftime("%A").lower(), now.strftime("%B").lower(), str(now.year)} & words)
+
+# Function to get the numbers of a question, which must match exactly for a cached answer to be used.
+def Numbers(question):
+    return {word for word in Tokenize(question) if any(c.isdigit() for c in word)}
+
+# Function to check that the words two questions share come in the same order.
+# The vectors barely see word order, yet "celsius to fahrenheit" and "fahrenheit to celsius" are different questions.
+def SameOrder(first, second):
+    first, second = list(dict.fromkeys(Tokenize(first))), list(dict.fromkeys(Tokenize(second)))
+    shared = set(first) & set(second)
+    return [word for word in first if word in shared] == [word for word in second if word in shared]
+
+
+# Persistent cache of chatbot answers, looked up by question similarity.
+#
+# Questions are turned into hashed TF-IDF vectors; a question whose nearest
+# cached question is at least `threshold` similar, has the same numbers and
+# the same word order gets that question's answer. Questions and answers that
+# depend on the time or the conversation are never stored. Entries expire after `ttl` seconds,
+# the least recently used are evicted beyond `max_entries`, and answers made
+# with another model or system prompt (another `version`) are dropped.
+class AnswerCache:
+
+    def __init__(self, path=AnswerCachePath, version="", threshold=DefaultThreshold, max_entries=DefaultMaxEntries, ttl=DefaultTTL):
+        self.path = path
+        self.version = version
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.vectorizer = None
+        self.ids = []
+        self.questions = []
+        self.vectors = None
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "evicted": 0, "expired": 0, "invalidated": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS answers (id INTEGER PRIMARY KEY, question TEXT NOT NULL, answer TEXT NOT NULL, version TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+
+    # Function to build the vector index on first use, dropping answers of other versions and expired ones. Call with the lock held.
+    def _Index(self):
+        if self.vectorizer is not None:
+            return
+        self.stats["invalidated"] += self.db.execute("DELETE FROM answers WHERE version != ?", (self.version,)).rowcount
+        self.stats["expired"] += self.db.execute("DELETE FROM answers WHERE created < ?", (time.time() - self.ttl,)).rowcount
+        rows = self.db.execute("SELECT id, question FROM answers").fetchall()
+        self.ids = [row[0] for row in rows]
+        self.questions = [row[1] for row in rows]
+
+        # Word weights are learned from the cached questions and the sample questions of the intent classifier.
+        self.vectorizer = HashingVectorizer(VectorFeatures).Fit(self.questions + [text for text, _ in LabelledCorpus])
+        self.vectors = self.vectorizer.Transform(self.questions) if rows else np.zeros((0, VectorFeatures), dtype=np.float32)
+
+    # Function to remove entries from the database and the index. Call with the lock held.
+    def _Remove(self, ids):
+        ids = set(ids)
+        if not ids:
+            return
+        self.db.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in ids])
+        keep = [position for position, i in enumerate(self.ids) if i not in ids]
+        self.ids = [self.ids[position] for position in keep]
+        self.questions = [self.questions[position] for position in keep]
+        self.vectors = self.vectors[keep]
+
+    # Function to find the cached question that answers a question, returning its position or None. Call with the lock held.
+    def _Match(self, question, threshold=None):
+        self._Index()
+        if not self.ids:
+            return None
+        similarity = self.vectors @ self.vectorizer.Transform([question])[0]
+        position = int(similarity.argmax())
+        # Questions that differ only in a number, like "what is 2 + 2" and "what is 3 + 2", or only in
+        # word order are different questions.
+        cached = self.questions[position]
+        if similarity[position] < (threshold or self.threshold) or Numbers(question) != Numbers(cached) or not SameOrder(question, cached):
+            return None
+        return position
+
+    # Function to look up the answer to a question, returning None on a miss.
+    def Get(self, question):
+        if not CacheableQuestion(question):
+            self.stats["bypassed"] += 1
+            Tracing.Count("answer_cache", result="bypassed")
+            return None
+
+        now = time.time()
+        answer = None
+        with self.lock:
+            position = self._Match(question)
+            if position is not None:
+                entry = self.ids[position]
+                row = self.db.execute("SELECT answer, created FROM answers WHERE id = ?", (entry,)).fetchone()
+                if row is None or row[1] < now - self.ttl:
+                    self.stats["expired"] += row is not None
+                    self._Remove([entry])
+                else:
+                    self.db.execute("UPDATE answers SET last_used = ?, hits = hits + 1 WHERE id = ?", (now, entry))
+                    answer = row[0]
+            self.stats["hits" if answer is not None else "misses"] += 1
+        Tracing.Count("answer_cache", result="hit" if answer is not None else "miss")
+        return answer
+
+    # Function to store the answer to a question, returning whether it was stored.
+    def Put(self, question, answer):
+        if not (CacheableQuestion(question) and CacheableAnswer(answer)):
+            return False
+        now = time.time()
+        with self.lock:
+            # A new answer to the same question replaces the old one.
+            position = self._Match(question, 0.999)
+            if position is not None:
+                self._Remove([self.ids[position]])
+            entry = self.db.execute("INSERT INTO answers (question, answer, version, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                                    (question, answer, self.version, now, now)).lastrowid
+            self.ids.append(entry)
+            self.questions.append(question)
+            self.vectors = np.vstack([self.vectors, self.vectorizer.Transform([question])])
+            self.stats["stored"] += 1
+
+            # Evict the least recently used answers beyond the limit.
+            excess = len(self.ids) - self.max_entries
+            if excess > 0:
+                oldest = [row[0] for row in self.db.execute("SELECT id FROM answers ORDER BY last_used LIMIT ?", (excess,))]
+                self._Remove(oldest)
+                self.stats["evicted"] += len(oldest)
+        return True
+
+    # Function to drop the cached answer that a question would get, for example after a wrong answer was reported.
+    def Invalidate(self, question):
+        with self.lock:
+            position = self._Match(question)
+            if position is None:
+                return False
+            self._Remove([self.ids[position]])
+            self.stats["invalidated"] += 1
+        return True
+
+    # Function to remove every cached answer.
+    def Clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM answers")
+            self.vectorizer = None
+
+    # Function to report cache statistics.
+    def Report(self):
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(self.stats, entries=entries, hit_rate=self.stats["hits"] / lookups if lookups else 0.0)
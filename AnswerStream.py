@@ -0,0 +1,106 @@
+import re  # Import re to find sentence boundaries.
+import asyncio  # Import asyncio for the asynchronous streaming wrapper.
+import threading  # Import threading to run blocking streams off the event loop.
+import contextvars  # Import contextvars so the stream thread stays in the caller's trace.
+
+# Tokens the models sometimes emit that must never reach the user.
+UnwantedTokens = ["</s>"]
+
+# Pattern matching a finished sentence: text up to . ! ? followed by whitespace, or up to a newline.
+SentenceEnd = re.compile(r"(.*?(?:[.!?]+(?=\s)|\n))", re.S)
+
+
+# Incremental splitter that turns streamed text into complete sentences.
+class SentenceSplitter:
+
+    def __init__(self):
+        self.buffer = ""
+
+    # Function to add streamed text and get the sentences it completed.
+    def Feed(self, text):
+        self.buffer += text
+        sentences = []
+        while True:
+            match = SentenceEnd.match(self.buffer)
+            if not match:
+                break
+            sentence = match.group(1).strip()
+            self.buffer = self.buffer[match.end():]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    # Function to get whatever is left once the stream has ended.
+    def Flush(self):
+        sentence = self.buffer.strip()
+        self.buffer = ""
+        return [sentence] if sentence else []
+
+
+# Function to remove unwanted tokens from streamed text.
+# Text that could be the beginning of an unwanted token is held back until the next delta.
+def _CleanDelta(pending):
+    for token in UnwantedTokens:
+        pending = pending.replace(token, "")
+    hold = 0
+    for token in UnwantedTokens:
+        for size in range(len(token) - 1, 0, -1):
+            if pending.endswith(token[:size]):
+                hold = max(hold, size)
+                break
+    if hold:
+        return pending[:-hold], pending[-hold:]
+    return pending, ""
+
+# Function to turn a streamed chat completion into ("delta", text) and ("sentence", text) events.
+def StreamAnswer(completion):
+    splitter = SentenceSplitter()
+    pending = ""
+
+    for chunk in completion:
+        if not (chunk.choices and chunk.choices[0].delta.content):
+            continue
+        delta, pending = _CleanDelta(pending + chunk.choices[0].delta.content)
+        if delta:
+            yield "delta", delta
+            for sentence in splitter.Feed(delta):
+                yield "sentence", sentence
+
+    # Whatever was held back can no longer be part of an unwanted token.
+    if pending:
+        yield "delta", pending
+        splitter.Feed(pending)
+    for sentence in splitter.Flush():
+        yield "sentence", sentence
+
+# Function to run a blocking event generator in a thread and relay its events asynchronously.
+async def AsyncStream(generator_function, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def Produce():
+        try:
+            for event in generator_function(*args, **kwargs):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    # Executor threads do not inherit context variables, so run in a copy of the caller's context.
+    producer = loop.run_in_executor(None, contextvars.copy_context().run, Produce)
+    try:
+        while True:
+            event = await queue.get()
+            if event is finished:
+                break
+            if isinstance(event, BaseException):
+                raise event
+            yield event
+    finally:
+        # Tell the producer to stop early if the consumer went away.
+        stop.set()
+        await asyncio.shield(producer)
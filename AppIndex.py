@@ -0,0 +1,244 @@
+import os  # Import os for file path handling.
+import re  # Import re to clean up names and desktop entry commands.
+import sys  # Import sys to pick the platform's application folders.
+import json  # Import json to persist learned resolutions.
+import glob  # Import glob to find application entries.
+import time  # Import time for the background refresh.
+import shlex  # Import shlex to split desktop entry commands.
+import threading  # Import threading for the background refresh.
+import subprocess  # Import subprocess to launch desktop entries.
+from webbrowser import open as webopen  # Import web browser functionality.
+
+# File holding resolutions learned from earlier searches.
+LearnedPath = os.path.join("Data", "AppIndex.json")
+
+# Seconds between background rescans of the application folders.
+RefreshInterval = 300
+
+# Smallest trigram similarity accepted as a fuzzy match, for names and for each of their words.
+MatchThreshold = 0.8
+
+# Curated map of commonly opened websites.
+SiteMap = {
+    "youtube": "https://www.youtube.com", "google": "https://www.google.com", "gmail": "https://mail.google.com",
+    "google drive": "https://drive.google.com", "google maps": "https://maps.google.com", "facebook": "https://www.facebook.com",
+    "instagram": "https://www.instagram.com", "twitter": "https://x.com", "x": "https://x.com", "linkedin": "https://www.linkedin.com",
+    "reddit": "https://www.reddit.com", "github": "https://github.com", "stack overflow": "https://stackoverflow.com",
+    "wikipedia": "https://www.wikipedia.org", "amazon": "https://www.amazon.com", "flipkart": "https://www.flipkart.com",
+    "netflix": "https://www.netflix.com", "spotify": "https://open.spotify.com", "whatsapp": "https://web.whatsapp.com",
+    "telegram": "https://web.telegram.org", "chatgpt": "https://chatgpt.com", "outlook": "https://outlook.live.com",
+    "canva": "https://www.canva.com", "pinterest": "https://www.pinterest.com", "quora": "https://www.quora.com",
+}
+
+# Function to normalize an application or site name for lookups.
+def NormalizeName(name):
+    return " ".join(re.findall(r"[a-z0-9+#]+", name.lower()))
+
+# Function to split a name into the character trigrams used for fuzzy matching.
+def Trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Function to get the Dice similarity of two trigram sets.
+def Dice(first, second):
+    return 2 * len(first & second) / (len(first) + len(second)) if first or second else 0.0
+
+# Function to check that every word of a query matches a word of a name, so "google chrome" never opens "google".
+def WordsMatch(query, name):
+    words = [Trigrams(word) for word in name.split()]
+    return all(any(Dice(Trigrams(word), candidate) >= MatchThreshold for candidate in words) for word in query.split())
+
+# Function to list the folders that hold application entries on this platform.
+def ApplicationFolders():
+    if sys.platform == "win32":
+        return [os.path.join(os.environ.get(base, ""), "Microsoft", "Windows", "Start Menu", "Programs")
+                for base in ("ProgramData", "APPDATA") if os.environ.get(base)]
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    data_dirs = (os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share").split(":")
+    return [os.path.join(folder, "applications") for folder in [data_home] + data_dirs]
+
+# Function to read the name and command of a desktop entry, returning None for hidden entries.
+def ReadDesktopEntry(path):
+    fields = {}
+    section = None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("["):
+                section = line
+            elif section == "[Desktop Entry]" and "=" in line:
+                key, value = line.split("=", 1)
+                fields.setdefault(key.strip(), value.strip())
+    if fields.get("NoDisplay") == "true" or fields.get("Hidden") == "true" or "Exec" not in fields:
+        return None
+    # Field codes such as %U are filled in by launchers with files to open; none are passed here.
+    command = re.sub(r"\s*%[a-zA-Z]", "", fields["Exec"])
+    return {"name": fields.get("Name") or os.path.splitext(os.path.basename(path))[0], "kind": "command", "target": command}
+
+# Function to read one application entry of either platform.
+def ReadEntry(path):
+    if path.endswith(".desktop"):
+        return ReadDesktopEntry(path)
+    return {"name": os.path.splitext(os.path.basename(path))[0], "kind": "file", "target": path}
+
+
+# Index resolving app and website names to something that can be opened.
+#
+# It combines installed applications, the curated site map and resolutions
+# learned from earlier searches. Exact names are a dictionary lookup; other
+# names are matched on character trigrams. Application folders are rescanned
+# in the background and only entries whose files changed are read again.
+class AppIndex:
+
+    def __init__(self, folders=None, learned_path=LearnedPath, sites=SiteMap):
+        self.folders = folders if folders is not None else ApplicationFolders()
+        self.learned_path = learned_path
+        self.lock = threading.Lock()
+        self.files = {}  # path -> (mtime, entry)
+        self.sites = {NormalizeName(name): {"name": name, "kind": "url", "target": url, "source": "site"} for name, url in sites.items()}
+        self.learned = {}
+        self.entries = {}
+        self.trigrams = {}
+        self.sizes = {}
+        self.refresher = None
+        self.stats = {"exact": 0, "fuzzy": 0, "misses": 0, "learned": 0, "rescanned": 0}
+        if os.path.exists(learned_path):
+            with open(learned_path, encoding="utf-8") as f:
+                self.learned = json.load(f)
+        self.Refresh()
+
+    # Function to rescan the application folders, reading only new or changed entries.
+    def Refresh(self):
+        paths = {}
+        for folder in self.folders:
+            for pattern in ("**/*.desktop", "**/*.lnk", "**/*.url"):
+                for path in glob.glob(os.path.join(folder, pattern), recursive=True):
+                    try:
+                        paths[path] = os.path.getmtime(path)
+                    except OSError:
+                        continue
+
+        files = {}
+        for path, mtime in paths.items():
+            known = self.files.get(path)
+            if known and known[0] == mtime:
+                files[path] = known
+                continue
+            try:
+                files[path] = (mtime, ReadEntry(path))
+                self.stats["rescanned"] += 1
+            except OSError:
+                continue
+
+        with self.lock:
+            self.files = files
+            self._Rebuild()
+
+    # Function to rebuild the lookup tables; learned resolutions win over installed apps, apps over sites.
+    def _Rebuild(self):
+        entries = dict(self.sites)
+        apps = {}
+        for _, entry in self.files.values():
+            if entry:
+                apps.setdefault(NormalizeName(entry["name"]), entry)
+        entries.update(apps)
+        entries.update(self.learned)
+
+        trigrams, sizes = {}, {}
+        for name in entries:
+            sizes[name] = len(Trigrams(name))
+            for trigram in Trigrams(name):
+                trigrams.setdefault(trigram, set()).add(name)
+        self.entries, self.trigrams, self.sizes = entries, trigrams, sizes
+
+    # Function to keep the index fresh in a background thread.
+    def StartRefresh(self, interval=RefreshInterval):
+        if self.refresher is not None:
+            return
+
+        def Loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.Refresh()
+                except Exception as e:
+                    print(f"Error refreshing the app index: {e}")
+
+        self.refresher = threading.Thread(target=Loop, daemon=True)
+        self.refresher.start()
+
+    # Function to find the entry for a name, returning None when nothing is close enough.
+    def Resolve(self, name):
+        key = NormalizeName(name)
+        with self.lock:
+            entries, trigrams, sizes = self.entries, self.trigrams, self.sizes
+        entry = entries.get(key)
+        if entry is not None:
+            self.stats["exact"] += 1
+            return dict(entry, score=1.0)
+
+        # Dice similarity of trigram sets, over names that share at least one trigram.
+        query = Trigrams(key)
+        shared = {}
+        for trigram in query:
+            for candidate in trigrams.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        best, score = None, 0.0
+        for candidate, count in shared.items():
+            similarity = 2 * count / (len(query) + sizes[candidate])
+            if similarity > score and similarity >= MatchThreshold and WordsMatch(key, candidate):
+                best, score = candidate, similarity
+        # A near miss is worse than a search, so anything less close is left to the caller's search.
+        if best is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["fuzzy"] += 1
+        return dict(entries[best], score=score)
+
+    # Function to remember a resolution found by searching, so the search is not repeated.
+    def Learn(self, name, kind, target):
+        key = NormalizeName(name)
+        with self.lock:
+            self.learned[key] = {"name": name, "kind": kind, "target": target}
+            self._Rebuild()
+            learned = dict(self.learned)
+        self.stats["learned"] += 1
+        os.makedirs(os.path.dirname(self.learned_path) or ".", exist_ok=True)
+        with open(self.learned_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(learned, f, indent=1)
+        os.replace(self.learned_path + ".tmp", self.learned_path)
+
+    # Function to report how names were resolved.
+    def Report(self):
+        return dict(self.stats, entries=len(self.entries))
+
+
+# Function to open a resolved entry.
+def Launch(entry):
+    if entry["kind"] == "url":
+        webopen(entry["target"])
+    elif entry["kind"] == "file":
+        if sys.platform == "win32":
+            os.startfile(entry["target"])  # Start menu shortcuts.
+        else:
+            # Other platforms hand the file to their default opener.
+            opener = "open" if sys.platform == "darwin" else "xdg-open"
+            subprocess.Popen([opener, entry["target"]], start_new_session=True,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        subprocess.Popen(shlex.split(entry["target"]), start_new_session=True,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return True
+
+# Shared index, built on first use.
+_index = None
+_index_lock = threading.Lock()
+
+# Function to get the shared index, starting its background refresh.
+def GetAppIndex():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AppIndex()
+            _index.StartRefresh()
+    return _index
@@ -0,0 +1,366 @@
+import sys  # Import sys for the command line client.
+import json  # Import json for the socket protocol.
+import uuid  # Import uuid to name turns.
+import queue  # Import queue to hand sentences to the speech thread.
+import socket  # Import socket for the command line client.
+import asyncio  # Import asyncio for the event loop hosting every subsystem.
+from Startup import Env, PreWarm  # Import the shared settings and the background pre-warm.
+import Tracing  # Import tracing to start a trace for every turn.
+from Session import GetSession, GetSessions  # Import the per-user sessions.
+from LocalAuth import GetToken, ParseRequest  # Import the per-install token that local clients must send.
+
+# Load environment variables from the .env file.
+env_vars = Env()
+
+# Address of the daemon.
+DaemonHost = "127.0.0.1"
+DaemonPort = int(env_vars.get("AssistantPort") or 8771)
+
+# Whether the old file hand-offs (Status.data and ImageGeneration.data) are kept working.
+LegacyFiles = (env_vars.get("LegacyFiles") or "True").lower() == "true"
+
+# Seconds between checks of the legacy image request file.
+LegacyPollInterval = 0.5
+
+# Events kept for a client that reads too slowly before it is disconnected.
+ClientBacklog = 1000
+
+
+# One connected client with its own outgoing queue, so a slow reader never holds up the assistant.
+class _Client:
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.outbox = asyncio.Queue(maxsize=ClientBacklog)
+        self.subscribed = False
+        self.closed = False
+
+    # Function to queue an event, disconnecting the client if it fell too far behind.
+    def Send(self, event):
+        if self.closed or self.writer.is_closing():
+            return
+        try:
+            self.outbox.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+            self.writer.close()
+
+    # Function to write queued events to the socket until the client goes away.
+    async def Pump(self):
+        try:
+            while True:
+                event = await self.outbox.get()
+                self.writer.write((json.dumps(event) + "\n").encode("utf-8"))
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+
+# Long-lived assistant process.
+#
+# Speech recognition, classification, chat, search, automation, image
+# generation and speech are hosted in one asyncio event loop; blocking calls
+# run in the default thread pool and image post-processing in its process
+# pool. Every module, its settings and its clients are loaded once.
+#
+# Clients connect over a local socket and send one JSON object per line, each
+# with the per-install token from LocalAuth as "token"; a connection that
+# sends anything else, such as an HTTP request from a browser, is closed:
+#   {"op": "query", "text": "...", "speak": false, "session": "..."} -> {"id": "...", "status": "accepted"}, then the turn's events
+#   {"op": "speak", "text": "..."}                  -> {"status": "spoken"} once it was said
+#   {"op": "listen", "enabled": true}               -> {"listening": true}, turns then start from the microphone
+#   {"op": "subscribe"}                             -> {"subscribed": true}, then every status and turn event
+#   {"op": "status"}                                -> the current status
+#   {"op": "image.submit" | "image.status" | ...}   -> passed on to the image worker
+# Turns of one session run one after another, turns of different sessions at the same time.
+# Turn events are {"event": "decision" | "delta" | "sentence" | "answer" | "automation" | "image" | "done" | "error", "id": ...}
+# and status changes are {"event": "status", "status": "..."}.
+class AssistantDaemon:
+
+    def __init__(self, legacy_files=LegacyFiles):
+        # Imported here so the command line client does not load the assistant.
+        import Model, Chatbot, RealtimeSearchEngine, Automation, TextToSpeech, SpeechToText, ImageGeneration, SpeculativeSearch
+        self.Model = Model
+        self.speculative = SpeculativeSearch.speculative_search
+        self.Chatbot = Chatbot
+        self.RealtimeSearchEngine = RealtimeSearchEngine
+        self.Automation = Automation
+        self.TextToSpeech = TextToSpeech
+        self.SpeechToText = SpeechToText
+        self.ImageGeneration = ImageGeneration
+
+        self.legacy_files = legacy_files
+        self.images = ImageGeneration.ImageWorker()
+        self.clients = set()
+        self.status = "Available..."
+        self.listening = False
+        self.listener = None
+        self.loop = None
+        self.turn_locks = {}
+        self.active_turns = 0
+        self.background = set()
+        self.speech_lock = None
+        self.token = None
+        self.stats = {"turns": 0, "errors": 0, "clients": 0, "refused": 0}
+
+        # Status changes made anywhere, for example while translating, are pushed to the clients too.
+        SpeechToText.StatusFile = legacy_files
+        SpeechToText.StatusListeners.append(self._StatusChanged)
+
+    # Function to pass a status change from any thread to the event loop.
+    def _StatusChanged(self, status):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._Status, status)
+
+    # Function to remember the status and push it to the subscribed clients.
+    def _Status(self, status):
+        self.status = status
+        self.Broadcast({"event": "status", "status": status})
+
+    # Function to change the status, writing Status.data as well when the legacy files are kept.
+    async def SetStatus(self, status):
+        if self.legacy_files:
+            await asyncio.to_thread(self.SpeechToText.SetAssistantStatus, status)
+        else:
+            self.SpeechToText.SetAssistantStatus(status)
+
+    # Function to start a background task, keeping a reference so it is not garbage collected before it ends.
+    def Spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+        return task
+
+    # Function to send an event to every subscribed client.
+    def Broadcast(self, event):
+        for client in list(self.clients):
+            if client.subscribed:
+                client.Send(event)
+
+    # Function to send a turn event to the client that asked and to the subscribed clients.
+    def Emit(self, client, event):
+        self.Broadcast(event)
+        if client is not None and not client.subscribed:
+            client.Send(event)
+
+    # Function to speak sentences as they arrive on a queue, ending at None.
+    async def _Speaker(self, sentences):
+        async with self.speech_lock:
+            await asyncio.to_thread(self.TextToSpeech.PipelinedTTS, iter(sentences.get, None))
+
+    # Function to stream an answer to the client, speaking its sentences while it is generated.
+    async def _Answer(self, stream, client, turn, task, speak):
+        sentences = queue.Queue()
+        speaker = asyncio.create_task(self._Speaker(sentences)) if speak else None
+        answering = False
+        try:
+            async for kind, text in stream:
+                if kind == "sentence":
+                    if not answering:
+                        answering = True
+                        await self.SetStatus("Answering...")
+                    if speaker:
+                        sentences.put(text)
+                self.Emit(client, {"event": "answer" if kind == "done" else kind, "id": turn, "task": task, "text": text})
+        finally:
+            if speaker:
+                sentences.put(None)
+                await speaker
+
+    # Function to run automation commands, passing each result on as soon as it is ready.
+    async def _Automate(self, commands, client, turn):
+        async for result in self.Automation.TranslateAndExecute(commands):
+            self.Emit(client, {"event": "automation", "id": turn, "result": result})
+
+    # Function to report an image job once it has finished.
+    async def _ImageDone(self, job, client, turn):
+        await self.images.done[job["id"]].wait()
+        self.Emit(client, {"event": "image", "id": turn, "job": dict(job)})
+
+    # Function to run one turn: classify the query, then answer, act and generate.
+    async def Turn(self, text, client=None, speak=True, turn=None, session=None):
+        turn = turn or uuid.uuid4().hex[:12]
+        session = session or GetSession()
+        async with self.turn_locks.setdefault(session.id, asyncio.Lock()):
+            Tracing.StartTrace("turn", source="daemon")
+            self.stats["turns"] += 1
+            self.active_turns += 1
+            try:
+                await self.SetStatus("Thinking...")
+                # The web search for the query starts while it is classified, in case it turns out to be realtime.
+                tasks, prefetch = await self.speculative.Decide(text, session)
+                self.Emit(client, {"event": "decision", "id": turn, "tasks": tasks})
+
+                # Automation and images run in the background while the answer streams.
+                commands = [task for task in tasks if not task.startswith(("general ", "realtime ", "generate image", "exit"))]
+                automation = asyncio.create_task(self._Automate(commands, client, turn)) if commands else None
+                for task in tasks:
+                    if task.startswith("generate image "):
+                        job = self.images.Submit(task.removeprefix("generate image "))
+                        self.Emit(client, {"event": "image", "id": turn, "job": dict(job)})
+                        self.Spawn(self._ImageDone(job, client, turn))
+
+                for task in tasks:
+                    if task.startswith("general "):
+                        stream = self.Chatbot.AsyncStreamChatBot(task.removeprefix("general "), session)
+                    elif task.startswith("realtime "):
+                        await self.SetStatus("Searching...")
+                        if prefetch:
+                            await prefetch  # Wait for the search started during the classification.
+                        stream = self.RealtimeSearchEngine.AsyncStreamRealtimeSearchEngine(task.removeprefix("realtime "), session)
+                    else:
+                        continue
+                    await self._Answer(stream, client, turn, task, speak)
+
+                # Image jobs keep running on the worker; only the automation is waited for.
+                if automation:
+                    await automation
+                self.Emit(client, {"event": "done", "id": turn})
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.Emit(client, {"event": "error", "id": turn, "error": str(e)})
+            finally:
+                # Other sessions may still be answering; the assistant is only available once every turn is done.
+                self.active_turns -= 1
+                if not self.active_turns:
+                    await self.SetStatus("Available...")
+
+    # Function to recognize speech and run a turn for every utterance while listening is on.
+    async def Listen(self):
+        while self.listening:
+            await self.SetStatus("Listening...")
+            text = await asyncio.to_thread(self.SpeechToText.SpeechRecognition)
+            if text is None:
+                break  # The speech source has ended.
+            if self.listening:
+                self.Emit(None, {"event": "heard", "text": text})
+                await self.Turn(text)
+        self.listening = False
+        self.listener = None
+
+    # Function to turn listening on or off.
+    def SetListening(self, enabled):
+        self.listening = enabled
+        if enabled and self.listener is None:
+            self.listener = asyncio.create_task(self.Listen())
+
+    # Function to answer one request from a client.
+    async def Handle(self, request, client):
+        op = request.get("op")
+        if op == "query" and request.get("text"):
+            try:
+                session = GetSession(request.get("session"))
+            except ValueError as e:
+                return {"error": str(e)}
+            turn = uuid.uuid4().hex[:12]
+            self.Spawn(self.Turn(request["text"], client, bool(request.get("speak", False)), turn, session))
+            return {"id": turn, "status": "accepted"}
+        if op == "speak" and request.get("text"):
+            sentences = queue.Queue()
+            for sentence in self.TextToSpeech.SplitSentences(request["text"]) + [None]:
+                sentences.put(sentence)
+            await self._Speaker(sentences)
+            return {"status": "spoken"}
+        if op == "listen":
+            self.SetListening(bool(request.get("enabled", True)))
+            return {"listening": self.listening}
+        if op == "subscribe":
+            client.subscribed = True
+            return {"subscribed": True, "status": self.status}
+        if op == "status":
+            return dict(self.stats, status=self.status, listening=self.listening, clients=len(self.clients),
+                        active_turns=self.active_turns, sessions=GetSessions().Report(), speculation=self.speculative.Report())
+        if op and op.startswith("image."):
+            return await self.images.Handle(dict(request, op=op.removeprefix("image.")))
+        return {"error": "unknown request"}
+
+    # Function to serve one client connection, which may send several requests.
+    async def Serve(self, reader, writer):
+        client = _Client(writer)
+        self.clients.add(client)
+        self.stats["clients"] += 1
+        pump = asyncio.create_task(client.Pump())
+        try:
+            while line := await reader.readline():
+                request, error = ParseRequest(line, self.token)
+                if error:
+                    self.stats["refused"] += 1
+                    client.Send({"error": error})
+                    break
+                client.Send(await self.Handle(request, client))
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(client)
+            # Let the replies and events already queued reach the client before closing.
+            while not client.outbox.empty() and not client.closed and not writer.is_closing():
+                await asyncio.sleep(0.01)
+            pump.cancel()
+            writer.close()
+
+    # Function to keep the old image hand-off working: requests written to ImageGeneration.data are queued as jobs.
+    async def LegacyImageRequests(self):
+        while True:
+            prompt = self.ImageGeneration.ReadLegacyRequest()
+            if prompt:
+                self.images.Submit(prompt)
+            await asyncio.sleep(LegacyPollInterval)
+
+    # Function to start every subsystem and the socket server and run forever.
+    async def Run(self, host=DaemonHost, port=DaemonPort, listen=False):
+        self.loop = asyncio.get_running_loop()
+        self.speech_lock = asyncio.Lock()
+        self.token = GetToken()
+        tasks = self.images.Start()
+        if self.legacy_files:
+            tasks.append(asyncio.create_task(self.LegacyImageRequests()))
+        PreWarm()  # Load the remaining heavy dependencies in the background.
+        self.TextToSpeech.PreWarmSpeech(self.Automation.professional_responses)  # Synthesize the canned phrases.
+        server = await asyncio.start_server(self.Serve, host, port)
+        self.SetListening(listen)
+        await self.SetStatus("Available...")
+
+        print(f"Assistant daemon listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+# Function to send requests to the running daemon and yield the replies and events that follow.
+def DaemonEvents(requests, host=DaemonHost, port=DaemonPort, timeout=None):
+    token = GetToken()
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        for request in requests:
+            connection.sendall((json.dumps(dict(request, token=token)) + "\n").encode("utf-8"))
+        for line in connection.makefile("r", encoding="utf-8"):
+            yield json.loads(line)
+
+# Function to send one request to the running daemon and return its reply.
+def DaemonRequest(request, host=DaemonHost, port=DaemonPort, timeout=5):
+    return next(DaemonEvents([request], host, port, timeout))
+
+# Function to ask the running daemon a question, yielding the events of the turn until it is done.
+def Ask(text, speak=False, session=None, host=DaemonHost, port=DaemonPort):
+    events = DaemonEvents([{"op": "query", "text": text, "speak": speak, "session": session}], host, port)
+    turn = next(events)["id"]
+    for event in events:
+        if event.get("id") == turn:
+            yield event
+            if event["event"] in ("done", "error"):
+                break
+
+# Run the daemon, or with arguments ask the running daemon, e.g. `python AssistantDaemon.py what time is it`.
+# `--listen` starts the daemon listening to the microphone right away.
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if argument != "--listen"]
+    if arguments:
+        for event in Ask(" ".join(arguments)):
+            if event["event"] == "delta":
+                print(event["text"], end="", flush=True)
+            elif event["event"] not in ("sentence", "answer"):
+                print(f"\n{json.dumps(event)}")
+    else:
+        asyncio.run(AssistantDaemon().Run(listen="--listen" in sys.argv))
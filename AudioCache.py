@@ -0,0 +1,147 @@
+import os  # Import os for file path handling.
+import queue  # Import queue to hand phrases to the pre-warm thread.
+import hashlib  # Import hashlib to name audio files after their content key.
+import threading  # Import threading to guard the index and run the pre-warm.
+from collections import OrderedDict  # Import OrderedDict for the LRU order.
+
+# Folder holding the cached audio, one file per synthesized text.
+AudioCacheDir = os.path.join("Data", "AudioCache")
+
+# Maximum size of all cached audio together, in bytes.
+DefaultMaxBytes = 64 * 1024 * 1024
+
+# Function to build the content key of a piece of speech from everything that changes the audio.
+def AudioKey(text, voice, pitch, rate):
+    text = " ".join(str(text).split())
+    return hashlib.sha256(f"{voice}\0{pitch}\0{rate}\0{text}".encode("utf-8")).hexdigest()
+
+
+# Content-addressed cache of synthesized speech.
+#
+# Every entry is a file named after the hash of its text, voice, pitch and
+# rate, so the same speech is only ever synthesized once. The total size is
+# bounded and the least recently played files are removed first; recency is
+# kept in the file modification times so it survives restarts.
+class AudioCache:
+
+    def __init__(self, path=AudioCacheDir, max_bytes=DefaultMaxBytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size, least recently used first
+        self.size = 0
+        self.warmer = None
+        self.phrases = queue.Queue()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "prewarmed": 0}
+        os.makedirs(path, exist_ok=True)
+
+        # Rebuild the LRU order from the files left by earlier runs.
+        files = []
+        for name in os.listdir(path):
+            if name.endswith(".mp3"):
+                try:
+                    info = os.stat(os.path.join(path, name))
+                except OSError:
+                    continue
+                files.append((info.st_mtime, name[:-4], info.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.size += size
+        self._Evict()
+
+    # Function to find the file of a key.
+    def _File(self, key):
+        return os.path.join(self.path, key + ".mp3")
+
+    # Function to remove the least recently used files until the cache fits. Call with the lock held or from __init__.
+    def _Evict(self):
+        while self.size > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+            self.stats["evicted"] += 1
+            try:
+                os.remove(self._File(key))
+            except OSError:
+                pass
+
+    # Function to read the cached audio of a key, returning None on a miss.
+    def Get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self._File(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._File(key))
+        except OSError:
+            # The file was removed behind our back; forget it.
+            with self.lock:
+                self.size -= self.entries.pop(key, 0)
+                self.stats["misses"] += 1
+            return None
+        with self.lock:
+            self.stats["hits"] += 1
+        return audio
+
+    # Function to store the audio of a key, replacing the file in one step so readers never see half of it.
+    def Put(self, key, audio):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        temporary = f"{self._File(key)}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(audio)
+        os.replace(temporary, self._File(key))
+        with self.lock:
+            self.size += len(audio) - self.entries.pop(key, 0)
+            self.entries[key] = len(audio)
+            self.stats["stored"] += 1
+            self._Evict()
+
+    # Function to check whether a key is cached.
+    def Contains(self, key):
+        with self.lock:
+            return key in self.entries
+
+    # Function to synthesize phrases that are not cached yet in a background thread.
+    # `synthesize(text)` must return the audio and store it in this cache; `key(text)` gives its cache key.
+    def PreWarm(self, phrases, synthesize, key):
+        for phrase in phrases:
+            self.phrases.put(phrase)
+        with self.lock:
+            if self.warmer is not None:
+                return
+
+            def Warm():
+                while True:
+                    phrase = self.phrases.get()
+                    if self.Contains(key(phrase)):
+                        continue
+                    try:
+                        synthesize(phrase)
+                        with self.lock:
+                            self.stats["prewarmed"] += 1
+                    except Exception as e:
+                        print(f"Error pre-warming speech: {e}")
+
+            self.warmer = threading.Thread(target=Warm, daemon=True)
+            self.warmer.start()
+
+    # Function to remove every cached file.
+    def Clear(self):
+        with self.lock:
+            for key in self.entries:
+                try:
+                    os.remove(self._File(key))
+                except OSError:
+                    pass
+            self.entries.clear()
+            self.size = 0
+
+    # Function to report hits, misses and the size of the cache.
+    def Report(self):
+        with self.lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return dict(self.stats, entries=len(self.entries), bytes=self.size,
+                        hit_rate=self.stats["hits"] / total if total else None)
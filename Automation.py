@@ -1,21 +1,26 @@
 # Import required libraries
-from AppOpener import close, open as appopen  # Import functions to open and close apps.
 from webbrowser import open as webopen # Import web browser functionality.
-from pywhatkit import search, playonyt  # Import functions for Google search and Youtube.
-from dotenv import dotenv_values  # Import dotenv to manage environment variables.
-from bs4 import BeautifulSoup  # Import beautifulSoup for parsing HTML content.
-from rich import print  #Import rich for styled console output.
-from groq import Groq  # Import Groq for AI chat funcionalities.
+from Startup import Env, Lazy  # Import the shared settings and the lazy import helper.
+from ContentWriter import ContentWriter, SplitTopics, DefaultCacheEntries  # Import the streaming content writer.
+from TaskScheduler import TaskScheduler  # Import the scheduler for automation commands.
+from AppIndex import GetAppIndex, Launch  # Import the local index of apps and websites.
 import webbrowser  # Import webbrowser for opening urls.
 import subprocess # Import requests for interacting with the system.
-import requests  # Import request for making HTTP requests.
-import keyboard  # Import keyboard for the keyboard-related actions.
 import asyncio   # Import asyncio for asynchronous programming.
 import os  # Import os for operating system functionalities.
 
+# Heavy libraries are loaded the first time an action needs them.
+close = Lazy("AppOpener", "close")  # Function to close apps.
+appopen = Lazy("AppOpener", "open")  # Function to open apps.
+search = Lazy("pywhatkit", "search")  # Function for Google search.
+playonyt = Lazy("pywhatkit", "playonyt")  # Function to play Youtube videos.
+BeautifulSoup = Lazy("bs4", "BeautifulSoup")  # BeautifulSoup for parsing HTML content.
+print = Lazy("rich", "print")  # rich for styled console output.
+requests = Lazy("requests")  # requests for making HTTP requests.
+keyboard = Lazy("keyboard")  # keyboard for the keyboard-related actions.
+
 # Load environment variable from the .env file.
-env_vars = dotenv_values(".env")
-GroqAPIKey = env_vars.get("GroqAPIKey")  # Retrieve the Groq API key.
+env_vars = Env()
 
 # Define css classes for parsing specific elements in HTML content.
 classes = ["zCubwf","hgKElc","LTKOO sY7ric", "Z0Lcw", "gsrt vk_bk FzvWsb YwPhnf", "pclqee",
@@ -27,68 +32,58 @@ classes = ["zCubwf","hgKElc","LTKOO sY7ric", "Z0Lcw", "gsrt vk_bk FzvWsb YwPhnf"
 # Define a user-agent while making web requests.
 useragent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
 
-# Initialize the Groq client with API key.
-client = Groq(api_key=GroqAPIKey)
-
 # Predefined professional responses for user interactions.
 professional_responses = [
     "Your satisfaction is my top priority; feel free to reach out if there's anything else i can help you with .",
     "I'm at your service for any additional questions or support you may need-don't hesitate to ask.",
 ]
 
-# List to store chatbot messages.
-messages = []
-
 # System message to provide context to the chatbot.
 SystemChatBot = [{"role": "system", "content": f"Hello, I am {os.environ['Username']}, You're a content writer. you have to write letters, codes, applications, essays, notes, songs, poems etc."}]
+# Shared HTTP session for the Google fallback of OpenApp, created on first use.
+_session = None
+
+# Function to get the shared HTTP session.
+def Session():
+    global _session
+    if _session is None:
+        _session = requests.session()
+    return _session
+
 # Function to perform a Google search.
 def GoogleSearch(topic):
     search(topic)  # Use pywhatkit's search function to perform a google search.
     return True  # Indicate success.
 
+# Function to open a file in Notepad.
+def OpenNotepad(File):
+    default_text_editor = 'notepad.exe'  # Default text editor.
+    subprocess.Popen([default_text_editor, File])  # Open the file in the default text editor.
+
+# Content writer with independent jobs; ContentHistory earlier exchanges may be kept as context.
+writer = ContentWriter(SystemChatBot, opener=OpenNotepad, history=int(env_vars.get("ContentHistory") or 0),
+                       max_entries=int(env_vars.get("ContentCacheSize") or DefaultCacheEntries))
+
 # Function to generate content using AI and save it to a file.
 def Content(Topic): 
-  
-    # Nested function to open a file in Notepad.
-    def OpenNotepad(File):
-        default_text_editor = 'notepad.exe'  # Default text editor.
-        subprocess.Popen([default_text_editor, File])  # Open the file in the default text editor.
-
-    # Nested function to generate content using the AI chatbot.
-    def ContentWriteAI(prompt):
-        messages.append({"role": "user", "content": f"{prompt}"})  # Add the user's prompt to messages.
-
-        completion = client.chat.completions.create(
-            model="llama3-8b-8192",  # Specify the AI model.
-            messages=SystemChatBot + messages,  # Include system instructions and chat history.
-            max_tokens=2048,  # Limit the maximum tokens in the response.
-            temperature=0.7,  # Adjust response randomness.
-            top_p=1,  # Use nucleus sampling for response diversity.
-            stream=True,  # Allow the model to determine stopping conditions.
-            stop=None  # Allow the model to determine stopping conditions.
-        )
-
-        Answer = ""
-        for chunk in completion:
-            
-         if hasattr(chunk, 'choices') and chunk.choices and hasattr(chunk.choices[0], 'delta'):
-            Answer += chunk.choices[0].delta.content or ""  # Safely handle None values
-
-        Answer = Answer.replace("</s>", "")  # Remove unwanted tokens from the response.
-        messages.append({"role": "assistant", "content": Answer})  # Add the AI's response to messages.
-        return Answer
-
     Topic = Topic.replace("Content ", "")  # Remove "content" from the topic.
-    ContentByAI = ContentWriteAI(Topic)  # Generate content using AI.
-
-    # Save the generated content to a text file.
-    with open(rf"Data\{Topic.lower().replace(' ', '')}.txt", "w", encoding="utf-8") as file:
-        file.write(ContentByAI)  # Write the content to the file.
-        file.close()
-
-    OpenNotepad(rf"Data\{Topic.lower().replace(' ', '')}.txt")  # Open the file in Notepad.
+    writer.WriteMany(SplitTopics(Topic))  # Stream each topic to its own file and open it in Notepad.
     return True  # Indicate success.
 
+# Function to merge the content commands of one decision into one, so their topics are written side by side.
+def MergeContent(commands):
+    topics = [command.removeprefix("content ") for command in commands if command.startswith("content ")]
+    if len(topics) < 2:
+        return list(commands)
+    merged = []
+    for command in commands:
+        if not command.startswith("content "):
+            merged.append(command)
+        elif topics:
+            merged.append("content " + "\n".join(topics))  # SplitTopics splits them again.
+            topics = []
+    return merged
+
  # Function to search for a topic on youtube.
 def YoutubeSearch(Topic):
      Url4Search = f"https://www.youtube.com/results?search_query={Topic}"    # Construct the youtube search URL.
@@ -101,7 +96,19 @@ def PlayYoutube(query):
      return True   #Indicate success.
 
 # Function to open an application or a relevant webpage.
-def OpenApp(app, sess=requests.session()):
+def OpenApp(app, sess=None):
+    sess = sess or Session()
+    index = GetAppIndex()
+
+    # Resolve the name locally first: installed apps, known websites and earlier searches.
+    # The index already prefers an installed app over a website of the same name.
+    entry = index.Resolve(app)
+    if entry:
+        try:
+            return Launch(entry)  # Open the resolved app or website.
+        except Exception as e:
+            print(f"Unable to open {entry['target']}: {e}")
+
     try:
         appopen(app, match_closest=True, output=True, throw_error=True)  # Attempt to open the app.
         return True  # Indicate success.
@@ -131,6 +138,7 @@ def OpenApp(app, sess=requests.session()):
             links = extract_links(html)  # Extract links from the HTML.
 
             if links:  # Check if links exist before accessing them.
+                index.Learn(app, "url", links[0])  # Remember the link so the search is not repeated.
                 webopen(links[0])  # Open the first available link.
                 return True  # Indicate success.
             else:
@@ -182,65 +190,27 @@ def System(command):
         
     return True   # Indicate success.
   
+# Scheduler running each kind of command on its own thread pool, with limits and deadlines.
+scheduler = TaskScheduler({
+    "open": OpenApp,
+    "close": CloseApp,
+    "play": PlayYoutube,
+    "content": Content,
+    "google search": GoogleSearch,
+    "youtube search": YoutubeSearch,
+    "system": System,
+})
+
 # Asynchronous function to translate and execute user commands.
 async def TranslateAndExecute(commands:list[str]):
   
-    funcs = []  # List to store asynchronous tasks.
-    
-    for command in commands:
-      
-       if command.startswith("open "):  # Handle "open" commands.
-         
-           if "open it" in command:  # Ignore "open it" commands.
-               pass
-             
-           if "open file" == command: # Ignore "open file" commands.
-               pass
-             
-           else:
-             fun = asyncio.to_thread(OpenApp, command.removeprefix("open "))  # Schedule app opening.
-             funcs.append(fun)
-             
-       elif command.startswith("general "):  # Placeholder for general commands.
-            pass
-      
-       elif command.startswith("realtime "): # Placeholder for real-time commands.
-            pass
-          
-       elif command.startswith("close "): # Handle "close" commands.
-           fun = asyncio.to_thread(CloseApp, command.removeprefix("close "))  # Schedule app closing.
-           funcs.append(fun)
-           
-       elif command.startswith ("play "):  # Handle "play" commands.
-           fun = asyncio.to_thread(PlayYoutube, command.removeprefix("play "))  # Schedule Youtube playback.
-           funcs.append(fun)
-           
-       elif command.startswith("content "):  # Handle "content" commands.
-           fun = asyncio.to_thread(Content, command.removeprefix("content "))  # Schedule content creation.
-           funcs.append(fun)
-
-       elif command.startswith("google search "):  # Handle Google search commands.
-           fun = asyncio.to_thread(GoogleSearch, command.removeprefix("google search "))  # Schedule Google search.
-           funcs.append(fun)
-           
-       elif command.startswith("youtube search "):  # Handle Youtube search commands.
-           fun = asyncio.to_thread(YoutubeSearch, command.removeprefix("youtube search "))  # Schedule Youtube search.
-           funcs.append(fun)
-           
-       elif command.startswith("system "): # Handle system commands.
-           fun = asyncio.to_thread(System, command.removeprefix("system "))  # Schedule system command.
-           funcs.append(fun)
-           
-       else:
-           print(f"No Function Found. For {command}")  # Print an error for unrecognized commands.
-           
-    results = await asyncio.gather(*funcs)  # Execute all tasks concurrently.
-  
-    for result in results:  # Process the results.
-      if isinstance(result, str):
-         yield result
-      else:
-         yield result
+    # Run the commands on the scheduler and pass each result on as soon as it is ready.
+    async for result in scheduler.Run(MergeContent(commands)):
+      if result["status"] == "unknown":
+         print(f"No Function Found. For {result['command']}")  # Print an error for unrecognized commands.
+      elif result["status"] in ("error", "timeout"):
+         print(f"{result['command']} failed: {result['error']}")  # Report the failure without stopping the others.
+      yield result
          
 # Asynchronous function to automate command execution.
 async def Automation(commands: list[str]):
@@ -0,0 +1,258 @@
+import os  # Import os for file path handling.
+import sys  # Import sys to find the repository.
+import json  # Import json to write the machine-readable report.
+import time  # Import time to measure every stage.
+import shutil  # Import shutil to clear caches between turns.
+import asyncio  # Import asyncio to drive the asynchronous paths.
+import argparse  # Import argparse for the command line options.
+import tempfile  # Import tempfile for an isolated working folder.
+import importlib  # Import importlib to load the assistant after it is pointed at the stand-ins.
+import subprocess  # Import subprocess to record the current commit.
+from MockProviders import MockProviders, DefaultSettings, AudioBytesPerSecond  # Import the local stand-in providers.
+
+# Folder of the assistant modules, and where reports are written by default.
+RepositoryDir = os.path.dirname(os.path.abspath(__file__))
+ReportDir = os.path.join(RepositoryDir, "Data", "Benchmarks")
+
+# Queries of each scenario, chosen so the stand-in decision model routes them as named.
+Scenarios = {
+    "general": ["how are you doing", "tell me a joke about computers", "what can you help me with", "explain how rainbows form"],
+    "realtime": ["who is the prime minister of india", "latest news about space", "weather in delhi today", "bitcoin price today"],
+    "content": ["content application for sick leave", "content poem about the sea"],
+    "image": ["generate image a red fox in the snow", "generate image a city at night"],
+}
+
+# Settings the assistant needs in the isolated folder.
+AssistantSettings = {"username": "Benchmark", "AssistantName": "Jarvis", "InputLanguage": "en",
+                     "AssistantVoice": "en-US-AriaNeural", "ImageVariants": "2", "TTSPreWarm": "False"}
+
+# Function to get the value at a percentile of sorted values, by nearest rank.
+def Percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * percent // 100) - 1))]
+
+# Function to summarize the samples of one stage.
+def Summarize(values):
+    return {"count": len(values), "mean": sum(values) / len(values), "p50": Percentile(values, 50),
+            "p95": Percentile(values, 95), "p99": Percentile(values, 99), "max": max(values)}
+
+# Function to find the commit being measured.
+def CurrentCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=RepositoryDir).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Stand-in for pygame that "plays" audio without a sound device, taking
+# len(audio) / bytes-per-second / speed seconds, or no time when speed is 0.
+class SilentPygame:
+
+    def __init__(self, speed=0):
+        self.speed = speed
+        self.first_play = None
+        self.until = 0.0
+        self.mixer = self
+        self.music = self
+        self.time = self
+
+    def init(self):
+        pass
+
+    def quit(self):
+        pass
+
+    def load(self, buffer, kind=None):
+        self.size = len(buffer.getvalue()) if hasattr(buffer, "getvalue") else os.path.getsize(buffer)
+
+    def play(self):
+        if self.first_play is None:
+            self.first_play = time.perf_counter()
+        self.until = time.perf_counter() + (self.size / AudioBytesPerSecond / self.speed if self.speed else 0)
+
+    def get_busy(self):
+        return time.perf_counter() < self.until
+
+    def stop(self):
+        self.until = 0.0
+
+    def Clock(self):
+        return self
+
+    def tick(self, rate):
+        time.sleep(min(1 / rate, max(self.until - time.perf_counter(), 0)))
+
+
+# Driver that runs voice turns through the real assistant modules against the stand-ins.
+class Benchmark:
+
+    def __init__(self, providers, playback_speed=0, warm=False, llm_decisions=False):
+        self.providers = providers
+        self.warm = warm
+        self.player = SilentPygame(playback_speed)
+        self.samples = {}
+        self.errors = []
+
+        # Point the shared settings at the stand-ins before any assistant module reads them.
+        import Startup
+        Startup.Env().update(AssistantSettings, **providers.Env())
+        if llm_decisions:
+            Startup.Env()["IntentConfidence"] = "1.01"  # The local classifier is never confident enough.
+        os.environ.setdefault("Username", AssistantSettings["username"])
+        providers.PatchEdgeTTS()
+
+        self.Model = importlib.import_module("Model")
+        self.Chatbot = importlib.import_module("Chatbot")
+        self.RealtimeSearchEngine = importlib.import_module("RealtimeSearchEngine")
+        self.Automation = importlib.import_module("Automation")
+        self.TextToSpeech = importlib.import_module("TextToSpeech")
+        self.ImageGeneration = importlib.import_module("ImageGeneration")
+        self.Tracing = importlib.import_module("Tracing")
+        self.TextToSpeech.pygame = self.player
+        self.Automation.writer.opener = None  # There is no editor to open.
+
+    # Function to record one sample of a stage.
+    def _Record(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    # Function to forget cached work so every turn does the full amount of work.
+    def _Cold(self):
+        if self.warm:
+            return
+        self.Model.decision_cache.Clear()
+        self.RealtimeSearchEngine.search_cache.Clear()
+        self.Chatbot.answer_cache.Clear()
+        self.TextToSpeech.audio_cache.Clear()
+        for folder in (self.Automation.writer.cache_dir, self.ImageGeneration.ImageCacheDir):
+            shutil.rmtree(folder, ignore_errors=True)
+
+    # Function to answer with a chat stream and speak the sentences as they arrive.
+    def _Answer(self, stream, start):
+        first_token = None
+        answered = None
+
+        def Sentences():
+            nonlocal first_token, answered
+            for kind, text in stream:
+                if kind == "delta" and first_token is None:
+                    first_token = time.perf_counter()
+                if kind == "sentence":
+                    yield text
+            answered = time.perf_counter()
+
+        # The synthesis thread reads the stream, so "answer" also holds the time spent synthesizing in between.
+        self.player.first_play = None
+        self.TextToSpeech.PipelinedTTS(Sentences())
+        finished = time.perf_counter()
+        if first_token is None or self.player.first_play is None:
+            raise RuntimeError("the answer produced no text or no audio")
+        self._Record("time_to_first_token", first_token - start)
+        self._Record("time_to_first_audio", self.player.first_play - start)
+        self._Record("answer", answered - first_token)
+        self._Record("speech", finished - self.player.first_play)
+
+    # Function to run one voice turn: decide, then answer, act or generate.
+    def Turn(self, query):
+        self._Cold()
+        self.Tracing.StartTrace("turn", query=query)
+        start = time.perf_counter()
+        decision = self.Model.FirstLayerDMM(query)
+        self._Record("decision", time.perf_counter() - start)
+
+        for task in decision:
+            if task.startswith("general "):
+                self._Answer(self.Chatbot.StreamChatBot(task.removeprefix("general ")), start)
+            elif task.startswith("realtime "):
+                self._Answer(self.RealtimeSearchEngine.StreamRealtimeSearchEngine(task.removeprefix("realtime ")), start)
+            elif task.startswith("generate image "):
+                begin = time.perf_counter()
+                asyncio.run(self.ImageGeneration.generate_images(task.removeprefix("generate image ")))
+                self._Record("image", time.perf_counter() - begin)
+            else:
+                begin = time.perf_counter()
+                asyncio.run(self._Automate(task))
+                self._Record("automation", time.perf_counter() - begin)
+        return time.perf_counter() - start
+
+    # Function to run an automation command through the scheduler.
+    async def _Automate(self, task):
+        async for result in self.Automation.TranslateAndExecute([task]):
+            if result["status"] not in ("ok", "skipped"):
+                raise RuntimeError(f"{task}: {result['error']}")
+
+    # Function to run every scenario a number of times and build the report.
+    def Run(self, rounds=3, scenarios=Scenarios):
+        started = time.time()
+        for _ in range(rounds):
+            for scenario, queries in scenarios.items():
+                for query in queries:
+                    try:
+                        self._Record(f"end_to_end_{scenario}", self.Turn(query))
+                    except Exception as e:
+                        self.errors.append(f"{scenario}: {query}: {e}")
+        return {
+            "commit": CurrentCommit(),
+            "timestamp": started,
+            "rounds": rounds,
+            "warm_caches": self.warm,
+            "settings": self.providers.settings,
+            "stages": {stage: Summarize(values) for stage, values in sorted(self.samples.items())},
+            "requests": self.providers.requests,
+            "errors": self.errors,
+        }
+
+
+# Function to print the report as a table, with changes against an earlier report if given.
+def PrintReport(report, baseline=None):
+    print(f"{'stage':<26}{'p50':>9}{'p95':>9}{'p99':>9}   (ms, commit {report['commit']})")
+    for stage, summary in report["stages"].items():
+        line = f"{stage:<26}" + "".join(f"{summary[p] * 1000:9.1f}" for p in ("p50", "p95", "p99"))
+        old = (baseline or {}).get("stages", {}).get(stage)
+        if old:
+            line += f"   p50 {(summary['p50'] - old['p50']) * 1000:+.1f} ms, p95 {(summary['p95'] - old['p95']) * 1000:+.1f} ms"
+        print(line)
+    if report["errors"]:
+        print(f"{len(report['errors'])} turns failed, first: {report['errors'][0]}")
+
+# Entry point to run the benchmark suite.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark against local stand-in providers.")
+    parser.add_argument("--rounds", type=int, default=3, help="times every scenario query is run")
+    parser.add_argument("--output", help="report file, by default Data/Benchmarks/<commit>-<time>.json")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    parser.add_argument("--warm", action="store_true", help="keep caches between turns")
+    parser.add_argument("--llm-decisions", action="store_true", help="send every decision to the Cohere stand-in")
+    parser.add_argument("--playback-speed", type=float, default=0, help="simulated playback speed, 0 skips playback time")
+    for name, value in DefaultSettings.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    options = parser.parse_args()
+
+    providers = MockProviders({name: getattr(options, name) for name in DefaultSettings})
+    providers.Start()
+
+    # Work in an empty folder so the chat log and caches of the real assistant are left alone.
+    workdir = tempfile.mkdtemp(prefix="jarvis-benchmark-")
+    os.makedirs(os.path.join(workdir, "Data"))
+    os.makedirs(os.path.join(workdir, "Frontend", "Files"))
+    os.chdir(workdir)
+    sys.path.insert(0, RepositoryDir)
+
+    try:
+        report = Benchmark(providers, options.playback_speed, options.warm, options.llm_decisions).Run(options.rounds)
+    finally:
+        providers.Stop()
+        os.chdir(RepositoryDir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = options.output or os.path.join(ReportDir, f"{report['commit'] or 'unknown'}-{int(report['timestamp'])}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    PrintReport(report, baseline)
+    print(f"Report written to {output}")
@@ -0,0 +1,322 @@
+import os  # Import os for file path handling.
+import json  # Import json to encode and decode chat messages.
+import struct  # Import struct to pack record offsets into the index files.
+import threading  # Import threading to serialize writers inside one process.
+import contextlib  # Import contextlib for the cross-process lock.
+
+# Directory holding the segmented chat log and the legacy single-file chat log.
+ChatLogDir = os.path.join("Data", "ChatLog")
+LegacyChatLogPath = os.path.join("Data", "ChatLog.json")
+
+# Each index entry is the byte offset of one record inside its segment.
+OffsetFormat = "<Q"
+OffsetSize = struct.calcsize(OffsetFormat)
+
+# Number of records written to a segment before a new one is started.
+SegmentRecords = 1000
+
+# Number of closed segments kept before they are compacted into one.
+MaxSegments = 8
+
+# Attempts at reading while another process compacts the segments away underneath.
+ReadAttempts = 3
+
+
+# Append-only chat log made of JSONL segments with a fixed-width offset index.
+#
+# Every record gets a sequence number that never changes, the segment file
+# names carry the sequence number of their first record. Appending a message
+# writes one line to the newest segment and one offset to its index, so the
+# cost of a turn no longer depends on the length of the history.
+#
+# Writers are serialized by a thread lock and, across processes such as the
+# daemon, the image worker and the command line, by a lock file; readers take
+# no lock. A segment that starts inside an earlier one was superseded by a
+# compaction that did not finish and is ignored until it is removed.
+class ChatLogStore:
+
+    def __init__(self, directory=ChatLogDir, segment_records=SegmentRecords, max_segments=MaxSegments):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        self.lock_path = os.path.join(directory, "writer.lock")
+        os.makedirs(self.directory, exist_ok=True)
+
+    # Function to hold the store's lock file, so writers in other processes wait their turn.
+    @contextlib.contextmanager
+    def _ProcessLock(self):
+        with open(self.lock_path, "a+b") as f:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # Retries for about ten seconds, then raises.
+                        break
+                    except OSError:
+                        continue
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # Function to take both the thread lock and the process lock.
+    @contextlib.contextmanager
+    def _Locked(self):
+        with self.lock, self._ProcessLock():
+            yield
+
+    # Function to build the data and index file paths for a segment.
+    def _Paths(self, base):
+        name = os.path.join(self.directory, f"{base:012d}")
+        return name + ".jsonl", name + ".idx"
+
+    # Function to list the segments as (first sequence, record count) pairs, and the superseded ones.
+    # The listing is read from disk every time so other processes stay in sync.
+    def _Listing(self):
+        segments, superseded = [], []
+        end = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".idx"):
+                continue
+            base = int(name[:-4])
+            try:
+                count = os.path.getsize(os.path.join(self.directory, name)) // OffsetSize
+            except OSError:
+                continue  # Removed by a compaction in another process.
+            if segments and base < end:
+                superseded.append(base)
+                continue
+            segments.append((base, count))
+            end = base + count
+        return segments, superseded
+
+    # Function to list the segments as (first sequence, record count) pairs.
+    def _Segments(self):
+        return self._Listing()[0]
+
+    # Function to read the offsets of records [start, stop) of one segment.
+    def _Offsets(self, base, start, stop):
+        _, index_path = self._Paths(base)
+        with open(index_path, "rb") as f:
+            f.seek(start * OffsetSize)
+            raw = f.read((stop - start) * OffsetSize)
+        return [offset for (offset,) in struct.iter_unpack(OffsetFormat, raw)]
+
+    # Function to write a batch of records to the newest segment.
+    def _Write(self, records):
+        segments = self._Segments()
+        if segments:
+            base, count = segments[-1]
+        else:
+            base, count = 0, 0
+
+        while records:
+            # Start a new segment once the current one is full.
+            if count >= self.segment_records:
+                base, count = base + count, 0
+
+            batch = records[:self.segment_records - count]
+            records = records[len(batch):]
+
+            data_path, index_path = self._Paths(base)
+            # The lines are written out before their offsets, so an indexed record is always complete on disk.
+            with open(data_path, "ab") as data:
+                offset = data.tell()
+                offsets = b""
+                lines = b""
+                for record in batch:
+                    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                    offsets += struct.pack(OffsetFormat, offset)
+                    lines += line
+                    offset += len(line)
+                data.write(lines)
+            with open(index_path, "ab") as index:
+                index.write(offsets)
+            count += len(batch)
+
+        # Fold old segments together when too many have piled up.
+        if self.max_segments and len(self._Segments()) > self.max_segments + 1:
+            self._Compact(None)
+
+    # Function to append a single message to the chat log.
+    def Append(self, message):
+        with self._Locked():
+            self._Write([message])
+
+    # Function to append several messages to the chat log in one write.
+    def Extend(self, messages):
+        messages = list(messages)
+        if messages:
+            with self._Locked():
+                self._Write(messages)
+
+    # Function to get the sequence number of the oldest record still stored.
+    def First(self):
+        segments = self._Segments()
+        return segments[0][0] if segments else 0
+
+    # Function to get the sequence number the next appended record will get.
+    def __len__(self):
+        segments = self._Segments()
+        if not segments:
+            return 0
+        base, count = segments[-1]
+        return base + count
+
+    # Function to count the records that are still stored.
+    def Count(self):
+        return sum(count for _, count in self._Segments())
+
+    # Function to read the records with sequence numbers in [start, stop).
+    def Read(self, start=0, stop=None):
+        for attempt in range(ReadAttempts):
+            try:
+                return self._Read(start, stop)
+            except FileNotFoundError:
+                # Another process compacted the segments while they were read; list them again.
+                if attempt == ReadAttempts - 1:
+                    raise
+
+    # Function to read the records with sequence numbers in [start, stop) from the current segments.
+    def _Read(self, start, stop):
+        records = []
+        for base, count in self._Segments():
+            end = base + count
+            lo = max(start, base)
+            hi = end if stop is None else min(stop, end)
+            if lo >= hi:
+                continue
+
+            offsets = self._Offsets(base, lo - base, hi - base)
+            data_path, _ = self._Paths(base)
+            with open(data_path, "rb") as f:
+                f.seek(offsets[0])
+                if hi < end:
+                    raw = f.read(self._Offsets(base, hi - base, hi - base + 1)[0] - offsets[0])
+                else:
+                    raw = f.read()
+
+            # Only complete lines are returned, a concurrent append may still be in progress.
+            lines = raw.split(b"\n")
+            for line in lines[:min(hi - lo, len(lines) - 1)]:
+                if not line:
+                    break
+                records.append(json.loads(line))
+        return records
+
+    # Function to read the last n records.
+    def Tail(self, n):
+        stop = len(self)
+        return self.Read(max(stop - n, 0), stop)
+
+    # Function to read every record that is still stored.
+    def ReadAll(self):
+        return self.Read(0, None)
+
+    # Function to delete the whole chat log.
+    def Clear(self):
+        with self._Locked():
+            segments, superseded = self._Listing()
+            for base in [base for base, _ in segments] + superseded:
+                for path in reversed(self._Paths(base)):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    # Function to merge closed segments into one, optionally keeping only
+    # the newest keep_records records of the whole log.
+    def _Compact(self, keep_records):
+        segments, superseded = self._Listing()
+
+        # Finish what an interrupted compaction left behind.
+        for base in superseded:
+            for path in reversed(self._Paths(base)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        closed = segments[:-1]
+        active_base, active_count = segments[-1] if segments else (0, 0)
+        if not closed:
+            return
+
+        start = closed[0][0]
+        if keep_records is not None:
+            start = max(start, active_base + active_count - keep_records)
+        start = min(start, active_base)
+
+        # Write the surviving records of the closed segments to a new segment.
+        records = self.Read(start, active_base)
+        if records:
+            data_path, index_path = self._Paths(start)
+            offset = 0
+            with open(data_path + ".tmp", "wb") as data, open(index_path + ".tmp", "wb") as index:
+                for record in records:
+                    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                    index.write(struct.pack(OffsetFormat, offset))
+                    data.write(line)
+                    offset += len(line)
+
+        # Move the merged segment into place first, data before index, and only then remove the old
+        # segments, so a crash in between never loses a record. Until the old segments are gone they
+        # start inside the merged one and are ignored as superseded.
+        if records:
+            os.replace(data_path + ".tmp", data_path)
+            os.replace(index_path + ".tmp", index_path)
+        for base, _ in closed:
+            if records and base == start:
+                continue
+            # The index goes first, so a crash never leaves an indexed segment without its data.
+            for path in reversed(self._Paths(base)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # Function to compact the log on demand.
+    def Compact(self, keep_records=None):
+        with self._Locked():
+            self._Compact(keep_records)
+
+
+# Shared store used by every module that reads or writes the chat log.
+_chat_log = None
+_chat_log_lock = threading.Lock()
+
+# Function to import the old Data\ChatLog.json into the store, only once.
+def MigrateChatLog(store, legacy_path=LegacyChatLogPath):
+    if not os.path.exists(legacy_path) or store.Count():
+        return 0
+
+    try:
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            messages = json.load(f)
+    except ValueError:
+        messages = []
+
+    store.Extend(messages)
+    # Keep the old file around under a new name so the migration never runs twice.
+    os.replace(legacy_path, legacy_path + ".migrated")
+    return len(messages)
+
+# Function to export the chat log as a single JSON file for readers that still expect it.
+def ExportChatLog(path=LegacyChatLogPath, store=None):
+    store = store or GetChatLog()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(store.ReadAll(), f, indent=4)
+
+# Function to get the shared chat log store, migrating the legacy file on first use.
+def GetChatLog():
+    global _chat_log
+    with _chat_log_lock:
+        if _chat_log is None:
+            store = ChatLogStore()
+            MigrateChatLog(store)
+            _chat_log = store
+    return _chat_log
@@ -1,21 +1,17 @@
-from groq import Groq   # Importing the groq library to use its API.
-from json import load, dump  # Importing functions to read and write JSON files.
+from LLMClient import GroqClient, Stream, LLMError  # Importing the shared, rate-limited LLM client layer.
+from Session import GetSession  # Importing the per-user sessions holding chat logs and context windows.
+from AnswerStream import StreamAnswer, AsyncStream, SentenceSplitter  # Importing helpers to stream answers as they are generated.
+from AnswerCache import AnswerCache, DefaultThreshold  # Importing the semantic cache of past answers.
+import hashlib  # Importing hashlib to tie cached answers to the model and system prompt.
 import datetime  # Importing the datetime module for real-time date and time information.
-from dotenv import dotenv_values  # Importing dotenv_values to read environment variables from a .env file.
+from Startup import Env, Lazy  # Import the shared settings and the lazy import helper.
 
 # Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
+env_vars = Env()
 
-# Retrieve specific environment variables for username, assistant name, and API key.
+# Retrieve specific environment variables for username and assistant name.
 username = env_vars.get("username")
 AssistantName = env_vars.get("AssistantName")
-GroqAPIKey = env_vars.get("GroqAPIKey")
-
-# Initialize the groq client using the provided API key.
-client = Groq(api_key=GroqAPIKey)
-
-# Initialize an empty list to store chat messages.
-messages = []
 
 # Define a system message that provides context to the AI chatbot about its roles and behavior.
 System = f"""Hello, I am {username}, You are a very accurate and advanced AI chatbot named {AssistantName} which also has real-time up-to-date information from the internet.
@@ -29,14 +25,24 @@ SystemChatbot = [
     {"role": "system", "content": System}
 ]
 
-# Attempt to load the chat log from a JSON file.
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)  # Load existing messages from the chat logs.
-except FileNotFoundError:
-    # If the file doesn't exist, create an empty JSON file to store chat logs.
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
+# Model that answers general queries.
+ChatModel = "llama3-70b-8192"
+
+# Whether answers to general questions are reused for similar questions, and how similar they must be.
+AnswerCacheEnabled = env_vars.get("AnswerCache", "True").lower() != "false"
+AnswerCacheThreshold = float(env_vars.get("AnswerCacheThreshold") or DefaultThreshold)
+
+# Cache of past answers, dropped whenever the model or the system prompt changes. Opened on first use.
+answer_cache = Lazy(lambda: AnswerCache(version=hashlib.sha256(f"{ChatModel}\n{System}".encode("utf-8")).hexdigest()[:16],
+                                        threshold=AnswerCacheThreshold, max_entries=int(env_vars.get("AnswerCacheSize") or 1000),
+                                        ttl=float(env_vars.get("AnswerCacheTTL") or 30 * 24 * 3600)))
+
+# Function to look up the chat log and token-budgeted context window of the default session on first use,
+# for callers that name no session.
+def __getattr__(name):
+    if name in ("chat_log", "context_window"):
+        return getattr(GetSession(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
              
 # Function to get real-time date and time information.
 def RealtimeInformation():
@@ -62,52 +68,86 @@ def AnswerModifier(Answer):
     modified_answer = "\n".join(non_empty_lines)  # Join the cleaned lines back together.
     return modified_answer  # Return the modified answer.
 
+# Streaming Chatbot function to handle user queries.
+def StreamChatBot(query, session=None):
+    """ This function sends the user's query to the chatbot and yields the AI's response as it is generated.
+
+    Yields ("delta", text) for every cleaned piece of text, ("sentence", text) whenever a sentence is
+    complete and finally ("done", answer) with the formatted answer once the chat log has been saved.
+    The history comes from and goes to the given session, the default session when none is given."""
+    session = session or GetSession()
+
+    # Start the message list for this turn with the user's query.
+    messages = [{"role": "user", "content": f"{query}"}]
+
+    # Answer a question asked before from the cache; questions about the time or the conversation always miss.
+    Answer = answer_cache.Get(query) if AnswerCacheEnabled else None
+    if Answer is not None:
+        yield "delta", Answer
+        splitter = SentenceSplitter()
+        for sentence in splitter.Feed(Answer) + splitter.Flush():
+            yield "sentence", sentence
+        session.chat_log.Extend(messages + [{"role": "assistant", "content": Answer}])
+        yield "done", AnswerModifier(Answer)
+        return
+
+    # Fit system instructions, real-time info, summarized and recent chat history into the token budget.
+    prompt = session.context_window.Build(SystemChatbot + [{"role": "user", "content": RealtimeInformation()}], messages[0])
+
+    # Make a request to the Groq API for a response, with rate limits, retries and a deadline.
+    completion = Stream("groq", lambda: GroqClient().chat.completions.create(
+        model=ChatModel,  # Specify the AI model to use.
+        messages=prompt,  # Include the budgeted prompt.
+        max_tokens=1024,  # Limit the maximum tokens in the response.
+        temperature=0.7,  # Adjust response randomness (higher means more random).
+        top_p=1,  # Use nucleus sampling to control diversity.
+        stream=True,  # Enable streaming response.
+        stop=None  # Allow the model to determine when to stop.
+    ))
+    Answer = ""  # Initialize an empty string to store the generated AI response.
+
+    # Pass the cleaned response chunks and finished sentences on as they arrive.
+    for kind, text in StreamAnswer(completion):
+        if kind == "delta":
+            Answer += text  # Append the content to the answer.
+        yield kind, text
+
+    # Append the Chatbot's response to the message list.
+    messages.append({"role": "assistant", "content": Answer})
+
+    # Append the new turn to the chat log store.
+    session.chat_log.Extend(messages)
+
+    # Keep the answer for similar questions, unless it depends on the time or the conversation.
+    if AnswerCacheEnabled:
+        answer_cache.Put(query, Answer)
+
+    # Finish with the formatted response.
+    yield "done", AnswerModifier(Answer)
+
+# Asynchronous version of StreamChatBot for event loop based callers.
+async def AsyncStreamChatBot(query, session=None):
+    async for event in AsyncStream(StreamChatBot, query, session):
+        yield event
+
 # Main Chatbot function to handle user queries.
-def ChatBot(query):
+def ChatBot(query, session=None):
     """ This function sends the user's query to the chatbot and returns the AI's response."""
     try:
-        # Load the existing chat log from the JSON file.
-        with open(r"Data\ChatLog.json", "r") as f:
-            messages = load(f)
-                        
-        # Append the user's query to the message list.
-        messages.append({"role": "user", "content": f"{query}"})
-                        
-        # Make a request to the Groq API for a response.
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",  # Specify the AI model to use.
-            messages=SystemChatbot + [{"role": "user", "content": RealtimeInformation()}] + messages,  # Include system instructions, real-time info, and chat history.
-            max_tokens=1024,  # Limit the maximum tokens in the response.
-            temperature=0.7,  # Adjust response randomness (higher means more random).
-            top_p=1,  # Use nucleus sampling to control diversity.
-            stream=True,  # Enable streaming response.
-            stop=None  # Allow the model to determine when to stop.
-        )
-        Answer = ""  # Initialize an empty string to store the generated AI response.
-
-        # Process the streamed response chunks.
-        for chunk in completion:
-            if chunk.choices[0].delta.content:  # Check if there is content in the current chunk.
-                Answer += chunk.choices[0].delta.content  # Append the content to the answer.
-
-        Answer = Answer.replace("</s>", "")  # Clean up any unwanted token from the response.
-        
-        # Append the Chatbot's response to the message list.
-        messages.append({"role": "assistant", "content": Answer})
-
-        # Save the updated chat log to the JSON file.
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump(messages, f, indent=4)
-
-        # Return the formatted response.
-        return AnswerModifier(Answer)
+        # Consume the stream and return the formatted response.
+        for kind, text in StreamChatBot(query, session):
+            if kind == "done":
+                return text
 
-    except Exception as e:
-        # Handle errors by printing the exception and resetting the chat log.
+    except LLMError as e:
+        # Retries already happened in the client layer, so report the error and keep the chat log.
         print(f"Error: {e}")
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump([], f, indent=4)
-        return ChatBot(query)  # Retry the query after resetting the log.
+        return "Sorry, I couldn't get an answer right now. Please try again in a moment."
+
+    except Exception as e:
+        # Anything else, such as an unreadable chat log, must not stop the voice loop either.
+        print(f"Error: {type(e).__name__}: {e}")
+        return "Sorry, something went wrong while answering. Please try again."
                             
 # Entry point for the script.
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+import os  # Import os for file path handling.
+import re  # Import re to split several topics and name files.
+import shutil  # Import shutil to copy cached content.
+import json  # Import json to key cached content by the history it was written with.
+import hashlib  # Import hashlib to key the content cache.
+import threading  # Import threading to guard the history and in-flight jobs.
+import contextvars  # Import contextvars so parallel jobs stay in the caller's trace.
+from collections import deque  # Import deque for the bounded history.
+from concurrent.futures import Future, ThreadPoolExecutor  # Import futures to share and parallelize jobs.
+from LLMClient import GroqClient, Stream  # Import the shared, rate-limited LLM client layer.
+from AnswerStream import StreamAnswer  # Import the stream cleaner shared with the chat engines.
+
+# Model used to write content.
+ContentModel = "llama3-8b-8192"
+
+# Folder of finished content, named after a hash of the model and topic.
+ContentCacheDir = os.path.join("Data", "ContentCache")
+
+# How many content jobs from one command may be written at the same time.
+ContentConcurrency = 3
+
+# Number of finished pieces kept in the cache; the least recently used are removed first.
+DefaultCacheEntries = 200
+
+# Function to stream a completion from the content model.
+def GroqCompletion(messages):
+    return Stream("groq", lambda: GroqClient().chat.completions.create(
+        model=ContentModel,  # Specify the AI model.
+        messages=messages,  # Include system instructions and the job's context.
+        max_tokens=2048,  # Limit the maximum tokens in the response.
+        temperature=0.7,  # Adjust response randomness.
+        top_p=1,  # Use nucleus sampling for response diversity.
+        stream=True,  # Stream the answer so it can be written as it arrives.
+        stop=None  # Allow the model to determine stopping conditions.
+    ))
+
+# Function to split a content command into its topics, separated by semicolons or new lines.
+def SplitTopics(topics):
+    return [topic.strip() for topic in re.split(r"[;\n]", topics) if topic.strip()]
+
+# Function to name the output file of a topic, the same way the assistant always has.
+def ContentPath(topic):
+    return os.path.join("Data", f"{topic.lower().replace(' ', '')}.txt")
+
+
+# Content writer where every job is independent.
+#
+# Each job sends the system prompt, at most `history` earlier exchanges (none
+# by default, since content jobs are unrelated) and its topic. Tokens are
+# written to the output file as they arrive and the editor is opened with the
+# first of them. Finished content is cached by topic and the history it was
+# written with, up to `max_entries` pieces, and a job that is already being
+# written is joined instead of generated twice.
+class ContentWriter:
+
+    def __init__(self, system_messages, complete=GroqCompletion, opener=None, history=0, cache_dir=ContentCacheDir,
+                 max_entries=DefaultCacheEntries):
+        self.system_messages = system_messages
+        self.complete = complete
+        self.opener = opener
+        self.history = deque(maxlen=history * 2) if history else None
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.stats = {"written": 0, "cached": 0, "joined": 0, "evicted": 0}
+
+    # Function to find the cache file of a topic written after the given earlier exchanges.
+    def _CachePath(self, topic, earlier):
+        key = f"{ContentModel}\0{' '.join(topic.lower().split())}"
+        if earlier:
+            # The same topic written with another history is another piece.
+            key += "\0" + json.dumps(earlier, sort_keys=True)
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".txt")
+
+    # Function to get the earlier exchanges sent with the next job.
+    def _Earlier(self):
+        with self.lock:
+            return list(self.history) if self.history is not None else []
+
+    # Function to remove the least recently used cache files beyond the limit.
+    def _Trim(self):
+        try:
+            files = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".txt")]
+        except OSError:
+            return
+        excess = len(files) - self.max_entries
+        for entry in sorted(files, key=lambda entry: entry.stat().st_mtime)[:max(excess, 0)]:
+            try:
+                os.remove(entry.path)
+                self.stats["evicted"] += 1
+            except OSError:
+                pass
+
+    # Function to generate a topic into its file, opening the editor with the first tokens.
+    def _Generate(self, topic, path, earlier):
+        opened = False
+        answer = []
+        messages = self.system_messages + earlier + [{"role": "user", "content": topic}]
+        with open(path, "w", encoding="utf-8") as file:
+            for kind, text in StreamAnswer(self.complete(messages)):
+                if kind != "delta":
+                    continue
+                file.write(text)
+                file.flush()
+                answer.append(text)
+                if not opened and self.opener:
+                    self.opener(path)
+                    opened = True
+        if not opened and self.opener:
+            self.opener(path)
+
+        content = "".join(answer)
+        if self.history is not None:
+            with self.lock:
+                self.history.extend([{"role": "user", "content": topic}, {"role": "assistant", "content": content}])
+        return content
+
+    # Function to write one topic to its file, returning the file path.
+    def Write(self, topic):
+        path = ContentPath(topic)
+        earlier = self._Earlier()
+        cache_path = self._CachePath(topic, earlier)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Identical topics are answered from the cache.
+        if os.path.exists(cache_path):
+            if os.path.abspath(cache_path) != os.path.abspath(path):
+                shutil.copyfile(cache_path, path)
+            try:
+                os.utime(cache_path)  # Mark it as recently used.
+            except OSError:
+                pass
+            self.stats["cached"] += 1
+            if self.opener:
+                self.opener(path)
+            return path
+
+        # Join a job for the same topic that is already running.
+        with self.lock:
+            job = self.inflight.get(cache_path)
+            leader = job is None
+            if leader:
+                job = Future()
+                self.inflight[cache_path] = job
+        if not leader:
+            self.stats["joined"] += 1
+            return job.result()
+
+        try:
+            content = self._Generate(topic, path, earlier)
+            # An empty answer, for example from a stream cut short, is not kept for the next request.
+            if content.strip():
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(cache_path + ".tmp", "w", encoding="utf-8") as f:
+                    f.write(content)
+                os.replace(cache_path + ".tmp", cache_path)
+                self._Trim()
+            self.stats["written"] += 1
+            job.set_result(path)
+            return path
+        except BaseException as e:
+            job.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(cache_path, None)
+
+    # Function to write several topics at the same time, returning their file paths in order.
+    def WriteMany(self, topics):
+        if not topics:
+            return []
+        if len(topics) == 1:
+            return [self.Write(topics[0])]
+        # Every job runs in its own copy of the caller's context, so its spans stay in the caller's trace.
+        contexts = [contextvars.copy_context() for _ in topics]
+        with ThreadPoolExecutor(max_workers=min(ContentConcurrency, len(topics))) as pool:
+            return list(pool.map(lambda context, topic: context.run(self.Write, topic), contexts, topics))
+
+    # Function to report how many jobs were written, cached or joined.
+    def Report(self):
+        return dict(self.stats)
@@ -0,0 +1,202 @@
+import os  # Import os for file path handling.
+import re  # Import re to split text into token-like pieces.
+import json  # Import json to persist the summary cache.
+import hashlib  # Import hashlib to fingerprint summarized blocks.
+import threading  # Import threading to guard the summary cache.
+
+# File where rolling summaries are cached between turns.
+SummaryCachePath = os.path.join("Data", "ContextSummaries.json")
+
+# Default token budget for a whole prompt, including system messages.
+DefaultBudget = 3000
+
+# Number of chat log messages folded into the rolling summary at a time.
+BlockSize = 8
+
+# Maximum length of the rolling summary in tokens.
+SummaryTokens = 300
+
+# Maximum number of blocks summarized in one turn, enough for the blocks a turn moves out of the
+# recent window. When more are behind, as on the first turn over a long history, the newest cached
+# summary is carried over and only the newest blocks are folded in.
+MaxNewBlocks = 4
+
+# Heading of the system message carrying the summary.
+SummaryHeading = "Summary of the earlier conversation:\n"
+
+# Pattern matching words, numbers and single punctuation marks.
+TokenPattern = re.compile(r"\w+|[^\w\s]")
+
+# Function to estimate the number of tokens in a text.
+# Long words are split into 4 character pieces the way BPE tokenizers roughly do.
+def CountTokens(text):
+    count = 0
+    for piece in TokenPattern.findall(text or ""):
+        count += (len(piece) + 3) // 4 if len(piece) > 4 else 1
+    return count
+
+# Function to estimate the tokens of a chat message, including role overhead.
+def MessageTokens(message):
+    return CountTokens(message.get("content", "")) + 4
+
+# Function to cut a text down to at most max_tokens tokens, keeping the end.
+def TrimTokens(text, max_tokens):
+    sentences = re.split(r"(?<=[.!?\n])\s+", text.strip())
+    kept = []
+    used = 0
+    for sentence in reversed(sentences):
+        tokens = CountTokens(sentence)
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+    return " ".join(reversed(kept))
+
+# Function to fold a block of messages into a summary without calling any model.
+# The first sentence of every message is kept, newest content wins when it is too long.
+def ExtractiveSummarizer(previous, messages):
+    lines = [previous] if previous else []
+    for message in messages:
+        content = " ".join(message.get("content", "").split())
+        first = re.split(r"(?<=[.!?])\s", content, maxsplit=1)[0]
+        speaker = "User" if message.get("role") == "user" else "Assistant"
+        lines.append(f"{speaker}: {first}")
+    return TrimTokens("\n".join(lines), SummaryTokens)
+
+# Function to build a summarizer that asks a chat model to fold the block.
+def LLMSummarizer(model="llama3-8b-8192"):
+    # Imported here so the context window itself does not load the LLM clients.
+    from LLMClient import Call, GroqClient
+
+    def Summarize(previous, messages):
+        transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages)
+        # Goes through the shared client layer, so summaries share the chat's rate limits and retries.
+        completion = Call("groq", lambda: GroqClient().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": f"Update the running summary of a conversation. Keep names, facts and open questions. Reply with the summary only, at most {SummaryTokens} tokens."},
+                {"role": "user", "content": f"Summary so far:\n{previous or '(empty)'}\n\nNew messages:\n{transcript}"},
+            ],
+            max_tokens=SummaryTokens,
+            temperature=0.2,
+        ))
+        return TrimTokens(completion.choices[0].message.content or "", SummaryTokens)
+
+    return Summarize
+
+
+# Token-budgeted view of a chat log.
+#
+# The newest messages that fit the budget are sent verbatim, everything older
+# is folded block by block into one rolling summary. The summary after block k
+# only depends on the summary after block k - 1 and the messages of block k,
+# so each block is summarized once and cached; a turn costs at most
+# MaxNewBlocks new summarizations. A block that is still being filled is
+# summarized again once it changes.
+class ContextWindow:
+
+    def __init__(self, store, budget=DefaultBudget, recent_messages=6, block_size=BlockSize,
+                 summarizer=ExtractiveSummarizer, cache_path=SummaryCachePath):
+        self.store = store
+        self.budget = budget
+        self.recent_messages = recent_messages
+        self.block_size = block_size
+        self.summarizer = summarizer
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.cache = self._LoadCache()
+
+    # Function to load the cached summaries from disk.
+    def _LoadCache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("block_size") == self.block_size:
+                return {int(k): v for k, v in cache.get("summaries", {}).items()}
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    # Function to save the newest cached summaries to disk.
+    def _SaveCache(self):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        newest = sorted(self.cache)[-4:]
+        self.cache = {k: self.cache[k] for k in newest}
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"block_size": self.block_size, "summaries": self.cache}, f)
+
+    # Function to fingerprint the messages of a block.
+    @staticmethod
+    def _Fingerprint(messages):
+        return hashlib.sha1(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+
+    # Function to get the rolling summary covering every block before block `end`.
+    def Summary(self, end):
+        first_block = -(-self.store.First() // self.block_size)
+        if end <= first_block:
+            return ""
+
+        with self.lock:
+            # Start from the newest block whose cached summary is still valid.
+            summary = ""
+            block = first_block
+            for cached in sorted((b for b in self.cache if first_block <= b < end), reverse=True):
+                messages = self.store.Read(cached * self.block_size, (cached + 1) * self.block_size)
+                if self.cache[cached]["hash"] == self._Fingerprint(messages):
+                    summary = self.cache[cached]["text"]
+                    block = cached + 1
+                    break
+
+            # Fold the remaining blocks into the summary and cache each step, a few per turn at most.
+            block = max(block, end - MaxNewBlocks)
+            changed = block < end
+            while block < end:
+                messages = self.store.Read(block * self.block_size, (block + 1) * self.block_size)
+                summary = self.summarizer(summary, messages)
+                self.cache[block] = {"hash": self._Fingerprint(messages), "text": summary}
+                block += 1
+
+            if changed:
+                self._SaveCache()
+        return summary
+
+    # Function to build the prompt messages for a new query within the token budget.
+    def Build(self, system_messages, query_message):
+        remaining = self.budget - sum(MessageTokens(m) for m in system_messages) - MessageTokens(query_message)
+
+        # Everything after the last complete block that is older than the recent window stays verbatim.
+        total = len(self.store)
+        end_block = max(total - self.recent_messages, 0) // self.block_size
+        recent = self.store.Read(end_block * self.block_size, total)
+
+        kept = self._Keep(recent, remaining)
+        if len(kept) < len(recent) or end_block > -(-self.store.First() // self.block_size):
+            # Part of the history goes into the summary, so leave room for the longest one.
+            kept = self._Keep(recent, remaining - MessageTokens({"content": SummaryHeading}) - SummaryTokens)
+            # The summary reaches at least up to the oldest message kept verbatim, so recent
+            # messages that did not fit are folded into it instead of being dropped.
+            end_block = max(end_block, -(-(total - len(kept)) // self.block_size))
+
+        summary = self.Summary(end_block)
+        summary_messages = []
+        if summary:
+            summary_messages = [{"role": "system", "content": SummaryHeading + summary}]
+
+        return system_messages + summary_messages + kept + [query_message]
+
+    # Function to keep as many of the newest messages as `remaining` tokens allow.
+    @staticmethod
+    def _Keep(recent, remaining):
+        kept = []
+        for message in reversed(recent):
+            tokens = MessageTokens(message)
+            if tokens > remaining:
+                break
+            kept.append(message)
+            remaining -= tokens
+        kept.reverse()
+
+        # Never start the verbatim history with an assistant reply.
+        while kept and kept[0].get("role") != "user":
+            kept.pop(0)
+        return kept
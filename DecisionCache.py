@@ -0,0 +1,104 @@
+import os  # Import os for file path handling.
+import json  # Import json to store task lists.
+import time  # Import time for TTL and LRU bookkeeping.
+import sqlite3  # Import sqlite3 for a cache shared by every process.
+import threading  # Import threading to share one connection between threads.
+import unicodedata  # Import unicodedata to keep the letters and marks of every script.
+
+# Database file holding the cached decisions.
+DecisionCachePath = os.path.join("Data", "DecisionCache.sqlite")
+
+# Default lifetime of a cached decision in seconds (one week).
+DefaultTTL = 7 * 24 * 3600
+
+# Default maximum number of cached decisions.
+DefaultMaxEntries = 5000
+
+# Filler words that do not change what a query asks for.
+FillerWords = {"please", "jarvis", "hey", "ok", "okay", "kindly", "just", "now"}
+
+# Function to normalize a query so that near-identical phrasings share a cache entry.
+# Letters, combining marks and digits of any script are kept, so Hindi queries keep their vowel signs;
+# a query made only of filler words normalizes to "" and must not be cached.
+def NormalizeQuery(query):
+    text = "".join(c if c == "'" or unicodedata.category(c)[0] in "LMN" else " " for c in str(query).lower())
+    return " ".join(word for word in text.split() if word not in FillerWords)
+
+
+# Persistent LRU cache of FirstLayerDMM decisions with a TTL.
+#
+# The cache lives in SQLite so that every process of the assistant shares it.
+# Hit and miss counters are kept per process and in the database.
+class DecisionCache:
+
+    def __init__(self, path=DecisionCachePath, ttl=DefaultTTL, max_entries=DefaultMaxEntries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, tasks TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS decisions_last_used ON decisions (last_used)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    # Function to add to a counter, both in this process and in the database.
+    def _Count(self, name, amount=1):
+        self.stats[name] += amount
+        self.db.execute("INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    # Function to look up the decision for a query, returning None on a miss.
+    def Get(self, query):
+        key = NormalizeQuery(query)
+        if not key:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT tasks, created FROM decisions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._Count("misses")
+                return None
+
+            tasks, created = row
+            if now - created > self.ttl:
+                self.db.execute("DELETE FROM decisions WHERE key = ?", (key,))
+                self._Count("expired")
+                self._Count("misses")
+                return None
+
+            self.db.execute("UPDATE decisions SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._Count("hits")
+        return json.loads(tasks)
+
+    # Function to store the decision for a query and evict the least recently used entries.
+    def Put(self, query, tasks):
+        key = NormalizeQuery(query)
+        if not key:
+            return
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO decisions (key, tasks, created, last_used) VALUES (?, ?, ?, ?)", (key, json.dumps(tasks), now, now))
+            count = self.db.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+            if count > self.max_entries:
+                removed = self.db.execute("DELETE FROM decisions WHERE key IN (SELECT key FROM decisions ORDER BY last_used LIMIT ?)", (count - self.max_entries,)).rowcount
+                self._Count("evicted", removed)
+
+    # Function to remove every cached decision.
+    def Clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM decisions")
+
+    # Function to report hit and miss statistics, for this process and for all processes.
+    def Report(self):
+        with self.lock:
+            shared = dict(self.db.execute("SELECT name, value FROM stats").fetchall())
+            entries = self.db.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        lookups = self.stats["hits"] + self.stats["misses"]
+        shared_lookups = shared.get("hits", 0) + shared.get("misses", 0)
+        return {
+            "entries": entries,
+            "process": dict(self.stats, hit_rate=self.stats["hits"] / lookups if lookups else 0.0),
+            "shared": dict(shared, hit_rate=shared.get("hits", 0) / shared_lookups if shared_lookups else 0.0),
+        }
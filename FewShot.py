@@ -0,0 +1,123 @@
+import os  # Import os for file path handling.
+import json  # Import json to read the extra examples.
+import threading  # Import threading to guard the lazily built index.
+from Startup import Lazy  # Import the lazy import helper.
+from Vectorizer import HashingVectorizer  # Import the shared hashing TF-IDF vectorizer.
+from IntentClassifier import LabelledCorpus  # Import the labelled general and realtime queries.
+
+# numpy is loaded when the index is first built.
+np = Lazy("numpy")
+
+# File with extra examples, one {"query": ..., "decision": ...} object per line.
+ExamplesPath = os.path.join("Data", "FewShotExamples.jsonl")
+
+# Number of examples sent with every decision.
+DefaultK = 6
+
+# Labelled examples of every task kind, written the way the decision model should answer.
+CommandExamples = [
+    ("Hi Jarvis, how are you?", "general how are you"),
+    ("open chrome and tell me about Chandigarh University.", "open chrome, general tell me about Chandigarh University."),
+    ("open facebook, telegram and close whatsapp", "open facebook, open telegram, close whatsapp"),
+    ("open notepad", "open notepad"),
+    ("launch spotify and youtube", "open spotify, open youtube"),
+    ("close chrome", "close chrome"),
+    ("close notepad and telegram", "close notepad, close telegram"),
+    ("play a song", "play"),
+    ("play let her go", "play let her go"),
+    ("play afsanay by ys and shape of you", "play afsanay by ys, play shape of you"),
+    ("generate image of a cat", "generate image of a cat"),
+    ("generate image of a lion and a tiger", "generate image of a lion, generate image of a tiger"),
+    ("mute the system", "system mute the system"),
+    ("increase the volume", "system volume up"),
+    ("unmute and turn the volume down", "system unmute, system volume down"),
+    ("write a code for me", "content write a code for me"),
+    ("write an application for sick leave", "content application for sick leave"),
+    ("write an email to my boss and a poem about rain", "content email to my boss, content poem about rain"),
+    ("search for Python on Google", "google search search for Python on Google"),
+    ("google search best laptops of this year", "google search best laptops of this year"),
+    ("search for Python on YouTube", "youtube search search for Python on YouTube"),
+    ("find cooking videos on youtube", "youtube search cooking videos"),
+    ("set a reminder for 5 pm", "reminder set a reminder for 5 pm"),
+    ("set a reminder at 9:00pm on 25th june for my business meeting.", "reminder 9:00pm 25th june business meeting"),
+    ("goodbye Jarvis", "exit"),
+    ("bye jarvis.", "exit"),
+    ("open youtube and tell me today's news", "open youtube, realtime tell me today's news"),
+]
+
+# Short instructions for the decision model, used with the selected examples instead of the full preamble.
+CompactPreamble = """You are a Decision-Making Model. Decide what kind of query you are given; never answer it.
+Reply with comma separated tasks, one per action, each in one of these forms:
+general (query): a chatbot can answer it without up-to-date information; also questions about the time or date, and queries with a pronoun but no proper noun like 'who is he?'.
+realtime (query): it needs up-to-date information, or asks about a person, place, company, news, weather, prices or scores.
+open (app or website), close (app), play (song), generate image (prompt), reminder (datetime message), system (mute, unmute, volume up or volume down), content (topic), google search (topic), youtube search (topic).
+Split several actions into several tasks, like 'open facebook, open telegram, close whatsapp'.
+Reply 'exit' if the user says goodbye. If you cannot decide, reply 'general (query)'."""
+
+# Function to list the built-in examples as (query, decision) pairs.
+def BuiltinExamples():
+    return CommandExamples + [(text, f"{label} {text}") for text, label in LabelledCorpus]
+
+
+# Pool of labelled examples with a vector index that picks the examples
+# most similar to a query, so the decision model gets a few relevant
+# examples instead of the whole fixed chat history.
+class FewShotIndex:
+
+    def __init__(self, examples_path=ExamplesPath, k=DefaultK):
+        self.examples_path = examples_path
+        self.k = k
+        self.lock = threading.Lock()
+        self.examples = None
+        self.vectorizer = None
+        self.vectors = None
+
+    # Function to load the built-in examples plus the examples collected on disk.
+    def Examples(self):
+        examples = BuiltinExamples()
+        if os.path.exists(self.examples_path):
+            with open(self.examples_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        example = json.loads(line)
+                        examples.append((example["query"], example["decision"]))
+                    except (ValueError, KeyError):
+                        pass
+        return examples
+
+    # Function to build the index on first use.
+    def _Index(self):
+        with self.lock:
+            if self.vectorizer is None:
+                self.examples = self.Examples()
+                self.vectorizer = HashingVectorizer()
+                self.vectors = self.vectorizer.FitTransform([query for query, _ in self.examples])
+        return self.examples, self.vectorizer, self.vectors
+
+    # Function to add an example and rebuild the index on the next call.
+    def AddExample(self, query, decision):
+        os.makedirs(os.path.dirname(self.examples_path) or ".", exist_ok=True)
+        with open(self.examples_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"query": query, "decision": decision}) + "\n")
+        with self.lock:
+            self.vectorizer = None
+
+    # Function to pick the k examples most similar to a query, least similar first so the best one is nearest the query.
+    def Select(self, query, k=None):
+        examples, vectorizer, vectors = self._Index()
+        k = min(k or self.k, len(examples))
+        similarity = vectors @ vectorizer.Transform([query])[0]
+        best = np.argsort(-similarity, kind="stable")[:k]
+        return [examples[i] for i in reversed(best)]
+
+    # Function to build the Cohere chat history for a query from the selected examples.
+    def ChatHistory(self, query, k=None):
+        history = []
+        for example, decision in self.Select(query, k):
+            history.append({"role": "user", "message": example})
+            history.append({"role": "ChatBot", "message": decision})
+        return history
+
+
+# Shared index used by the decision model.
+index = FewShotIndex()
@@ -0,0 +1,139 @@
+import os  # Import os for file path handling.
+import sys  # Import sys to find the repository.
+import json  # Import json to write the machine-readable report.
+import time  # Import time to measure decision latency.
+import shutil  # Import shutil to remove the working folder.
+import argparse  # Import argparse for the command line options.
+import tempfile  # Import tempfile for an isolated working folder.
+import importlib  # Import importlib to load the decision model after it is configured.
+from ContextWindow import CountTokens  # Import the token estimate used for prompt budgets.
+from Benchmark import RepositoryDir, ReportDir, Summarize, CurrentCommit  # Import the benchmark helpers.
+
+# Held-out queries with the decision expected for each. None of them is in the example pool.
+HeldOut = [
+    ("what is the boiling point of water?", "general what is the boiling point of water?"),
+    ("can you explain recursion?", "general can you explain recursion?"),
+    ("how do i stay motivated?", "general how do i stay motivated?"),
+    ("what did she say about it?", "general what did she say about it?"),
+    ("what day is it today?", "general what day is it today?"),
+    ("thank you so much", "general thank you so much"),
+    ("who painted the mona lisa?", "general who painted the mona lisa?"),
+    ("who is sundar pichai", "realtime who is sundar pichai"),
+    ("what is the weather in mumbai right now?", "realtime what is the weather in mumbai right now?"),
+    ("tell me the latest cricket score", "realtime tell me the latest cricket score"),
+    ("what is the price of tesla stock today?", "realtime what is the price of tesla stock today?"),
+    ("what are today's top headlines?", "realtime what are today's top headlines?"),
+    ("open whatsapp", "open whatsapp"),
+    ("open instagram and gmail", "open instagram, open gmail"),
+    ("close spotify", "close spotify"),
+    ("play believer by imagine dragons", "play believer by imagine dragons"),
+    ("generate image of a sunset over mountains", "generate image of a sunset over mountains"),
+    ("turn the volume down", "system volume down"),
+    ("mute", "system mute"),
+    ("write a leave application for tomorrow", "content leave application for tomorrow"),
+    ("write a python script to sort a list", "content python script to sort a list"),
+    ("search machine learning courses on google", "google search machine learning courses"),
+    ("search lofi music on youtube", "youtube search lofi music"),
+    ("remind me at 7 am to go jogging", "reminder 7 am go jogging"),
+    ("see you later jarvis", "exit"),
+    ("open telegram and close chrome", "open telegram, close chrome"),
+    ("play some music and open notepad", "play some music, open notepad"),
+    ("write a poem about the moon and open notepad", "content poem about the moon, open notepad"),
+]
+
+# Function to normalize one task for comparison.
+def NormalizeTask(task):
+    return " ".join(task.lower().strip(" .?!").split())
+
+# Function to get the kind of a task, such as "open" or "generate image".
+def TaskKind(task, kinds):
+    return next((kind for kind in sorted(kinds, key=len, reverse=True) if task.startswith(kind)), task)
+
+# Function to count the tokens of the prompt sent for a query.
+def PromptTokens(preamble, history, query):
+    return CountTokens(preamble) + sum(CountTokens(turn["message"]) + 4 for turn in history) + CountTokens(query)
+
+
+# Harness comparing the static decision prompt with the compact one with picked examples.
+class FewShotEval:
+
+    def __init__(self, queries=HeldOut):
+        self.queries = queries
+        self.Model = importlib.import_module("Model")
+
+    # Function to evaluate one prompt style, optionally without calling the model.
+    def Run(self, dynamic, offline=False):
+        tokens, selection, latencies, exact, kind = [], [], [], 0, 0
+        for query, expected in self.queries:
+            start = time.perf_counter()
+            preamble, history = self.Model.DecisionPrompt(query, dynamic)
+            selection.append(time.perf_counter() - start)
+            tokens.append(PromptTokens(preamble, history, query))
+            if offline:
+                continue
+
+            start = time.perf_counter()
+            decision = self.Model.AskDecisionModel(query, dynamic)
+            latencies.append(time.perf_counter() - start)
+            wanted = [NormalizeTask(task) for task in expected.split(",")]
+            got = [NormalizeTask(task) for task in decision]
+            exact += got == wanted
+            kind += [TaskKind(task, self.Model.funcs) for task in got] == [TaskKind(task, self.Model.funcs) for task in wanted]
+
+        report = {"style": "dynamic" if dynamic else "static", "queries": len(self.queries),
+                  "prompt_tokens": Summarize(tokens), "prompt_build": Summarize(selection)}
+        if not offline:
+            report.update(latency=Summarize(latencies), exact_accuracy=exact / len(self.queries),
+                          kind_accuracy=kind / len(self.queries))
+        return report
+
+
+# Function to print the two styles next to each other.
+def PrintReport(report):
+    print(f"{'style':<9}{'tokens':>8}{'build ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'exact':>8}{'kind':>8}")
+    for run in report["runs"]:
+        line = f"{run['style']:<9}{run['prompt_tokens']['mean']:>8.0f}{run['prompt_build']['p50'] * 1000:>10.2f}"
+        if "latency" in run:
+            line += (f"{run['latency']['p50'] * 1000:>9.0f}{run['latency']['p95'] * 1000:>9.0f}"
+                     f"{run['exact_accuracy']:>8.0%}{run['kind_accuracy']:>8.0%}")
+        print(line)
+
+# Entry point to run the evaluation, against the configured Cohere API or the local stand-ins.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the static and the few-shot decision prompts.")
+    parser.add_argument("--offline", action="store_true", help="only compare prompt sizes, without calling the model")
+    parser.add_argument("--mock", action="store_true", help="call the local stand-in providers instead of Cohere")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=4000, help="prompt reading speed of the stand-in")
+    parser.add_argument("--output", help="report file, by default Data/Benchmarks/fewshot-<commit>-<time>.json")
+    options = parser.parse_args()
+
+    providers = None
+    workdir = None
+    if options.mock:
+        from MockProviders import MockProviders
+        providers = MockProviders({"prefill_tokens_per_second": options.prefill_tokens_per_second, "first_token_latency": 0.1})
+        providers.Start()
+        import Startup
+        Startup.Env().update(providers.Env(), CohereRatePerMinute="100000")
+        # Work in an empty folder so the caches of the real assistant are left alone.
+        workdir = tempfile.mkdtemp(prefix="jarvis-fewshot-")
+        os.makedirs(os.path.join(workdir, "Data"))
+        os.chdir(workdir)
+        sys.path.insert(0, RepositoryDir)
+
+    try:
+        evaluation = FewShotEval()
+        report = {"commit": CurrentCommit(), "timestamp": time.time(), "mock": options.mock,
+                  "runs": [evaluation.Run(dynamic, options.offline) for dynamic in (False, True)]}
+    finally:
+        if providers:
+            providers.Stop()
+            os.chdir(RepositoryDir)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = options.output or os.path.join(ReportDir, f"fewshot-{report['commit'] or 'unknown'}-{int(report['timestamp'])}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    PrintReport(report)
+    print(f"Report written to {output}")
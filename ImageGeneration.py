@@ -1,89 +1,353 @@
 import asyncio
 from random import randint
-from PIL import Image
-import requests
-from dotenv import get_key
+from Startup import Env, Lazy
 import os
-from time import sleep
+import socket
+import json
+import time
+import uuid
+import hashlib
+import shutil
+from ImagePostProcess import post_process, post_process_async
+from LocalAuth import GetToken, ParseRequest
+
+# Pillow and requests are loaded on first use so the worker client stays light
+Image = Lazy("PIL.Image")
+requests = Lazy("requests")
 
 # Function to open and display images based on a given prompt.
-def open_images(prompt):
+def open_images(prompt, paths=None):
     folder_path = r"Data"  # Folder where the images are stored
-    prompt = prompt.replace(" ","_")  # Replace spaces in prompt with underscores
-    
-    # Generate the filenames for the images
-    Files = [f"{prompt}{i}.jpg" for i in range(1, 5)]
-    
-    for jpg_file in Files:
-        image_path = os.path.join(folder_path, jpg_file)
-        
-        try:
-            # Try to open and display the image
-            img = Image.open(image_path)
-            print(f"Opening image: {image_path}")
-            img.show()
-            sleep(1)  # Pause for 1 second before showing the next image
-            
-        except IOError:
-            print(f"Unable to open {image_path}")
+
+    if paths is None:
+        prompt = prompt.replace(" ","_")  # Replace spaces in prompt with underscores
+
+        # Generate the filenames for the images
+        Files = [f"{prompt}{i}.jpg" for i in range(1, ImageVariants + 1)]
+        paths = [os.path.join(folder_path, jpg_file) for jpg_file in Files]
+        paths = [path for path in paths if os.path.exists(path)]
+
+    # Verify and downscale the images in the process pool, then show one pre-rendered preview
+    preview = post_process(paths)
+    for result in preview["images"]:
+        if not result["valid"]:
+            print(f"Unable to open {result['path']}")
+
+    if preview["contact_sheet"]:
+        print(f"Opening preview: {preview['contact_sheet']}")
+        show_image(preview["contact_sheet"])
+    return preview
+
+# Function to open a single image in the default viewer
+def show_image(path):
+    with Image.open(path) as img:
+        img.show()
             
+# Load environment variables from the .env file.
+env_vars = Env()
+
 # API details for the Hugging face Stable Diffusion model
-API_URL = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
-headers = {"Authorization": f"Bearer {get_key('.env', 'HuggingFaceAPIKey')}"}
+API_URL = env_vars.get("ImageAPIURL") or "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-xl-base-1.0"
+headers = {"Authorization": f"Bearer {env_vars.get('HuggingFaceAPIKey')}"}
+
+# Number of images generated per prompt and how many requests may run at once
+ImageVariants = int(env_vars.get("ImageVariants") or 4)
+ImageConcurrency = int(env_vars.get("ImageConcurrency") or 2)
+
+# Folder of generated images, named after a hash of prompt and seed
+ImageCacheDir = os.path.join("Data", "ImageCache")
+
+# Leading bytes of the image formats the endpoint may return
+ImageSignatures = {b"\xff\xd8\xff": ".jpg", b"\x89PNG\r\n\x1a\n": ".png", b"GIF8": ".gif"}
+
+# Shared HTTP session so the image requests reuse connections, created on first use
+_session = None
+
+# Function to get the shared HTTP session
+def get_session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+# Error raised when the endpoint returns something that is not an image
+class ImageGenerationError(Exception):
+    pass
+
+# Function to pick the seed of a variant, the same prompt always gets the same seeds
+def variant_seed(prompt: str, index: int):
+    return int(hashlib.sha256(f"{prompt}:{index}".encode("utf-8")).hexdigest()[:8], 16) % 1000000
+
+# Function to get the cache path stem of a prompt and seed
+def cache_stem(prompt: str, seed: int):
+    return os.path.join(ImageCacheDir, hashlib.sha256(f"{prompt}\0{seed}".encode("utf-8")).hexdigest())
+
+# Function to find an already generated image for a prompt and seed
+def cached_image(prompt: str, seed: int):
+    stem = cache_stem(prompt, seed)
+    for extension in set(ImageSignatures.values()) | {".webp"}:
+        if os.path.exists(stem + extension):
+            return stem + extension
+    return None
+
+# Function to check that the bytes really are an image, returning the file extension
+def image_extension(data: bytes):
+    for signature, extension in ImageSignatures.items():
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    return None
 
 # Async function to send a query to the Hugging Face API
 async def query(payload):
-    response = await asyncio.to_thread(requests.post, API_URL, headers=headers, json=payload)
+    response = await asyncio.to_thread(get_session().post, API_URL, headers=headers, json=payload, timeout=120)
     return response.content
 
+# Async function to generate one variant, using the cache when the prompt and seed were seen before
+async def generate_variant(prompt: str, seed: int, limit: asyncio.Semaphore):
+    path = cached_image(prompt, seed)
+    if path:
+        return path
+
+    payload = {
+        "inputs": f"{prompt},quality=4k, sharpness=maximum, Ultra High details, high resolution, seed = {seed}",
+    }
+    async with limit:
+        image_bytes = await query(payload)
+
+    # Error responses come back as JSON and must never be saved as an image
+    extension = image_extension(image_bytes)
+    if extension is None:
+        raise ImageGenerationError(image_bytes[:200].decode("utf-8", "replace"))
+
+    os.makedirs(ImageCacheDir, exist_ok=True)
+    path = cache_stem(prompt, seed) + extension
+    with open(path + ".tmp", "wb") as f:
+        f.write(image_bytes)
+    os.replace(path + ".tmp", path)
+    return path
+
+# Async generator that yields (variant number, image path or error) as soon as each variant is ready
+async def generate_images_as_completed(prompt: str, variants: int = None, fresh: bool = False):
+    variants = variants or ImageVariants
+    limit = asyncio.Semaphore(ImageConcurrency)
+    seeds = [randint(0, 1000000) if fresh else variant_seed(prompt, i) for i in range(variants)]
+
+    async def numbered(index, seed):
+        try:
+            return index, await generate_variant(prompt, seed, limit)
+        except Exception as e:
+            return index, e
+
+    tasks = [asyncio.create_task(numbered(i + 1, seed)) for i, seed in enumerate(seeds)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
 # Async function to generate images based on the given prompt
-async def generate_images(prompt: str):
-    tasks = []
-    
-    # Create 4 image generation tasks
-    for _ in range(4):
-        payload = {
-            "inputs": f"{prompt},quality=4k, sharpness=maximum, Ultra High details, high resolution, seed = {randint(0,1000000)}",
-        }
-        task = asyncio.create_task(query(payload))
-        tasks.append(task)
-        
-    # wait for all tasks to complete
-    image_bytes_list = await asyncio.gather(*tasks)
-    
-    # Save the generated images to files
-    for i, image_bytes in enumerate(image_bytes_list):
-        with open(fr"Data\{prompt.replace(' ','_')}{i + 1}.jpg", "wb") as f:
-            f.write(image_bytes)
+async def generate_images(prompt: str, variants: int = None, on_image=None):
+    paths = []
+    async for index, result in generate_images_as_completed(prompt, variants):
+        if isinstance(result, Exception):
+            print(f"Image {index} for '{prompt}' failed: {result}")
+            continue
+
+        # Keep the old file names as well so existing readers find the images
+        legacy_path = fr"Data\{prompt.replace(' ','_')}{index}.jpg"
+        shutil.copyfile(result, legacy_path)
+        paths.append(result)
+        if on_image:
+            on_image(index, result)
+
+    if not paths:
+        raise ImageGenerationError(f"no image could be generated for '{prompt}'")
+    return paths
             
 # Wrapper function to generate and open images
 def GenerateImages(prompt: str):
-    asyncio.run(generate_images(prompt))  # Run the async image generation
-    open_images(prompt)  # Open the generated images
-    
-# Main loop to monitor for image generation requests
-while True:
+    paths = asyncio.run(generate_images(prompt))  # Run the async image generation
+    return open_images(prompt, paths)  # Open the preview of the generated images
     
+# Address of the image generation worker and the number of jobs it runs at once.
+WorkerHost = "127.0.0.1"
+WorkerPort = int(env_vars.get("ImageWorkerPort") or 8770)
+WorkerConcurrency = int(env_vars.get("ImageWorkers") or 2)
+
+# Seconds a finished job is kept for status requests before it is forgotten.
+JobTTL = float(env_vars.get("ImageJobTTL") or 3600)
+
+# File the frontend used to write requests to, read once at startup for compatibility.
+LegacyRequestFile = r"Frontend\Files\ImageGeneration.data"
+
+# Long-lived image generation worker.
+#
+# Clients connect over a local socket and send one JSON object per line, each
+# with the per-install token from LocalAuth as "token"; a connection that
+# sends anything else, such as an HTTP request from a browser, is closed:
+#   {"op": "submit", "prompt": "..."}  -> {"id": "...", "status": "queued"}
+#   {"op": "status", "id": "..."}      -> the job with its current status
+#   {"op": "wait", "id": "..."}        -> the job once it has finished
+#   {"op": "list"}                     -> every job
+# Jobs wait in a queue and several of them run at once, finished jobs are
+# forgotten after `job_ttl` seconds. While idle the worker only waits on the
+# socket and the queue, so it uses no CPU.
+class ImageWorker:
+
+    def __init__(self, concurrency=WorkerConcurrency, job_ttl=JobTTL):
+        self.concurrency = concurrency
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.done = {}
+        self.queue = None
+        self.token = None
+
+    # Function to forget the jobs that finished more than job_ttl seconds ago.
+    def _Prune(self):
+        expired = time.time() - self.job_ttl
+        for job_id in [job["id"] for job in self.jobs.values() if job["finished"] is not None and job["finished"] < expired]:
+            del self.jobs[job_id]
+            del self.done[job_id]
+
+    # Function to add a job to the queue and return it.
+    def Submit(self, prompt):
+        self._Prune()
+        job = {"id": uuid.uuid4().hex[:12], "prompt": prompt, "status": "queued", "error": None, "files": [], "preview": None,
+               "submitted": time.time(), "started": None, "finished": None}
+        self.jobs[job["id"]] = job
+        self.done[job["id"]] = asyncio.Event()
+        self.queue.put_nowait(job["id"])
+        return job
+
+    # Function run by each worker task: take jobs from the queue and generate them.
+    async def Work(self):
+        while True:
+            job = self.jobs[await self.queue.get()]
+            job["status"] = "running"
+            job["started"] = time.time()
+            print(f"Generating Images for job {job['id']}: {job['prompt']}")
+            try:
+                # Each image shows up in the job status as soon as it is saved
+                paths = await generate_images(job["prompt"], on_image=lambda index, path: job["files"].append(path))
+
+                # Build the thumbnails and the contact sheet in the process pool and show the sheet
+                preview = await post_process_async(paths)
+                job["preview"] = preview["contact_sheet"]
+                if job["preview"]:
+                    await asyncio.to_thread(show_image, job["preview"])
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                print(f"Image job {job['id']} failed: {e}")
+            finally:
+                job["finished"] = time.time()
+                self.done[job["id"]].set()
+                self.queue.task_done()
+
+    # Function to answer one request from a client.
+    async def Handle(self, request):
+        op = request.get("op")
+        if op == "submit" and request.get("prompt"):
+            return self.Submit(request["prompt"])
+        if op in ("status", "wait"):
+            job = self.jobs.get(request.get("id"))
+            if job is None:
+                return {"error": "unknown job"}
+            if op == "wait":
+                await self.done[job["id"]].wait()
+            return job
+        if op == "list":
+            self._Prune()
+            return list(self.jobs.values())
+        return {"error": "unknown request"}
+
+    # Function to serve one client connection, which may send several requests.
+    async def Serve(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                request, error = ParseRequest(line, self.token)
+                reply = {"error": error} if error else await self.Handle(request)
+                writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+                await writer.drain()
+                if error:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # Function to create the queue and start the worker tasks in the running event loop.
+    def Start(self):
+        self.queue = asyncio.Queue()
+        return [asyncio.create_task(self.Work()) for _ in range(self.concurrency)]
+
+    # Function to start the worker tasks and the socket server and run forever.
+    async def Run(self, prompts=(), host=WorkerHost, port=WorkerPort):
+        workers = self.Start()
+        self.token = GetToken()
+        server = await asyncio.start_server(self.Serve, host, port)
+
+        # Queue the prompts handed over at startup.
+        for prompt in prompts:
+            self.Submit(prompt)
+
+        print(f"Image generation worker listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+        for worker in workers:
+            worker.cancel()
+
+# Function to read and reset a pending request from the legacy file, returning its prompt.
+def ReadLegacyRequest():
     try:
-        # Read the status and prompt from the data file
-        with open(r"Frontend\Files\ImageGeneration.data", "r") as f:
+        with open(LegacyRequestFile, "r") as f:
             Data: str = f.read()
-            
-        Prompt, Status = Data.split(",")
-        
-        # If the status indicates an image generation request
-        if Status == "True":
-            print("Generating Images...")
-            ImageStatus = GenerateImages(prompt=Prompt)
-            
-            # Reset the status in the file after generating images
-            with open(r"Frontend\Files\ImageGeneration.data", "w") as f:
-                f.write("False,False")
-                break  # Exit the loop after processing the request
-        
+        Prompt, Status = Data.rsplit(",", 1)
+    except (OSError, ValueError):
+        return None
+
+    if Status.strip() != "True":
+        return None
+    with open(LegacyRequestFile, "w") as f:
+        f.write("False,False")
+    return Prompt
+
+# Function to send one request to the running worker and return its reply.
+def WorkerRequest(request, host=WorkerHost, port=WorkerPort, timeout=None):
+    token = GetToken()
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        connection.sendall((json.dumps(dict(request, token=token)) + "\n").encode("utf-8"))
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply)
+
+# Function to queue an image generation job on the running worker, returning its job id.
+def SubmitImageJob(prompt):
+    return WorkerRequest({"op": "submit", "prompt": prompt}, timeout=5)["id"]
+
+# Function to get the status of a job.
+def ImageJobStatus(job_id):
+    return WorkerRequest({"op": "status", "id": job_id}, timeout=5)
+
+# Start the worker when run as a script. If a worker is already running, hand
+# it the legacy request instead so launching this script per request still works.
+if __name__ == "__main__":
+    prompt = ReadLegacyRequest()
+    try:
+        WorkerRequest({"op": "list"}, timeout=1)
+    except OSError:
+        # No worker yet: become the worker and start with the legacy request.
+        asyncio.run(ImageWorker().Run([prompt] if prompt else []))
+    else:
+        if prompt:
+            print(f"Queued image job {SubmitImageJob(prompt)}")
         else:
-            sleep(1)  # wait for 1 second before checking again
-            
-    except:
-        pass
-    
\ No newline at end of file
+            print("Image generation worker is already running.")
@@ -0,0 +1,108 @@
+import os
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from Startup import Lazy
+
+# Pillow is loaded on first use, in each worker process
+Image = Lazy("PIL.Image")
+
+# Folder where thumbnails, re-encoded images and contact sheets are cached
+PreviewDir = os.path.join("Data", "ImagePreview")
+
+# Longest side of a thumbnail in pixels
+ThumbnailSize = 384
+
+# Quality used when re-encoding images to WebP
+WebPQuality = 80
+
+# Shared process pool, created on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+# Function to get the shared process pool for image work
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+    return _pool
+
+# Function to hash the content of a file
+def file_digest(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function run in a worker process: verify one image, make its thumbnail and optionally a smaller WebP copy.
+# Outputs are named after the image content, so work already done is found on disk and skipped.
+def process_image(path: str, thumbnail_size: int = ThumbnailSize, reencode: bool = False):
+    result = {"path": path, "valid": False, "thumbnail": None, "reencoded": None, "error": None}
+    try:
+        digest = file_digest(path)
+
+        # verify() checks the file structure but leaves the image unusable, so it is opened again after.
+        with Image.open(path) as img:
+            img.verify()
+
+        os.makedirs(PreviewDir, exist_ok=True)
+        thumbnail = os.path.join(PreviewDir, f"{digest}_{thumbnail_size}.jpg")
+        reencoded = os.path.join(PreviewDir, f"{digest}.webp")
+
+        if not os.path.exists(thumbnail) or reencode and not os.path.exists(reencoded):
+            with Image.open(path) as img:
+                img = img.convert("RGB")
+                if reencode and not os.path.exists(reencoded):
+                    img.save(reencoded + ".tmp", "WEBP", quality=WebPQuality)
+                    os.replace(reencoded + ".tmp", reencoded)
+                if not os.path.exists(thumbnail):
+                    img.thumbnail((thumbnail_size, thumbnail_size))
+                    img.save(thumbnail + ".tmp", "JPEG", quality=85)
+                    os.replace(thumbnail + ".tmp", thumbnail)
+
+        result.update(valid=True, thumbnail=thumbnail, reencoded=reencoded if reencode else None)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+# Function run in a worker process: paste thumbnails into one grid image
+def contact_sheet(thumbnails: list, thumbnail_size: int = ThumbnailSize):
+    key = hashlib.sha256("\0".join(thumbnails).encode("utf-8")).hexdigest()
+    path = os.path.join(PreviewDir, f"sheet_{key}.jpg")
+    if os.path.exists(path):
+        return path
+
+    columns = 2 if len(thumbnails) <= 4 else 3
+    rows = -(-len(thumbnails) // columns)
+    gap = 8
+    sheet = Image.new("RGB", (columns * (thumbnail_size + gap) + gap, rows * (thumbnail_size + gap) + gap), (20, 20, 20))
+    for i, thumbnail in enumerate(thumbnails):
+        with Image.open(thumbnail) as img:
+            x = gap + (i % columns) * (thumbnail_size + gap) + (thumbnail_size - img.width) // 2
+            y = gap + (i // columns) * (thumbnail_size + gap) + (thumbnail_size - img.height) // 2
+            sheet.paste(img, (x, y))
+
+    os.makedirs(PreviewDir, exist_ok=True)
+    sheet.save(path + ".tmp", "JPEG", quality=85)
+    os.replace(path + ".tmp", path)
+    return path
+
+# Async function to post-process images in the process pool, returning per-image results and the contact sheet
+async def post_process_async(paths: list, reencode: bool = False):
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    results = await asyncio.gather(*[loop.run_in_executor(pool, process_image, path, ThumbnailSize, reencode) for path in paths])
+    thumbnails = [r["thumbnail"] for r in results if r["valid"]]
+    sheet = await loop.run_in_executor(pool, contact_sheet, thumbnails) if thumbnails else None
+    return {"images": list(results), "contact_sheet": sheet}
+
+# Function to post-process images from synchronous code
+def post_process(paths: list, reencode: bool = False):
+    pool = get_pool()
+    results = list(pool.map(process_image, paths, [ThumbnailSize] * len(paths), [reencode] * len(paths)))
+    thumbnails = [r["thumbnail"] for r in results if r["valid"]]
+    sheet = pool.submit(contact_sheet, thumbnails).result() if thumbnails else None
+    return {"images": results, "contact_sheet": sheet}
@@ -0,0 +1,411 @@
+import os  # Import os for file path handling.
+import re  # Import re for the command patterns.
+import json  # Import json to read and write the labelled corpus.
+import time  # Import time to measure classification latency.
+import threading  # Import threading to guard the lazily trained model.
+from Startup import Lazy  # Import the lazy import helper.
+from Vectorizer import HashingVectorizer, Tokenize  # Import the shared hashing TF-IDF vectorizer.
+
+# numpy is loaded when the model is first trained.
+np = Lazy("numpy")
+
+# File with extra labelled examples, one {"text": ..., "label": ...} object per line.
+CorpusPath = os.path.join("Data", "IntentCorpus.jsonl")
+
+# Confidence below which FirstLayerDMM asks the LLM instead.
+DefaultThreshold = 0.75
+
+# Confidence of a verb carried over to a bare name, as in "open facebook, telegram", kept below the
+# threshold so the LLM confirms it.
+InheritedConfidence = 0.7
+
+# Number of collected examples kept per label; the oldest are dropped first.
+MaxExamplesPerLabel = 200
+
+# Number of collected examples added before the model is retrained.
+RefitBatch = 20
+
+# Built-in labelled corpus for queries that are not commands.
+LabelledCorpus = [
+    ("who was akbar?", "general"),
+    ("how can i study more effectively?", "general"),
+    ("can you help me with this math problem?", "general"),
+    ("thanks, i really liked it.", "general"),
+    ("what is python programming language?", "general"),
+    ("who is he?", "general"),
+    ("what's his networth?", "general"),
+    ("tell me more about him.", "general"),
+    ("what's the time?", "general"),
+    ("how are you?", "general"),
+    ("do you like burgers?", "general"),
+    ("explain the theory of relativity.", "general"),
+    ("what is the capital of france?", "general"),
+    ("how does photosynthesis work?", "general"),
+    ("tell me a joke.", "general"),
+    ("what is machine learning?", "general"),
+    ("how do i make pasta?", "general"),
+    ("what is the meaning of life?", "general"),
+    ("give me some tips for a job interview.", "general"),
+    ("who wrote romeo and juliet?", "general"),
+    ("what is the difference between python and java?", "general"),
+    ("how far is the moon from the earth?", "general"),
+    ("why is the sky blue?", "general"),
+    ("translate hello into french.", "general"),
+    ("what can you do?", "general"),
+    ("what's your name?", "general"),
+    ("tell me a story.", "general"),
+    ("how do computers work?", "general"),
+    ("what is an algorithm?", "general"),
+    ("who invented the telephone?", "general"),
+    ("who is indian prime minister", "realtime"),
+    ("tell me about facebook's recent update.", "realtime"),
+    ("tell me news about coronavirus.", "realtime"),
+    ("who is akshay kumar", "realtime"),
+    ("what is today's news?", "realtime"),
+    ("what is today's headline?", "realtime"),
+    ("what is the weather in delhi today?", "realtime"),
+    ("what is the price of bitcoin?", "realtime"),
+    ("who won the match yesterday?", "realtime"),
+    ("what is the latest iphone?", "realtime"),
+    ("who is the ceo of tesla?", "realtime"),
+    ("what is the stock price of apple?", "realtime"),
+    ("who is elon musk", "realtime"),
+    ("tell me about chandigarh university.", "realtime"),
+    ("what is the current population of india?", "realtime"),
+    ("who is the president of the united states?", "realtime"),
+    ("what are the trending topics on twitter?", "realtime"),
+    ("what's the score of the cricket match?", "realtime"),
+    ("when is the next election?", "realtime"),
+    ("tell me about virat kohli", "realtime"),
+    ("what movies are releasing this week?", "realtime"),
+    ("what is the gold rate today?", "realtime"),
+    ("who is taylor swift", "realtime"),
+    ("what happened in the world today?", "realtime"),
+]
+
+# Command phrases, mapped to the task category and an optional fixed task.
+CommandPhrases = {
+    "open": ("open", None), "launch": ("open", None),
+    "close": ("close", None), "quit": ("close", None), "terminate": ("close", None),
+    "play": ("play", None), "play the song": ("play", None), "play song": ("play", None),
+    "mute": ("system", "system mute"), "mute the system": ("system", "system mute"),
+    "mute the volume": ("system", "system mute"), "mute volume": ("system", "system mute"),
+    "unmute": ("system", "system unmute"), "unmute the system": ("system", "system unmute"),
+    "unmute the volume": ("system", "system unmute"),
+    "volume up": ("system", "system volume up"), "increase the volume": ("system", "system volume up"),
+    "increase volume": ("system", "system volume up"), "turn up the volume": ("system", "system volume up"),
+    "volume down": ("system", "system volume down"), "decrease the volume": ("system", "system volume down"),
+    "decrease volume": ("system", "system volume down"), "lower the volume": ("system", "system volume down"),
+    "turn down the volume": ("system", "system volume down"),
+    "generate image": ("generate image", None), "generate an image": ("generate image", None),
+    "generate a image": ("generate image", None), "create an image": ("generate image", None),
+    "create image": ("generate image", None), "make an image": ("generate image", None),
+    "draw a picture of": ("generate image", None), "draw an image of": ("generate image", None),
+    "draw me a picture of": ("generate image", None),
+    "write": ("content", None), "write a": ("content", None), "write an": ("content", None),
+    "draft": ("content", None), "draft a": ("content", None), "draft an": ("content", None),
+    "compose": ("content", None), "compose a": ("content", None), "content": ("content", None),
+    "google search": ("google search", None),
+    "search google for": ("google search", None), "search on google for": ("google search", None),
+    "youtube search": ("youtube search", None), "search youtube for": ("youtube search", None),
+    "search on youtube for": ("youtube search", None),
+    "set a reminder": ("reminder", None), "set reminder": ("reminder", None),
+    "remind me": ("reminder", None), "reminder": ("reminder", None),
+    "bye": ("exit", "exit"), "goodbye": ("exit", "exit"), "good bye": ("exit", "exit"),
+    "exit": ("exit", "exit"), "see you later": ("exit", "exit"),
+}
+
+# Categories whose verb carries over to following bare names after a comma, as in "open facebook, telegram".
+InheritableCategories = {"open", "close", "play", "google search", "youtube search", "content", "generate image"}
+
+# Words that are dropped from the start of a command.
+PolitePrefixes = ["hey jarvis", "ok jarvis", "jarvis", "please", "can you", "could you", "would you", "will you", "kindly"]
+
+# Pattern for "search <topic> on google / youtube".
+SearchOnPattern = re.compile(r"^(?:search|look up|find)(?: for)? (.+?) on (google|youtube)$")
+
+# Separators between tasks in a single utterance.
+SeparatorPattern = re.compile(r"(\s*[,;]\s*(?:and\s+)?|\s+and then\s+|\s+then\s+|\s+and\s+|\s+also\s+)")
+
+# Queries that are answered from the local clock are always general.
+ClockPattern = re.compile(r"^(?:what(?:'s| is)?|tell me)(?: the)? (?:current )?(?:time|date|day|month|year)(?: is it)?(?: today| now| right now)?$")
+
+# Words that mark a query as needing up-to-date information.
+RealtimeWords = {"news", "headline", "headlines", "latest", "current", "currently", "today's", "recent", "recently",
+                 "update", "updates", "score", "weather", "stock", "price", "trending", "yesterday", "tonight"}
+
+# Words that start a question or a remark rather than a name.
+QuestionWords = {"what", "what's", "who", "who's", "whom", "whose", "when", "where", "which", "why", "how", "is", "are",
+                 "was", "were", "do", "does", "did", "can", "could", "should", "would", "will", "tell", "explain",
+                 "thank", "thanks", "hi", "hello", "ok", "okay", "yes", "no"}
+
+# Pronouns that make a query a follow-up that the chatbot answers from history.
+FollowUpWords = {"he", "she", "him", "his", "her", "hers", "they", "them", "their", "it", "its", "that", "this"}
+
+# Counters for hit rate and latency reporting.
+Stats = {"local": 0, "llm": 0, "local_time": 0.0, "llm_time": 0.0}
+
+
+# Word trie for the command phrases, it finds the longest phrase at the start of a command.
+class PhraseTrie:
+
+    def __init__(self, phrases):
+        self.root = {}
+        for phrase, value in phrases.items():
+            node = self.root
+            for word in phrase.split():
+                node = node.setdefault(word, {})
+            node[None] = value
+
+    # Function to find the longest phrase at the start of a list of words.
+    def Match(self, words):
+        node = self.root
+        best = None
+        for i, word in enumerate(words):
+            node = node.get(word)
+            if node is None:
+                break
+            if None in node:
+                best = (node[None], i + 1)
+        return best
+
+
+# Local classifier that turns an utterance into the same task list as FirstLayerDMM.
+class IntentClassifier:
+
+    def __init__(self, corpus_path=CorpusPath, k=5):
+        self.corpus_path = corpus_path
+        self.k = k
+        self.trie = PhraseTrie(CommandPhrases)
+        self.lock = threading.Lock()
+        self.vectorizer = None
+        self.vectors = None
+        self.labels = None
+        self.known = None
+        self.added = 0
+
+    # Function to load the examples collected on disk, without repeats and the newest ones per label.
+    def Collected(self):
+        examples = {}
+        if os.path.exists(self.corpus_path):
+            with open(self.corpus_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        example = json.loads(line)
+                        text = " ".join(example["text"].lower().split())
+                        # A later label for the same text replaces the earlier one.
+                        examples.pop(text, None)
+                        examples[text] = example["label"]
+                    except (ValueError, KeyError, AttributeError):
+                        pass
+        kept, counts = [], {}
+        for text, label in reversed(list(examples.items())):
+            counts[label] = counts.get(label, 0) + 1
+            if counts[label] <= MaxExamplesPerLabel:
+                kept.append((text, label))
+        return kept[::-1]
+
+    # Function to load the built-in corpus plus the examples collected on disk.
+    def Corpus(self):
+        return list(LabelledCorpus) + self.Collected()
+
+    # Function to train the nearest neighbour model on first use.
+    def _Model(self):
+        with self.lock:
+            if self.vectorizer is None:
+                texts, labels = zip(*self.Corpus())
+                self.vectorizer = HashingVectorizer()
+                self.vectors = self.vectorizer.FitTransform(list(texts))
+                self.labels = np.array(labels)
+        return self.vectorizer, self.vectors, self.labels
+
+    # Function to add a labelled example, returning whether it was new.
+    # The model is retrained once RefitBatch new examples have been added, and
+    # the file is rewritten without the oldest examples when it grows too long.
+    def AddExample(self, text, label):
+        text = " ".join(text.lower().split())
+        with self.lock:
+            if self.known is None:
+                self.known = {text: label for text, label in self.Corpus()}
+            if not text or self.known.get(text) == label:
+                return False
+            self.known[text] = label
+            self.added += 1
+
+            os.makedirs(os.path.dirname(self.corpus_path) or ".", exist_ok=True)
+            with open(self.corpus_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"text": text, "label": label}) + "\n")
+
+            if self.added >= RefitBatch:
+                self.added = 0
+                collected = self.Collected()
+                with open(self.corpus_path, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps({"text": text, "label": label}) + "\n" for text, label in collected)
+                self.known = {text: label for text, label in list(LabelledCorpus) + collected}
+                self.vectorizer = None
+        return True
+
+    # Function to strip polite words and trailing punctuation from a command.
+    @staticmethod
+    def _Clean(text):
+        text = text.strip().rstrip(".!?").strip()
+        lowered = text.lower()
+        changed = True
+        while changed:
+            changed = False
+            for prefix in PolitePrefixes:
+                if lowered == prefix or lowered.startswith(prefix + " ") or lowered.startswith(prefix + ","):
+                    text = text[len(prefix):].lstrip(" ,")
+                    lowered = text.lower()
+                    changed = True
+        return text
+
+    # Function to match a command phrase, returning (category, task) or None.
+    def MatchCommand(self, text):
+        text = self._Clean(text)
+        lowered = text.lower()
+        if not lowered:
+            return None
+
+        match = SearchOnPattern.match(lowered)
+        if match:
+            return f"{match.group(2)} search", f"{match.group(2)} search {text[match.start(1):match.end(1)]}"
+
+        words = lowered.split()
+        found = self.trie.Match(words)
+        if not found:
+            return None
+
+        (category, fixed), length = found
+        if fixed:
+            # Fixed tasks such as "system mute" only match when nothing else follows.
+            # "bye jarvis" style goodbyes may carry one extra word.
+            if length == len(words) or category == "exit" and length == len(words) - 1:
+                return category, fixed
+            return None
+
+        rest = text.split(None, length)[length] if len(words) > length else ""
+        if category == "content":
+            rest = re.sub(r"^(?:a|an|the|me a|me an)\s+", "", rest, flags=re.I)
+        if not rest and category not in ("play",):
+            return None
+        return category, f"{category} {rest}".strip()
+
+    # Function to decide between "general" and "realtime" for a query, returning (task, confidence).
+    def ClassifyQuery(self, text):
+        query = text.strip()
+        lowered = self._Clean(query).lower()
+        words = set(Tokenize(lowered))
+
+        if ClockPattern.match(lowered):
+            return f"general {query}", 0.95
+        if words & RealtimeWords:
+            return f"realtime {query}", 0.9
+        if words & FollowUpWords and len(words) <= 8:
+            return f"general {query}", 0.85
+
+        vectorizer, vectors, labels = self._Model()
+        similarities = vectors @ vectorizer.Transform([lowered])[0]
+        nearest = np.argsort(similarities)[::-1][:self.k]
+        scores = {}
+        for i in nearest:
+            scores[labels[i]] = scores.get(labels[i], 0.0) + max(float(similarities[i]), 0.0)
+
+        total = sum(scores.values())
+        if not total:
+            return f"general {query}", 0.0
+        label = max(scores, key=scores.get)
+        confidence = scores[label] / total
+
+        # Weak matches mean the query is unlike anything in the corpus.
+        top = float(similarities[nearest[0]])
+        if top < 0.3:
+            confidence *= top / 0.3
+        return f"{label} {query}", confidence
+
+    # Function to decide whether a segment without a verb is a bare name taking the previous verb.
+    # Only a comma carries the verb over: "open chrome, telegram" but not "open chrome and how are you".
+    def _Inherits(self, category, separator, bare):
+        words = bare.lower().split()
+        if category not in InheritableCategories or not words or len(words) > 4 or "," not in separator and ";" not in separator:
+            return False
+        if words[0] in QuestionWords:
+            return False
+        # Anything the query classifier recognizes as a question is a question, not a name.
+        task, score = self.ClassifyQuery(bare)
+        return score < DefaultThreshold
+
+    # Function to classify an utterance into a task list, returning (tasks, confidence).
+    def Classify(self, prompt):
+        text = prompt.strip()
+        parts = SeparatorPattern.split(text)
+        segments, separators = parts[0::2], parts[1::2]
+        commands = [self.MatchCommand(segment) for segment in segments]
+
+        # Without any command the utterance is a single question, "and" included.
+        if not any(commands):
+            task, confidence = self.ClassifyQuery(text.rstrip(",; "))
+            return [task], confidence
+
+        tasks = []
+        confidence = 0.95
+        previous = None
+        pending = ""
+        for i, (segment, command) in enumerate(zip(segments, commands)):
+            bare = self._Clean(segment)
+            if command is None and previous and i and self._Inherits(previous, separators[i - 1], bare) and not pending:
+                command = (previous, f"{previous} {bare}")
+                confidence = min(confidence, InheritedConfidence)
+
+            if command is None:
+                # Collect consecutive non-command segments into one query.
+                pending += (separators[i - 1] if pending else "") + segment
+                continue
+
+            if pending:
+                task, score = self.ClassifyQuery(pending)
+                tasks.append(task)
+                confidence = min(confidence, score)
+                pending = ""
+            previous = command[0]
+            tasks.append(command[1])
+
+        if pending:
+            task, score = self.ClassifyQuery(pending)
+            tasks.append(task)
+            confidence = min(confidence, score)
+        return tasks, confidence
+
+
+# Shared classifier instance.
+classifier = IntentClassifier()
+
+# Function to record a decision made locally.
+def RecordLocal(seconds):
+    Stats["local"] += 1
+    Stats["local_time"] += seconds
+
+# Function to record a decision that had to go to the LLM.
+def RecordLLM(seconds):
+    Stats["llm"] += 1
+    Stats["llm_time"] += seconds
+
+# Function to report the local hit rate and the latency it saved.
+def Report():
+    total = Stats["local"] + Stats["llm"]
+    average_llm = Stats["llm_time"] / Stats["llm"] if Stats["llm"] else 0.0
+    average_local = Stats["local_time"] / Stats["local"] if Stats["local"] else 0.0
+    return {
+        "decisions": total,
+        "hit_rate": Stats["local"] / total if total else 0.0,
+        "average_local_seconds": average_local,
+        "average_llm_seconds": average_llm,
+        "saved_seconds": Stats["local"] * max(average_llm - average_local, 0.0),
+    }
+
+# Entry point to try the classifier on typed utterances.
+if __name__ == "__main__":
+    while True:
+        start = time.perf_counter()
+        tasks, confidence = classifier.Classify(input(">>> "))
+        print(tasks, f"confidence={confidence:.2f}", f"{(time.perf_counter() - start) * 1000:.2f} ms")
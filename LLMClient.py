@@ -0,0 +1,237 @@
+import time  # Import time for deadlines and rate limiting.
+import random  # Import random for backoff jitter.
+import threading  # Import threading for the concurrency limits.
+from Startup import Env, Lazy  # Import the shared settings and the lazy import helper.
+import Tracing  # Import tracing to time requests and count retries.
+
+# httpx is loaded with the first client, so importing this module stays cheap.
+httpx = Lazy("httpx")
+
+# Load environment variables from the .env file.
+env_vars = Env()
+
+# Status codes that are worth retrying.
+RetryableStatus = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Default limits per provider: concurrent requests, requests per minute and burst size.
+ProviderDefaults = {
+    "groq": {"concurrency": 4, "per_minute": 30, "burst": 5},
+    "cohere": {"concurrency": 4, "per_minute": 20, "burst": 5},
+}
+
+# Retry settings.
+MaxRetries = int(env_vars.get("LLMMaxRetries") or 3)
+BackoffBase = 0.5
+BackoffCap = 8.0
+
+# Total time a call may take including retries, and the timeout of a single request.
+DefaultDeadline = float(env_vars.get("LLMDeadline") or 60)
+RequestTimeout = float(env_vars.get("LLMTimeout") or 30)
+
+
+# Base class for errors raised by the client layer.
+class LLMError(Exception):
+    pass
+
+# Error that was still failing after every retry.
+class RetryableError(LLMError):
+    pass
+
+# Error that retrying cannot fix, such as a bad API key or an invalid request.
+class FatalError(LLMError):
+    pass
+
+# Error raised when a call ran out of time.
+class DeadlineExceeded(LLMError):
+    pass
+
+
+# Token bucket that allows `rate` requests per second with bursts of `capacity`.
+class TokenBucket:
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Function to take one token, waiting until the deadline at most.
+    def Acquire(self, deadline):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                raise DeadlineExceeded("rate limit wait exceeds the deadline")
+            time.sleep(wait)
+
+
+# Concurrency and rate limits of one provider.
+class Provider:
+
+    def __init__(self, name):
+        defaults = ProviderDefaults[name]
+        prefix = name.capitalize()
+        self.name = name
+        self.concurrency = int(env_vars.get(f"{prefix}Concurrency") or defaults["concurrency"])
+        self.semaphore = threading.BoundedSemaphore(self.concurrency)
+        per_minute = float(env_vars.get(f"{prefix}RatePerMinute") or defaults["per_minute"])
+        self.bucket = TokenBucket(per_minute / 60.0, defaults["burst"])
+
+    # Function to take a concurrency slot and a rate limit token before the deadline.
+    def Enter(self, deadline):
+        if not self.semaphore.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise DeadlineExceeded(f"no free {self.name} slot before the deadline")
+        try:
+            self.bucket.Acquire(deadline)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    # Function to give the concurrency slot back.
+    def Leave(self):
+        self.semaphore.release()
+
+
+# Limits for every provider, shared by all modules.
+providers = {name: Provider(name) for name in ProviderDefaults}
+
+# Lazily created clients and the pooled HTTP connections they share.
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Function to build a keep-alive connection pool for one provider.
+def _HttpClient(name):
+    concurrency = providers[name].concurrency
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency, keepalive_expiry=60)
+    return httpx.Client(limits=limits, timeout=httpx.Timeout(RequestTimeout, connect=10))
+
+# Function to get the shared Groq client.
+def GroqClient():
+    with _clients_lock:
+        if "groq" not in _clients:
+            from groq import Groq
+            # Retries are handled here, so the SDK must not retry on its own.
+            _clients["groq"] = Groq(api_key=env_vars.get("GroqAPIKey"), base_url=env_vars.get("GroqBaseURL") or None,
+                                    http_client=_HttpClient("groq"), max_retries=0, timeout=RequestTimeout)
+        return _clients["groq"]
+
+# Function to get the shared Cohere client.
+def CohereClient():
+    with _clients_lock:
+        if "cohere" not in _clients:
+            import cohere
+            options = {"base_url": env_vars.get("CohereBaseURL")} if env_vars.get("CohereBaseURL") else {}
+            _clients["cohere"] = cohere.Client(api_key=env_vars.get("CohereAPIKey"), httpx_client=_HttpClient("cohere"),
+                                               timeout=RequestTimeout, **options)
+        return _clients["cohere"]
+
+# Function to find the HTTP status code of an SDK error, if it has one.
+def _StatusCode(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+# Function to decide whether an error is worth retrying.
+def IsRetryable(error):
+    status = _StatusCode(error)
+    if status is not None:
+        return status in RetryableStatus
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    # SDK connection and timeout errors wrap the transport error without a status code.
+    name = type(error).__name__
+    return "Connection" in name or "Timeout" in name
+
+# Function to work out how long to wait before the next attempt.
+def _Backoff(error, attempt):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), BackoffCap)
+    except ValueError:
+        pass
+    # Full jitter: a random wait up to the exponential backoff.
+    return random.uniform(0, min(BackoffCap, BackoffBase * 2 ** attempt))
+
+# Function to run attempts of a request until one succeeds, a fatal error occurs or time runs out.
+def _Attempts(provider, deadline, attempt_function):
+    attempt = 0
+    while True:
+        try:
+            return attempt_function()
+        except LLMError:
+            raise
+        except Exception as e:
+            if not IsRetryable(e):
+                raise FatalError(f"{provider}: {e}") from e
+            if attempt >= MaxRetries:
+                raise RetryableError(f"{provider}: giving up after {attempt + 1} attempts: {e}") from e
+            wait = _Backoff(e, attempt)
+            if time.monotonic() + wait > deadline:
+                raise DeadlineExceeded(f"{provider}: no time left to retry: {e}") from e
+            Tracing.Count("llm_retries", provider=provider)
+            time.sleep(wait)
+            attempt += 1
+
+# Function to call a provider with limits, retries and a deadline.
+def Call(provider, function, *args, deadline=None, **kwargs):
+    limits = providers[provider]
+    deadline = time.monotonic() + (deadline or DefaultDeadline)
+
+    def Attempt():
+        limits.Enter(deadline)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            limits.Leave()
+
+    with Tracing.Span("llm_total", provider=provider):
+        return _Attempts(provider, deadline, Attempt)
+
+# Function to stream a provider response with limits, retries and a deadline.
+# Attempts are retried until the first event arrives; after that events are
+# passed on as they come, since a partial answer cannot be replayed.
+def Stream(provider, create, deadline=None):
+    limits = providers[provider]
+    deadline = time.monotonic() + (deadline or DefaultDeadline)
+    empty = object()
+
+    def Attempt():
+        limits.Enter(deadline)
+        try:
+            events = iter(create())
+            return events, next(events, empty)
+        except BaseException:
+            limits.Leave()
+            raise
+
+    started = time.perf_counter()
+    events, first = _Attempts(provider, deadline, Attempt)
+    try:
+        if first is empty:
+            return
+        Tracing.Record("llm_first_token", time.perf_counter() - started, provider=provider)
+        yield first
+        for event in events:
+            yield event
+            if time.monotonic() > deadline:
+                raise DeadlineExceeded(f"{provider}: stream ran past the deadline")
+    except LLMError:
+        raise
+    except Exception as e:
+        raise (RetryableError if IsRetryable(e) else FatalError)(f"{provider}: stream failed: {e}") from e
+    finally:
+        limits.Leave()
+        # Recorded rather than a span, since the stream is suspended between events.
+        Tracing.Record("llm_total", time.perf_counter() - started, provider=provider)
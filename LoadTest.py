@@ -0,0 +1,116 @@
+import os  # Import os for file path handling.
+import sys  # Import sys to find the repository.
+import json  # Import json to write the machine-readable report.
+import time  # Import time to measure throughput.
+import shutil  # Import shutil to remove the working folder.
+import argparse  # Import argparse for the command line options.
+import tempfile  # Import tempfile for an isolated working folder.
+import importlib  # Import importlib to load the assistant after it is pointed at the stand-ins.
+from concurrent.futures import ThreadPoolExecutor  # Import a thread pool to run sessions at the same time.
+from MockProviders import MockProviders, DefaultSettings  # Import the local stand-in providers.
+from Benchmark import AssistantSettings, RepositoryDir, ReportDir, Summarize, CurrentCommit  # Import the benchmark helpers.
+
+# Provider limits high enough that the stand-ins, not the client limits, bound the throughput.
+LoadSettings = {"GroqConcurrency": "256", "GroqRatePerMinute": "1000000", "TTSPreWarm": "False"}
+
+
+# Load test that runs many sessions at the same time through the chat and
+# realtime engines, against the stand-in providers, and checks that every
+# session's chat log holds exactly its own turns.
+class LoadTest:
+
+    def __init__(self, providers):
+        self.providers = providers
+
+        # Point the shared settings at the stand-ins before any assistant module reads them.
+        import Startup
+        Startup.Env().update(AssistantSettings, **LoadSettings, **providers.Env())
+        self.Session = importlib.import_module("Session")
+        self.Chatbot = importlib.import_module("Chatbot")
+        self.RealtimeSearchEngine = importlib.import_module("RealtimeSearchEngine")
+
+    # Function to run the turns of one session one after another, returning the latency of each.
+    def _Session(self, name, turns):
+        session = self.Session.GetSession(name)
+        latencies = []
+        for turn in range(turns):
+            # Every other turn searches, so search results would leak between sessions if they were shared.
+            query = f"question {turn} from {name}"
+            start = time.perf_counter()
+            if turn % 2:
+                self.RealtimeSearchEngine.RealtimeSearchEngine(f"latest news {query}", session)
+            else:
+                self.Chatbot.ChatBot(query, session)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    # Function to check that a session's chat log holds its own turns and nothing else.
+    def _Isolated(self, name, turns):
+        log = self.Session.GetSession(name).chat_log.ReadAll()
+        questions = [message["content"] for message in log if message["role"] == "user"]
+        return len(log) == 2 * turns and all(question.endswith(f"from {name}") for question in questions)
+
+    # Function to run a number of sessions at the same time and measure the throughput.
+    def Run(self, sessions, turns):
+        names = [f"load-{sessions}-{i}" for i in range(sessions)]
+        system_messages = len(self.RealtimeSearchEngine.SystemChatbot)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            results = list(pool.map(lambda name: self._Session(name, turns), names))
+        seconds = time.perf_counter() - start
+        latencies = [latency for result in results for latency in result]
+        return {
+            "sessions": sessions,
+            "turns": len(latencies),
+            "seconds": seconds,
+            "turns_per_second": len(latencies) / seconds,
+            "latency": Summarize(latencies),
+            "isolated": all(self._Isolated(name, turns) for name in names)
+                        and len(self.RealtimeSearchEngine.SystemChatbot) == system_messages,
+        }
+
+
+# Function to print the results as a table.
+def PrintReport(report):
+    base = report["runs"][0]["turns_per_second"] / report["runs"][0]["sessions"]
+    print(f"{'sessions':>8}{'turns':>7}{'turns/s':>9}{'scaling':>9}{'p50 ms':>9}{'p95 ms':>9}  isolated")
+    for run in report["runs"]:
+        print(f"{run['sessions']:>8}{run['turns']:>7}{run['turns_per_second']:>9.2f}"
+              f"{run['turns_per_second'] / base / run['sessions']:>9.0%}"
+              f"{run['latency']['p50'] * 1000:>9.0f}{run['latency']['p95'] * 1000:>9.0f}  {run['isolated']}")
+
+# Entry point to run the load test.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent session load test against local stand-in providers.")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="comma separated numbers of concurrent sessions")
+    parser.add_argument("--turns", type=int, default=4, help="turns run by every session")
+    parser.add_argument("--output", help="report file, by default Data/Benchmarks/load-<commit>-<time>.json")
+    for name, value in DefaultSettings.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    options = parser.parse_args()
+
+    providers = MockProviders({name: getattr(options, name) for name in DefaultSettings})
+    providers.Start()
+
+    # Work in an empty folder so the chat log and caches of the real assistant are left alone.
+    workdir = tempfile.mkdtemp(prefix="jarvis-load-")
+    os.makedirs(os.path.join(workdir, "Data"))
+    os.chdir(workdir)
+    sys.path.insert(0, RepositoryDir)
+
+    try:
+        test = LoadTest(providers)
+        started = time.time()
+        report = {"commit": CurrentCommit(), "timestamp": started, "settings": providers.settings,
+                  "runs": [test.Run(int(count), options.turns) for count in options.sessions.split(",")]}
+    finally:
+        providers.Stop()
+        os.chdir(RepositoryDir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = options.output or os.path.join(ReportDir, f"load-{report['commit'] or 'unknown'}-{int(report['timestamp'])}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    PrintReport(report)
+    print(f"Report written to {output}")
@@ -0,0 +1,43 @@
+import os  # Import os for file path handling and private file creation.
+import hmac  # Import hmac to compare tokens in constant time.
+import json  # Import json to decode requests.
+import secrets  # Import secrets to create the token.
+import threading  # Import threading to create the token only once per process.
+
+# File holding the secret every local client must send. Only the user who installed the assistant can read it.
+TokenPath = os.path.join("Data", "LocalToken")
+
+# Cached token of this process.
+_token = None
+_token_lock = threading.Lock()
+
+# Function to get the per-install token, creating it the first time.
+def GetToken(path=TokenPath):
+    global _token
+    with _token_lock:
+        if _token is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            try:
+                # Created readable by its owner only; another process may be creating it at the same time.
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(secrets.token_hex(32))
+            except FileExistsError:
+                pass
+            with open(path, "r", encoding="utf-8") as f:
+                _token = f.read().strip()
+    return _token
+
+# Function to check one request line of the local socket protocol, returning (request, error).
+# Anything that is not a JSON object, such as the request line and headers a browser sends for
+# a form POST, is refused before it is parsed, and every request must carry the token.
+def ParseRequest(line, token):
+    if not line.lstrip().startswith(b"{"):
+        return None, "not a json request"
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None, "invalid json"
+    if not isinstance(request, dict) or not hmac.compare_digest(str(request.get("token", "")).encode("utf-8"), token.encode("utf-8")):
+        return None, "unauthorized"
+    return request, None
@@ -0,0 +1,237 @@
+import io  # Import io to build the stand-in images.
+import json  # Import json to encode the provider responses.
+import time  # Import time to count requests.
+import random  # Import random for simulated failures and answer text.
+import asyncio  # Import asyncio to run the stand-in servers.
+import threading  # Import threading to run the servers next to the code under test.
+from aiohttp import web, WSMsgType  # Import aiohttp, already required by edge-tts, for HTTP and websockets.
+
+# Default behaviour of the stand-ins. Latencies are in seconds.
+DefaultSettings = {
+    "first_token_latency": 0.25,  # Time before the first streamed token of Groq and Cohere.
+    "tokens_per_second": 150,  # Streaming speed of Groq and Cohere.
+    "answer_words": 60,  # Length of a chat answer.
+    "failure_rate": 0.0,  # Share of requests answered with HTTP 503.
+    "prefill_tokens_per_second": 0,  # Speed at which Groq and Cohere read the prompt, 0 reads it instantly.
+    "image_latency": 1.0,  # Time to generate one image.
+    "search_latency": 0.3,  # Time to answer a search.
+    "tts_latency": 0.15,  # Time before the first audio chunk.
+    "tts_realtime_factor": 8.0,  # How many times faster than real time audio is synthesized.
+}
+
+# Bytes of audio per second at edge-tts' default 48 kbit/s, and seconds of speech per word.
+AudioBytesPerSecond = 6000
+SecondsPerWord = 0.35
+
+# Words the stand-in answers are made of.
+Words = ("the assistant found that this answer is generated locally for the benchmark and contains several "
+         "sentences of plain text so that streaming sentence splitting and speech synthesis all have work").split()
+
+# Command words the stand-in decision model passes through unchanged.
+CommandWords = ("open ", "close ", "play ", "generate image", "content ", "google search ", "youtube search ",
+                "system ", "reminder ", "exit")
+
+# Words that make the stand-in decision model choose a realtime search.
+RealtimeWords = ("who is", "news", "today", "latest", "weather", "price", "score", "search")
+
+# Function to make the answer text of the stand-in chat models.
+def AnswerText(words):
+    text = []
+    for i in range(words):
+        word = random.choice(Words)
+        text.append(word.capitalize() if i == 0 or text[-1].endswith(".") else word)
+        if i % 12 == 11 or i == words - 1:
+            text[-1] += "."
+    return " ".join(text)
+
+# Function to decide like the real decision model would for the benchmark queries.
+def Decision(query):
+    query = query.lower().strip().rstrip("?.")
+    if query.startswith(CommandWords):
+        return query
+    if any(word in query for word in RealtimeWords):
+        return f"realtime {query}"
+    return f"general {query}"
+
+
+# Local stand-ins for the Groq and Cohere chat streaming APIs, the Hugging Face
+# inference endpoint, a search endpoint and the edge-tts websocket, with
+# configurable latency, token rates and failures.
+class MockProviders:
+
+    def __init__(self, settings=None, host="127.0.0.1", port=0):
+        self.settings = dict(DefaultSettings, **(settings or {}))
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.runner = None
+        self.thread = None
+        self.images = {}
+        self.requests = {"groq": 0, "cohere": 0, "huggingface": 0, "search": 0, "tts": 0, "failed": 0}
+
+    # Function to count a request and decide whether it fails.
+    def _Fail(self, provider):
+        self.requests[provider] += 1
+        if random.random() < self.settings["failure_rate"]:
+            self.requests["failed"] += 1
+            return web.Response(status=503, headers={"retry-after": "0"}, text='{"error": "overloaded"}')
+        return None
+
+    # Function to stream the words of an answer at the configured rate, after reading a prompt of the given size.
+    async def _Words(self, text, prompt_characters=0):
+        prefill = self.settings["prefill_tokens_per_second"]
+        await asyncio.sleep(self.settings["first_token_latency"] + (prompt_characters / 4 / prefill if prefill else 0))
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == 0 else " " + word
+            await asyncio.sleep(1 / self.settings["tokens_per_second"])
+
+    # Handler of the Groq (OpenAI compatible) chat completions endpoint.
+    async def Groq(self, request):
+        failed = self._Fail("groq")
+        if failed:
+            return failed
+        body = await request.json()
+        prompt = sum(len(message.get("content") or "") for message in body.get("messages", []))
+        response = web.StreamResponse(headers={"content-type": "text/event-stream"})
+        await response.prepare(request)
+        async for word in self._Words(AnswerText(self.settings["answer_words"]), prompt):
+            chunk = {"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": "mock",
+                     "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    # Handler of the Cohere chat streaming endpoint.
+    async def Cohere(self, request):
+        failed = self._Fail("cohere")
+        if failed:
+            return failed
+        body = await request.json()
+        text = Decision(body.get("message", ""))
+        prompt = len(body.get("preamble") or "") + len(body.get("message") or "")
+        prompt += sum(len(turn.get("message") or "") for turn in body.get("chat_history") or [])
+        response = web.StreamResponse(headers={"content-type": "application/stream+json"})
+        await response.prepare(request)
+        await response.write((json.dumps({"event_type": "stream-start", "generation_id": "mock", "is_finished": False}) + "\n").encode())
+        async for word in self._Words(text, prompt):
+            await response.write((json.dumps({"event_type": "text-generation", "text": word, "is_finished": False}) + "\n").encode())
+        end = {"event_type": "stream-end", "finish_reason": "COMPLETE", "is_finished": True,
+               "response": {"text": text, "generation_id": "mock", "chat_history": [], "finish_reason": "COMPLETE", "meta": {}}}
+        await response.write((json.dumps(end) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    # Handler of the Hugging Face inference endpoint, answering with a small JPEG.
+    async def HuggingFace(self, request):
+        failed = self._Fail("huggingface")
+        if failed:
+            return failed
+        body = await request.json()
+        await asyncio.sleep(self.settings["image_latency"])
+        key = body.get("inputs", "")
+        if key not in self.images:
+            from PIL import Image
+            buffer = io.BytesIO()
+            Image.new("RGB", (512, 512), tuple(random.randrange(256) for _ in range(3))).save(buffer, "JPEG")
+            self.images[key] = buffer.getvalue()
+        return web.Response(body=self.images[key], content_type="image/jpeg")
+
+    # Handler of the search endpoint used through SearchAPIURL.
+    async def Search(self, request):
+        failed = self._Fail("search")
+        if failed:
+            return failed
+        await asyncio.sleep(self.settings["search_latency"])
+        query = request.query.get("q", "")
+        results = [{"title": f"Result {i} for {query}", "description": AnswerText(25), "url": f"https://example.com/{i}"}
+                   for i in range(int(request.query.get("num", 5)))]
+        return web.json_response(results)
+
+    # Handler of the edge-tts websocket, sending audio sized like real speech of the text.
+    async def TTS(self, request):
+        self.requests["tts"] += 1
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        words = 0
+        async for message in socket:
+            if message.type != WSMsgType.TEXT:
+                continue
+            if "Path:ssml" not in message.data:
+                continue
+            words = len(message.data.split("<prosody", 1)[-1].split(">", 1)[-1].split("</prosody>", 1)[0].split())
+
+            await socket.send_str("X-RequestId:mock\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.start\r\n\r\n{}")
+            await asyncio.sleep(self.settings["tts_latency"])
+            header = b"X-RequestId:mock\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n"
+            remaining = int(max(words, 1) * SecondsPerWord * AudioBytesPerSecond)
+            while remaining > 0:
+                size = min(remaining, 4096)
+                await socket.send_bytes(len(header).to_bytes(2, "big") + header + bytes(size))
+                await asyncio.sleep(size / AudioBytesPerSecond / self.settings["tts_realtime_factor"])
+                remaining -= size
+            await socket.send_str("X-RequestId:mock\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.end\r\n\r\n{}")
+        return socket
+
+    # Function to start the servers in a background thread, returning the base URL.
+    def Start(self):
+        started = threading.Event()
+
+        async def Serve():
+            app = web.Application()
+            app.router.add_post("/openai/v1/chat/completions", self.Groq)
+            app.router.add_post("/v1/chat", self.Cohere)
+            app.router.add_post("/hf", self.HuggingFace)
+            app.router.add_get("/search", self.Search)
+            app.router.add_get("/tts", self.TTS)
+            self.runner = web.AppRunner(app, access_log=None)
+            await self.runner.setup()
+            site = web.TCPSite(self.runner, self.host, self.port)
+            await site.start()
+            self.port = self.runner.addresses[0][1]
+            started.set()
+
+        def Run():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(Serve())
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=Run, daemon=True)
+        self.thread.start()
+        started.wait()
+        return self.URL()
+
+    # Function to stop the servers.
+    def Stop(self):
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    # Function to get the base URL of the servers.
+    def URL(self):
+        return f"http://{self.host}:{self.port}"
+
+    # Function to get the settings that point the assistant at the stand-ins.
+    def Env(self):
+        return {
+            "GroqBaseURL": self.URL(), "GroqAPIKey": "mock",
+            "CohereBaseURL": self.URL(), "CohereAPIKey": "mock",
+            "ImageAPIURL": self.URL() + "/hf", "HuggingFaceAPIKey": "mock",
+            "SearchAPIURL": self.URL() + "/search",
+        }
+
+    # Function to send edge-tts to the stand-in websocket.
+    def PatchEdgeTTS(self):
+        import edge_tts.communicate
+        edge_tts.communicate.WSS_URL = f"ws://{self.host}:{self.port}/tts?TrustedClientToken=mock"
+
+
+# Entry point to run the stand-ins on their own, for example for manual testing.
+if __name__ == "__main__":
+    import sys
+    providers = MockProviders(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8777)
+    print(f"Mock providers listening on {providers.Start()}")
+    print(json.dumps(providers.Env(), indent=2))
+    threading.Event().wait()
@@ -1,15 +1,20 @@
-import cohere  # Import the cohere library for AI Services.
-from rich import print  # Import the rich library to enhance terminal output.
-from dotenv import dotenv_values  # Import dotenv to load environment variables from a .env file.
+from LLMClient import CohereClient, Stream  # Import the shared, rate-limited LLM client layer.
+from Startup import Env, Lazy  # Import the shared settings and the lazy import helper.
+from time import perf_counter  # Import perf_counter to measure decision latency.
+from DecisionCache import DecisionCache, DefaultTTL, DefaultMaxEntries  # Import the persistent decision cache.
+import IntentClassifier  # Import the local fast-path intent classifier.
+import FewShot  # Import the few-shot example index for compact decision prompts.
+import Tracing  # Import tracing to time the decision stage.
+from Session import GetSession  # Import the per-user sessions holding the recent queries.
+
+# Use the rich library to enhance terminal output, loaded on first print.
+print = Lazy("rich", "print")
 
 # Load environment variables from a .env file.
-env_vars = dotenv_values(".env")
+env_vars = Env()
 
-# Retrieves the API key from the environment variables.
-CohereAPIKey = env_vars.get("CohereAPIKey")
-
-# Create a CohereClient object with the API key.
-co = cohere.Client(api_key=CohereAPIKey)
+# Confidence the local classifier needs before the LLM is skipped.
+IntentConfidence = float(env_vars.get("IntentConfidence") or IntentClassifier.DefaultThreshold)
 
 # Defines the list of recognized function keywords for task recognition.
 funcs = [
@@ -18,8 +23,25 @@ funcs = [
     "youtube search", "reminder"
 ]
 
-# Initialize an empty list to store user messages.
-messages = []
+# Function to look up the most recent user messages of the default session on first use,
+# for callers that name no session.
+def __getattr__(name):
+    if name == "messages":
+        return GetSession().decisions
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Whether decisions use the compact preamble with examples picked for each query, or the full static prompt.
+DynamicFewShot = (env_vars.get("DynamicFewShot") or "True").lower() == "true"
+
+# Number of examples picked for each query.
+FewShotK = int(env_vars.get("FewShotExamples") or FewShot.DefaultK)
+
+# Number of times the model is asked before its answer is accepted as it is.
+MaxAttempts = 2
+
+# Cache of previous decisions shared by every process, opened on first use.
+decision_cache = Lazy(lambda: DecisionCache(ttl=float(env_vars.get("DecisionCacheTTL") or DefaultTTL),
+                                            max_entries=int(env_vars.get("DecisionCacheSize") or DefaultMaxEntries)))
 
 # Define the preamble that guides the AI model on how to categorize queries.
 preamble = """
@@ -68,20 +90,25 @@ CHATHISTORY = [
     {"role": "ChatBot", "message": "goodbye boss"}
 ]
 
-# Define the main function for decision-making on queries.
-def FirstLayerDMM(prompt: str = "test"):
-    # Add the user query to messages list.
-    messages.append({"role": "user", "content": f"{prompt}"})
+# Function to get the preamble and chat history sent with a query, either compact with picked examples or static.
+def DecisionPrompt(prompt, dynamic=None):
+    if DynamicFewShot if dynamic is None else dynamic:
+        return FewShot.CompactPreamble, FewShot.index.ChatHistory(prompt, FewShotK)
+    return preamble, CHATHISTORY
+
+# Function to ask the Cohere model to categorize a query.
+def AskDecisionModel(prompt, dynamic=None):
+    instructions, history = DecisionPrompt(prompt, dynamic)
 
-    # Create the streaming chat session with Cohere model.
-    stream = co.chat_stream(
+    # Create the streaming chat session with Cohere model, with rate limits, retries and a deadline.
+    stream = Stream("cohere", lambda: CohereClient().chat_stream(
         model='command-r-plus',  # Specify the Cohere model to use.
         message=prompt,  # Pass the user query to the model.
         temperature=0.7,  # Set the creativity level for the model.
-        chat_history=CHATHISTORY,  # Provide the predefined chat history for context.
+        chat_history=history,  # Provide the example decisions for context.
         connectors=[],  # No additional connectors are used.
-        preamble=preamble,  # Pass the detailed instruction preamble.
-    )
+        preamble=instructions,  # Pass the instruction preamble.
+    ))
 
     # Initialize an empty string to store the generated response.
     response = ""
@@ -107,14 +134,50 @@ def FirstLayerDMM(prompt: str = "test"):
             if task.startswith(func):
                 temp.append(task)  # Add valid tasks to the filtered list.
 
-    # Update the response with the filtered list of tasks.
-    response = temp
+    # Return the filtered list of tasks.
+    return temp
+
+# Define the main function for decision-making on queries.
+def FirstLayerDMM(prompt: str = "test", session=None):
+    # Time the whole decision as one stage of the turn, noting where the answer came from.
+    with Tracing.Span("classification") as span:
+        # Add the user query to the session's messages list.
+        (session or GetSession()).decisions.append({"role": "user", "content": f"{prompt}"})
+
+        # Try the local classifier first and only ask the LLM when it is not confident enough.
+        start = perf_counter()
+        tasks, confidence = IntentClassifier.classifier.Classify(prompt)
+        if confidence >= IntentConfidence:
+            IntentClassifier.RecordLocal(perf_counter() - start)
+            span.Set(source="local")
+            return tasks
+
+        # Reuse the decision made for the same or a near-identical query.
+        cached = decision_cache.Get(prompt)
+        if cached is not None:
+            span.Set(source="cache")
+            # A single general or realtime task carries the query itself, so use the current wording.
+            if len(cached) == 1 and cached[0].split(" ", 1)[0] in ("general", "realtime"):
+                return [f"{cached[0].split(' ', 1)[0]} {prompt}"]
+            return cached
+        start = perf_counter()
+
+        # Ask again, a bounded number of times, if the model echoed the '(query)' placeholder.
+        for attempt in range(MaxAttempts):
+            response = AskDecisionModel(prompt)
+            if not any("(query)" in task for task in response):
+                break
+        IntentClassifier.RecordLLM(perf_counter() - start)
+        span.Set(source="llm")
+
+        # Remember single general/realtime decisions so the local classifier learns them.
+        if len(response) == 1 and response[0].split(" ", 1)[0] in ("general", "realtime"):
+            IntentClassifier.classifier.AddExample(prompt, response[0].split(" ", 1)[0])
+
+        # Cache usable decisions for the next time the query is asked.
+        if response and not any("(query)" in task for task in response):
+            decision_cache.Put(prompt, response)
 
-    # If '(query)' is in the response, recursively call the function for further clarification.
-    if "(query)" in response:
-        new_response = FirstLayerDMM(prompt=prompt)
-        return new_response  # Return the clarified response.
-    else:
         return response  # Return the filtered response.
 
 # Entry point for the script.
@@ -122,3 +185,5 @@ if __name__ == "__main__":
     # Continuously prompt the user for input and process it.
     while True:
         print(FirstLayerDMM(input(">>> ")))  # Print the categorized response from the AI model.
+        print(IntentClassifier.Report())  # Print the local hit rate and the latency it saved.
+        print(decision_cache.Report())  # Print the decision cache hit and miss statistics.
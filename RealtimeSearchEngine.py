@@ -1,19 +1,17 @@
-from googlesearch import search
-from groq import Groq  # Importing the groq library to use its API.
-from json import load, dump  # Importing functions to read and write JSON files.
+from SearchCache import SearchCache, GoogleBackend, HttpBackend  # Importing the cached, deduplicated search layer.
+from LLMClient import GroqClient, Stream  # Importing the shared, rate-limited LLM client layer.
+from Session import GetSession  # Importing the per-user sessions holding chat logs and context windows.
+from AnswerStream import StreamAnswer, AsyncStream  # Importing helpers to stream answers as they are generated.
 import datetime  # Importing the datetime module for real-time date and time information.
-from dotenv import dotenv_values  # Importing dotenv_values to read environment variables from a .env file.
+from Startup import Env, Lazy  # Import the shared settings and the lazy import helper.
+import Tracing  # Importing tracing to time the search stage.
 
 # Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
+env_vars = Env()
 
 # Retrieve specific environment variables for ChatBot configuration.
 username = env_vars.get("username")
 AssistantName = env_vars.get("AssistantName")
-GroqAPIKey = env_vars.get("GroqAPIKey")
-
-# Initialize the groq client using the provided API key.
-client = Groq(api_key=GroqAPIKey)
 
 # Define the system instructions for the ChatBot.
 System = f"""Hello, I am {username}, You are a very accurate and advanced AI chatbot named {AssistantName} which has real-time up-to-date information from the internet.
@@ -21,21 +19,25 @@ System = f"""Hello, I am {username}, You are a very accurate and advanced AI cha
 *** Just answer the question from the provided data in a professional way. ***"""
 
 
-# Try to load the chat from JSON file, or create a new one if it doesn't exist.
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)  # Load existing messages from the chat logs.
-except FileNotFoundError:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
+# Function to look up the chat log and token-budgeted context window of the default session on first use,
+# for callers that name no session.
+def __getattr__(name):
+    if name in ("chat_log", "context_window"):
+        return getattr(GetSession(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Cache for search results, repeated and rephrased queries are answered without searching again.
+# SearchAPIURL points the search at a JSON search endpoint instead of Google. Opened on first use.
+search_cache = Lazy(lambda: SearchCache(backend=HttpBackend(env_vars["SearchAPIURL"]) if env_vars.get("SearchAPIURL") else GoogleBackend))
 
 # Function to perform a Google search and format the results.
 def GoogleSearch(query):
-    results = list(search(query, advanced=True, num_results=5))
+    with Tracing.Span("search"):
+        results = search_cache.Search(query, num_results=5)
     Answer = f"The search results for '{query}' are:\n[start]\n"
     
     for i in results:
-        Answer += f"Title: {i.title}\nDescription: {i.description}\n\n"
+        Answer += f"Title: {i['title']}\nDescription: {i['description']}\n\n"
     
     return Answer
 
@@ -69,46 +71,56 @@ def Information():
     data += f"Time: {hour} hours : {minute} minutes : {second} seconds.\n"
     return data
 
-# Function to handle real-time search and response generation.
-def RealtimeSearchEngine(prompt):
-    global SystemChatbot, messages
+# Function to handle real-time search and stream the response as it is generated.
+# Yields ("delta", text) and ("sentence", text) events and finally ("done", answer).
+# The history comes from and goes to the given session, the default session when none is given.
+def StreamRealtimeSearchEngine(prompt, session=None):
+    session = session or GetSession()
     
-    # Load the chat log from the JSON file.
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-    messages.append({"role": "user", "content": f"{prompt}"})
+    # Start the message list for this turn with the user's query.
+    messages = [{"role": "user", "content": f"{prompt}"}]
     
-    # Add Google search results to the system chatbot messages.
-    SystemChatbot.append({"role": "system", "content": GoogleSearch(prompt)})
+    # Add the Google search results to this turn's system messages only, so concurrent turns never see each other's.
+    system_messages = SystemChatbot + [{"role": "system", "content": GoogleSearch(prompt)}]
     
-    # Generate a response using the groq client.
-    completion = client.chat.completions.create(
+    # Generate a response using the shared groq client.
+    prompt_messages = session.context_window.Build(system_messages + [{"role": "system", "content": Information()}], messages[0])
+    completion = Stream("groq", lambda: GroqClient().chat.completions.create(
         model="llama3-70b-8192",
-        messages=SystemChatbot + [{"role": "system", "content": Information()}] + messages,
+        messages=prompt_messages,
         temperature=0.7,
         max_tokens=2048,
         top_p=1,
         stream=True,
         stop=None 
-    )
+    ))
     
     Answer = ""
-    # Concatenate response chunks from the streaming output.
-    for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content 
+    # Pass the cleaned response chunks and finished sentences on as they arrive.
+    for kind, text in StreamAnswer(completion):
+        if kind == "delta":
+            Answer += text
+        yield kind, text
     
     # Clean up the response.
-    Answer = Answer.strip().replace("</s>", "")
+    Answer = Answer.strip()
     messages.append({"role": "assistant", "content": Answer})
     
-    # Save the updated chat log back to the JSON file.
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump(messages, f, indent=4)
+    # Append the new turn to the chat log store.
+    session.chat_log.Extend(messages)
     
-    # Remove the most recent system message from the chatbot conversation.
-    SystemChatbot.pop()
-    return AnswerModifier(Answer)
+    yield "done", AnswerModifier(Answer)
+
+# Asynchronous version of StreamRealtimeSearchEngine for event loop based callers.
+async def AsyncStreamRealtimeSearchEngine(prompt, session=None):
+    async for event in AsyncStream(StreamRealtimeSearchEngine, prompt, session):
+        yield event
+
+# Function to handle real-time search and response generation.
+def RealtimeSearchEngine(prompt, session=None):
+    for kind, text in StreamRealtimeSearchEngine(prompt, session):
+        if kind == "done":
+            return text
 
 # Main entry point of the program for interactive querying.
 if __name__ == "__main__":
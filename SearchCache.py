@@ -0,0 +1,157 @@
+import os  # Import os for file path handling.
+import re  # Import re to split queries into words.
+import json  # Import json to store search results.
+import time  # Import time for TTL and LRU bookkeeping.
+import sqlite3  # Import sqlite3 for a persistent cache shared by every process.
+import threading  # Import threading to coalesce identical lookups.
+import urllib.parse  # Import urllib to query a search endpoint over HTTP.
+import urllib.request  # Import urllib to query a search endpoint over HTTP.
+from concurrent.futures import Future  # Import Future to hand one result to every waiting caller.
+from DecisionCache import NormalizeQuery  # Import the query normalization shared with the decision cache.
+
+# Database file holding the cached search results.
+SearchCachePath = os.path.join("Data", "SearchCache.sqlite")
+
+# Maximum size of all cached results together, in bytes.
+DefaultMaxBytes = 16 * 1024 * 1024
+
+# Lifetimes in seconds for results that go stale fast, normally and slowly.
+NewsTTL = 15 * 60
+DefaultTTL = 24 * 3600
+FactTTL = 7 * 24 * 3600
+
+# Words that make a query about things that change by the minute or hour.
+NewsWords = {"news", "headline", "headlines", "latest", "today", "today's", "tonight", "live", "now", "current",
+             "score", "scores", "weather", "price", "prices", "stock", "stocks", "rate", "trending", "breaking", "update"}
+
+# Question openings that usually ask for slowly changing facts.
+FactOpenings = ("who is", "who was", "what is", "what was", "where is", "when was", "tell me about", "define")
+
+# Function to choose how long the results of a query stay fresh.
+# The news words are looked up in the query as typed, as normalization drops filler words such as "now".
+def QueryTTL(query):
+    normalized = NormalizeQuery(query)
+    words = set(re.findall(r"[\w']+", str(query).lower()))
+    if words & NewsWords:
+        return NewsTTL
+    if normalized.startswith(FactOpenings):
+        return FactTTL
+    return DefaultTTL
+
+# Default backend that searches Google with the googlesearch library.
+def GoogleBackend(query, num_results=5):
+    from googlesearch import search  # Imported here so other backends work without it.
+    return [{"title": i.title, "description": i.description, "url": i.url}
+            for i in search(query, advanced=True, num_results=num_results)]
+
+# Function to build a backend for a search endpoint that answers GET ?q=<query>&num=<n>
+# with a JSON list of {"title", "description", "url"} results.
+def HttpBackend(url, timeout=10):
+    def Search(query, num_results=5):
+        address = f"{url}?{urllib.parse.urlencode({'q': query, 'num': num_results})}"
+        with urllib.request.urlopen(address, timeout=timeout) as response:
+            return json.loads(response.read())[:num_results]
+    return Search
+
+
+# Persistent search result cache with per-entry TTL, size-based LRU eviction
+# and singleflight coalescing: identical lookups that arrive while one is
+# running wait for its result instead of searching again.
+class SearchCache:
+
+    def __init__(self, backend=GoogleBackend, path=SearchCachePath, max_bytes=DefaultMaxBytes, ttl=QueryTTL):
+        self.backend = backend
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0, "expired": 0, "evicted": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, results TEXT NOT NULL, size INTEGER NOT NULL, expires REAL NOT NULL, last_used REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    # Function to read fresh cached results for a key, returning None on a miss.
+    def _Get(self, key, num_results):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT results, expires FROM results WHERE key = ?", (f"{num_results}:{key}",)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self.db.execute("DELETE FROM results WHERE key = ?", (f"{num_results}:{key}",))
+                self.stats["expired"] += 1
+                return None
+            self.db.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, f"{num_results}:{key}"))
+        return json.loads(row[0])
+
+    # Function to store results and evict the least recently used entries beyond the size limit.
+    def _Put(self, key, num_results, query, results):
+        data = json.dumps(results)
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO results (key, results, size, expires, last_used) VALUES (?, ?, ?, ?, ?)",
+                            (f"{num_results}:{key}", data, len(data), now + self.ttl(query), now))
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop expired entries first, then the least recently used ones.
+                self.stats["evicted"] += self.db.execute("DELETE FROM results WHERE expires < ?", (now,)).rowcount
+                total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+                for old_key, size in self.db.execute("SELECT key, size FROM results ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self.db.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    self.stats["evicted"] += 1
+                    total -= size
+
+    # Function to search a query, answering from the cache whenever possible.
+    def Search(self, query, num_results=5):
+        key = NormalizeQuery(query)
+        # A query of only filler words has no key of its own and would share its entry with every other one.
+        if not key:
+            self.stats["bypassed"] += 1
+            return self.backend(query, num_results)
+
+        cached = self._Get(key, num_results)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        # Join a lookup of the same query that is already running.
+        with self.lock:
+            call = self.inflight.get((key, num_results))
+            leader = call is None
+            if leader:
+                call = Future()
+                self.inflight[(key, num_results)] = call
+        if not leader:
+            self.stats["coalesced"] += 1
+            return call.result()
+
+        self.stats["misses"] += 1
+        try:
+            results = self.backend(query, num_results)
+            self._Put(key, num_results, query, results)
+            call.set_result(results)
+            return results
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop((key, num_results), None)
+
+    # Function to remove every cached result.
+    def Clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM results")
+
+    # Function to report cache statistics.
+    def Report(self):
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return dict(self.stats, entries=entries, bytes=size,
+                    hit_rate=(self.stats["hits"] + self.stats["coalesced"]) / lookups if lookups else 0.0)
@@ -0,0 +1,121 @@
+import os  # Import os for file path handling.
+import re  # Import re to check session IDs.
+import time  # Import time to find idle sessions.
+import weakref  # Import weakref to find closed sessions that are still in use.
+import threading  # Import threading to guard the session table.
+from collections import OrderedDict, deque  # Import OrderedDict for the LRU table and deque for bounded history.
+from ChatLogStore import ChatLogStore, GetChatLog  # Import the append-only chat log store.
+from ContextWindow import ContextWindow, DefaultBudget, SummaryCachePath  # Import the token-budgeted context window.
+from Startup import Env  # Import the settings from the .env file, loaded once for all modules.
+
+# Load environment variables from the .env file.
+env_vars = Env()
+
+# Folder holding the chat logs and summaries of every session except the default one.
+SessionDir = os.path.join("Data", "Sessions")
+
+# Session used when none is named. It keeps the assistant's original chat log and summaries.
+DefaultSessionId = "default"
+
+# Maximum number of sessions kept in memory; the least recently used are closed first.
+MaxSessions = int(env_vars.get("MaxSessions") or 256)
+
+# Number of recent queries each session keeps for the decision model.
+DecisionHistory = int(env_vars.get("DecisionHistory") or 20)
+
+# Pattern session IDs must match, as they name folders.
+SessionIdPattern = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+# Conversation state of one user: chat log, context window and recent
+# queries. Different sessions share none of it, so their turns can run at
+# the same time; a turn is appended to the chat log in one write.
+class Session:
+
+    def __init__(self, session_id=DefaultSessionId, directory=SessionDir):
+        if not SessionIdPattern.fullmatch(session_id):
+            raise ValueError(f"invalid session id: {session_id!r}")
+        self.id = session_id
+        if session_id == DefaultSessionId:
+            self.chat_log = GetChatLog()
+            cache_path = SummaryCachePath
+        else:
+            folder = os.path.join(directory, session_id)
+            self.chat_log = ChatLogStore(os.path.join(folder, "ChatLog"))
+            cache_path = os.path.join(folder, "ContextSummaries.json")
+        self.context_window = ContextWindow(self.chat_log, budget=int(env_vars.get("ContextTokenBudget") or DefaultBudget),
+                                            cache_path=cache_path)
+        self.decisions = deque(maxlen=DecisionHistory)
+        self.last_used = time.time()
+
+
+# Table of open sessions, created on first use and closed when too many are open.
+# Closing a session only drops it from memory; its chat log stays on disk.
+# A closed session that a running turn still holds is reopened as the same
+# object, so there is never a second chat log store writing the same files.
+class SessionManager:
+
+    def __init__(self, directory=SessionDir, max_sessions=MaxSessions):
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()
+        self.closed = weakref.WeakValueDictionary()
+        self.stats = {"opened": 0, "closed": 0, "reopened": 0}
+
+    # Function to get a session, opening it if needed.
+    def Get(self, session_id=DefaultSessionId):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.closed.pop(session_id, None)
+                if session is not None:
+                    self.stats["reopened"] += 1
+                else:
+                    session = Session(session_id, self.directory)
+                    self.stats["opened"] += 1
+                self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            self._Trim()
+        session.last_used = time.time()
+        return session
+
+    # Function to close the least recently used sessions. Call with the lock held.
+    # The most recently used session, the one being opened, is never closed.
+    def _Trim(self):
+        for session_id in list(self.sessions)[:-1]:
+            if len(self.sessions) <= self.max_sessions:
+                break
+            if session_id != DefaultSessionId:
+                self.closed[session_id] = self.sessions.pop(session_id)
+                self.stats["closed"] += 1
+
+    # Function to close a session.
+    def Close(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                self.closed[session_id] = session
+                self.stats["closed"] += 1
+
+    # Function to report how many sessions are open.
+    def Report(self):
+        with self.lock:
+            return dict(self.stats, open=len(self.sessions))
+
+
+# Shared session table used by every module.
+_sessions = None
+_sessions_lock = threading.Lock()
+
+# Function to get the shared session table.
+def GetSessions():
+    global _sessions
+    with _sessions_lock:
+        if _sessions is None:
+            _sessions = SessionManager()
+    return _sessions
+
+# Function to get a session from the shared table, the default session when none is named.
+def GetSession(session_id=None):
+    return GetSessions().Get(session_id or DefaultSessionId)
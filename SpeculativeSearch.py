@@ -0,0 +1,116 @@
+import time  # Import time to measure saved and wasted work.
+import asyncio  # Import asyncio to run search and classification side by side.
+from Model import FirstLayerDMM, IntentConfidence  # Import the decision model.
+from IntentClassifier import classifier  # Import the local classifier to skip hopeless speculation.
+from DecisionCache import NormalizeQuery  # Import the query normalization used by the search cache.
+from RealtimeSearchEngine import search_cache, RealtimeSearchEngine  # Import the shared search cache.
+
+# Number of results requested, the same as RealtimeSearchEngine.GoogleSearch.
+NumResults = 5
+
+
+# Orchestrator that starts the web search for an utterance while FirstLayerDMM is still classifying it.
+#
+# The speculative search fills the shared search cache, so when the decision is
+# "realtime" RealtimeSearchEngine finds the results ready, or joins the search
+# that is still running, instead of starting it after the classification.
+# The decision is returned as soon as it is known, so automation is never held
+# up by the search; only the realtime answer waits for it.
+class SpeculativeSearch:
+
+    def __init__(self, cache=search_cache):
+        self.cache = cache
+        self.metrics = {"turns": 0, "speculated": 0, "skipped": 0, "used": 0, "wasted": 0, "failed": 0,
+                        "saved_seconds": 0.0, "wasted_seconds": 0.0}
+
+    # Function to run the search in a thread and time it.
+    async def _Search(self, query):
+        start = time.perf_counter()
+        await asyncio.to_thread(self.cache.Search, query, NumResults)
+        return start, time.perf_counter()
+
+    # Function to decide whether a search is worth starting before the decision is known.
+    @staticmethod
+    def _WorthSpeculating(query):
+        tasks, confidence = classifier.Classify(query)
+        if confidence < IntentConfidence:
+            return True
+        return any(task.startswith("realtime") for task in tasks)
+
+    # Function to classify an utterance for a session while its search runs speculatively.
+    # Returns (decision, prefetch): prefetch is a task the realtime answer awaits, or None.
+    async def Decide(self, query, session=None):
+        self.metrics["turns"] += 1
+        search = None
+        if self._WorthSpeculating(query):
+            self.metrics["speculated"] += 1
+            search = asyncio.create_task(self._Search(query))
+        else:
+            self.metrics["skipped"] += 1
+
+        decided_at = None
+        try:
+            decision = await asyncio.to_thread(FirstLayerDMM, query, session)
+            decided_at = time.perf_counter()
+        finally:
+            if search is not None and decided_at is None:
+                search.cancel()
+
+        if search is None:
+            return decision, None
+
+        key = NormalizeQuery(query)
+        used = any(task.startswith("realtime") and NormalizeQuery(task.removeprefix("realtime")) == key for task in decision)
+        if used:
+            return decision, asyncio.create_task(self._Prefetched(search, decided_at))
+        # Nothing is waiting for the results any more, only count the work that was spent.
+        search.add_done_callback(self._CountWasted)
+        return decision, None
+
+    # Function to wait for a speculative search the decision needs and count the time it saved.
+    async def _Prefetched(self, search, decided_at):
+        # A failed prefetch must not fail the answer; the realtime engine searches again.
+        try:
+            start, end = await search
+        except Exception as e:
+            self.metrics["failed"] += 1
+            print(f"Speculative search failed: {e}")
+            return
+        # The time the search ran alongside the classification came off the critical path.
+        self.metrics["used"] += 1
+        self.metrics["saved_seconds"] += min(end, decided_at) - start
+
+    # Function to count a finished speculative search that nobody needed.
+    def _CountWasted(self, task):
+        self.metrics["wasted"] += 1
+        if not task.cancelled() and task.exception() is not None:
+            self.metrics["failed"] += 1
+        elif not task.cancelled():
+            start, end = task.result()
+            self.metrics["wasted_seconds"] += end - start
+
+    # Function to decide and answer realtime tasks, returning (decision, answers).
+    async def Turn(self, query, session=None):
+        decision, prefetch = await self.Decide(query, session)
+        answers = []
+        for task in decision:
+            if task.startswith("realtime"):
+                if prefetch:
+                    await prefetch
+                answers.append(await asyncio.to_thread(RealtimeSearchEngine, task.removeprefix("realtime").strip(), session))
+        return decision, answers
+
+    # Function to report the speculation metrics.
+    def Report(self):
+        speculated = self.metrics["speculated"]
+        return dict(self.metrics, use_rate=self.metrics["used"] / speculated if speculated else 0.0)
+
+
+# Shared orchestrator instance.
+speculative_search = SpeculativeSearch()
+
+# Entry point to try the orchestrator on typed queries.
+if __name__ == "__main__":
+    while True:
+        print(asyncio.run(speculative_search.Turn(input(">>> "))))
+        print(speculative_search.Report())
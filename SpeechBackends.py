@@ -0,0 +1,328 @@
+import os  # Import os for file path handling.
+import io  # Import io to read raw PCM from pipes and buffers.
+import sys  # Import sys to read raw PCM from standard input.
+import time  # Import time to measure latency and CPU use.
+import wave  # Import wave to read WAV files.
+import queue  # Import queue for the result channel of the offline backend.
+import threading  # Import threading to run voice activity detection in the background.
+from Startup import Lazy  # Import the lazy import helper.
+
+# numpy is only needed by the offline backend.
+np = Lazy("numpy")
+
+# Page used by the browser backend. Results are appended to #output and the
+# time of the last result is kept so the latency to Python can be measured.
+HtmlCode = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <title>Speech Recognition</title>
+</head>
+<body>
+    <button id="start" onclick="startRecognition()">Start Recognition</button>
+    <button id="end" onclick="stopRecognition()">Stop Recognition</button>
+    <p id="output"></p>
+    <script>
+        const output = document.getElementById('output');
+        let recognition;
+        window.lastResultAt = 0;
+
+        function startRecognition() {
+            recognition = new webkitSpeechRecognition() || new SpeechRecognition();
+            recognition.lang = '';
+            recognition.continuous = true;
+
+            recognition.onresult = function(event) {
+                const transcript = event.results[event.results.length - 1][0].transcript;
+                window.lastResultAt = Date.now();
+                output.textContent += transcript;
+            };
+
+            recognition.onend = function() {
+                recognition.start();
+            };
+            recognition.start();
+        }
+
+        function stopRecognition() {
+            recognition.stop();
+            output.innerHTML = "";
+        }
+    </script>
+</body>
+</html>'''
+
+# Script that waits inside the page until #output has text, so Python blocks
+# on the driver call instead of polling the element in a loop.
+WaitForResultScript = '''
+const done = arguments[arguments.length - 1];
+const output = document.getElementById('output');
+const finish = () => done({text: output.textContent, at: window.lastResultAt});
+if (output.textContent) { finish(); return; }
+const observer = new MutationObserver(() => {
+    if (output.textContent) { observer.disconnect(); finish(); }
+});
+observer.observe(output, {childList: true, characterData: true, subtree: true});
+'''
+
+
+# Interface every speech recognition backend implements.
+#
+# Listen() blocks until one utterance has been recognized and returns its text.
+# Backends record the end-of-speech to text latency of each utterance and the
+# CPU time spent while waiting, so idle cost can be compared between them.
+class SpeechBackend:
+
+    def __init__(self):
+        self.stats = {"utterances": 0, "latencies": [], "cpu_seconds": 0.0, "wall_seconds": 0.0}
+
+    # Function to prepare the backend, called once before the first Listen().
+    def Start(self):
+        pass
+
+    # Function to wait for the next utterance and return its text.
+    def Listen(self):
+        raise NotImplementedError
+
+    # Function to release the backend's resources.
+    def Stop(self):
+        pass
+
+    # Function to listen while measuring the CPU and wall time spent waiting.
+    def Measure(self):
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            return self.Listen()
+        finally:
+            self.stats["cpu_seconds"] += time.process_time() - cpu
+            self.stats["wall_seconds"] += time.perf_counter() - wall
+
+    # Function to record the latency of one recognized utterance.
+    def _Record(self, latency):
+        self.stats["utterances"] += 1
+        self.stats["latencies"].append(latency)
+
+    # Function to summarize the measurements.
+    def Report(self):
+        latencies = sorted(self.stats["latencies"])
+        wall = self.stats["wall_seconds"]
+        return {
+            "utterances": self.stats["utterances"],
+            "cpu_fraction": self.stats["cpu_seconds"] / wall if wall else 0.0,
+            "median_latency": latencies[len(latencies) // 2] if latencies else None,
+            "max_latency": latencies[-1] if latencies else None,
+        }
+
+
+# Backend that uses the Web Speech API in a headless Chrome page.
+# Chrome is only started by Start(), never at import time.
+class BrowserSpeechBackend(SpeechBackend):
+
+    def __init__(self, language="en", wait_seconds=30):
+        super().__init__()
+        self.language = language
+        self.wait_seconds = wait_seconds
+        self.driver = None
+        self.link = None
+
+    # Function to write the page and start Chrome.
+    def Start(self):
+        if self.driver is not None:
+            return
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        # Write the page with the input language filled in.
+        os.makedirs("Data", exist_ok=True)
+        with open(os.path.join("Data", "Voice.html"), "w") as f:
+            f.write(HtmlCode.replace("recognition.lang = '';", f"recognition.lang = '{self.language}';"))
+        self.link = "file:///" + os.path.join(os.getcwd(), "Data", "Voice.html")
+
+        # Set Chrome options for the webDriver.
+        chrome_options = Options()
+        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
+        chrome_options.add_argument(f'user-agent={user_agent}')
+        chrome_options.add_argument("--use-fake-ui-for-media-stream")
+        chrome_options.add_argument("--use-fake-device-for-media-stream")
+        chrome_options.add_argument("--headless=new")
+        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        self.driver.set_script_timeout(self.wait_seconds)
+
+    # Function to wait for the page to push a result and return it.
+    def Listen(self):
+        from selenium.webdriver.common.by import By
+        from selenium.common.exceptions import TimeoutException
+        self.Start()
+
+        # Open the page and start speech recognition by clicking the start button.
+        self.driver.get(self.link)
+        self.driver.find_element(by=By.ID, value="start").click()
+
+        while True:
+            try:
+                # The browser holds this call until the MutationObserver sees text.
+                result = self.driver.execute_async_script(WaitForResultScript)
+            except TimeoutException:
+                continue
+
+            # Stop recognition by clicking the stop button.
+            self.driver.find_element(by=By.ID, value="end").click()
+            if result.get("at"):
+                self._Record(max(time.time() * 1000 - result["at"], 0) / 1000)
+            return result["text"]
+
+    # Function to close Chrome.
+    def Stop(self):
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+
+
+# Function to build a transcriber with the optional vosk package.
+def VoskTranscriber(model_path=os.path.join("Data", "vosk-model")):
+    from vosk import Model, KaldiRecognizer
+    model = Model(model_path)
+
+    def Transcribe(pcm, sample_rate):
+        import json
+        recognizer = KaldiRecognizer(model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+    return Transcribe
+
+
+# Backend that reads 16-bit mono audio from a WAV file or a raw PCM pipe,
+# cuts it into utterances with energy-based voice activity detection and
+# passes each utterance to a transcriber(pcm_bytes, sample_rate) -> text.
+class OfflineSpeechBackend(SpeechBackend):
+
+    def __init__(self, source, transcriber=None, sample_rate=16000, frame_ms=30,
+                 threshold=3.0, min_speech_ms=150, hangover_ms=500, realtime=False):
+        super().__init__()
+        self.source = source
+        self.transcriber = transcriber
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.threshold = threshold
+        self.min_speech_frames = max(min_speech_ms // frame_ms, 1)
+        self.hangover_frames = max(hangover_ms // frame_ms, 1)
+        self.realtime = realtime
+        self.results = queue.Queue()
+        self.thread = None
+
+    # Function to open the audio source, returning a readable binary stream.
+    # "-" is standard input, looked up only now: under pythonw there is none.
+    def _Open(self):
+        if self.source == "-":
+            if sys.stdin is None:
+                raise ValueError("standard input is not available, set SpeechSource to a WAV file or a pipe")
+            return sys.stdin.buffer
+        if isinstance(self.source, (str, os.PathLike)) and str(self.source).lower().endswith(".wav"):
+            audio = wave.open(str(self.source), "rb")
+            if audio.getsampwidth() != 2 or audio.getnchannels() != 1:
+                raise ValueError("only 16-bit mono WAV files are supported")
+            self.sample_rate = audio.getframerate()
+            return io.BufferedReader(_WaveStream(audio))
+        if isinstance(self.source, (str, os.PathLike)):
+            return open(self.source, "rb")
+        return self.source
+
+    # Function to start reading audio in the background.
+    def Start(self):
+        if self.thread is not None:
+            return
+        if self.transcriber is None:
+            self.transcriber = VoskTranscriber()
+        self.thread = threading.Thread(target=self._Run, daemon=True)
+        self.thread.start()
+
+    # Function run in the background: detect utterances and transcribe them.
+    def _Run(self):
+        noise = None
+        voiced = []
+        speech_frames = 0
+        silence_frames = 0
+        last_voice_at = None
+
+        try:
+            stream = self._Open()
+            frame_bytes = self.sample_rate * self.frame_ms // 1000 * 2
+            while True:
+                frame = stream.read(frame_bytes)
+                if len(frame) < frame_bytes:
+                    break
+                if self.realtime:
+                    time.sleep(self.frame_ms / 1000)
+
+                samples = np.frombuffer(frame, dtype="<i2").astype(np.float32)
+                energy = float(np.sqrt(np.mean(samples * samples))) + 1.0
+                noise = energy if noise is None else noise
+                is_speech = energy > noise * self.threshold
+
+                if is_speech:
+                    voiced.append(frame)
+                    speech_frames += 1
+                    silence_frames = 0
+                    last_voice_at = time.perf_counter()
+                    continue
+
+                # Track the background level only while nobody is speaking.
+                noise = 0.95 * noise + 0.05 * energy
+                if not voiced:
+                    continue
+                voiced.append(frame)
+                silence_frames += 1
+                if silence_frames >= self.hangover_frames:
+                    self._Finish(voiced, speech_frames, last_voice_at)
+                    voiced, speech_frames, silence_frames = [], 0, 0
+
+            if voiced:
+                self._Finish(voiced, speech_frames, last_voice_at)
+        except Exception as e:
+            print(f"Error in offline speech backend: {e}")
+        finally:
+            self.results.put(None)
+
+    # Function to transcribe a finished utterance and hand the text to Listen().
+    def _Finish(self, frames, speech_frames, last_voice_at):
+        if speech_frames < self.min_speech_frames:
+            return
+        text = self.transcriber(b"".join(frames), self.sample_rate)
+        if text:
+            self.results.put((text, last_voice_at))
+
+    # Function to wait for the next utterance; returns None once the source has ended.
+    def Listen(self):
+        self.Start()
+        result = self.results.get()
+        if result is None:
+            self.results.put(None)
+            return None
+        text, last_voice_at = result
+        self._Record(time.perf_counter() - last_voice_at)
+        return text
+
+
+# Minimal raw stream over the frames of an open WAV file.
+class _WaveStream(io.RawIOBase):
+
+    def __init__(self, audio):
+        self.audio = audio
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.audio.readframes(len(buffer) // 2)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+# Function to create the backend chosen by name.
+def CreateBackend(name, language="en", source=None, transcriber=None):
+    if name == "offline":
+        return OfflineSpeechBackend(source, transcriber)
+    return BrowserSpeechBackend(language)
@@ -1,85 +1,41 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from dotenv import dotenv_values
+from Startup import Env, Lazy
 import os
-import mtranslate as mt
+from TranslationCache import Translator, IsEnglish
+from SpeechBackends import CreateBackend
+import Tracing
 
 # Load environment variables from the .env file.
-env_vars = dotenv_values(".env")
+env_vars = Env()
 # Get the input language setting from the environment variables.
 InputLanguage = env_vars.get("InputLanguage")  
 
-# Define the HTML code for the speech recognition interface.
-HtmlCode = '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <title>Speech Recognition</title>
-</head>
-<body>
-    <button id="start" onclick="startRecognition()">Start Recognition</button>
-    <button id="end" onclick="stopRecognition()">Stop Recognition</button>
-    <p id="output"></p>
-    <script>
-        const output = document.getElementById('output');
-        let recognition;
-
-        function startRecognition() {
-            recognition = new webkitSpeechRecognition() || new SpeechRecognition();
-            recognition.lang = '';
-            recognition.continuous = true;
-
-            recognition.onresult = function(event) {
-                const transcript = event.results[event.results.length - 1][0].transcript;
-                output.textContent += transcript;
-            };
-
-            recognition.onend = function() {
-                recognition.start();
-            };
-            recognition.start();
-        }
-
-        function stopRecognition() {
-            recognition.stop();
-            output.innerHTML = "";
-        }
-    </script>
-</body>
-</html>'''
-
-# Replace the language setting in the HTML code with the input languagefrom the environment variables.
-HtmlCode = str(HtmlCode).replace("recognition.lang = '';", f"recognition.lang = '{InputLanguage}';")
-
-# Write the modified HTML code to a file.
-with open(r"Data\Voice.html", "w") as f:
-    f.write(HtmlCode)
+# Speech recognition backend: "browser" (headless Chrome) or "offline" (WAV file or raw PCM pipe).
+SpeechBackendName = (env_vars.get("SpeechBackend") or "browser").lower()
+# Audio source of the offline backend, "-" reads raw PCM from standard input.
+SpeechSource = env_vars.get("SpeechSource") or "-"
 
 # et the current working directory.
 current_dir = os.getcwd()
-# Generate the file path for the HTML file.
-Link = f"{current_dir}/Data/Voice.html"
 
-# Set Chrome options or the webDriver.
-chrome_options = Options()
-user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
-chrome_options.add_argument(f'user-agent={user_agent}')
-chrome_options.add_argument("--use-fake-ui-for-media-stream")
-chrome_options.add_argument("--use-fake-device-for-media-stream")
-chrome_options.add_argument("--headless=new")
-# Initialize the Chrome Webdriver using the ChromeDriverManager.
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
+# Create the backend; Chrome or the offline model is only started on the first recognition.
+backend = CreateBackend(SpeechBackendName, language=InputLanguage, source=SpeechSource)
 
 # Define the path for temporary files.
 TempDirPath = rf"{current_dir}/Frontend/Files"
 
-# Function to set the assistant's statuds by writing it to a file.
+# Whether the status is also written to Status.data for frontends that read the file.
+StatusFile = (env_vars.get("StatusFile") or "True").lower() == "true"
+
+# Functions called with every new status, for example by the assistant daemon to push it to its clients.
+StatusListeners = []
+
+# Function to set the assistant's statuds, passing it to the listeners and writing it to a file.
 def SetAssistantStatus(Status):
-    with open(rf'{TempDirPath}/Status.data', "w", encoding='utf-8') as file:
-        file.write(Status)
+    for listener in StatusListeners:
+        listener(Status)
+    if StatusFile:
+        with open(rf'{TempDirPath}/Status.data', "w", encoding='utf-8') as file:
+            file.write(Status)
         
 # Function to modify a query to ensure proper punctuation and formatting.
 def QueryModifier(Query):
@@ -100,41 +56,43 @@ def QueryModifier(Query):
             
     return new_query.capitalize()
 
-# Function to tranlate text into English using the mtranslate library.
+# Shared translator with a persistent cache, opened on first use; text that is already English is passed through.
+translator = Lazy(Translator)
+
+# Function to tranlate text into English using the cached translator.
 def UniversalTranslator(Text):
-    english_translation = mt.translate(Text, "en", "auto")
+    english_translation = translator.Translate(Text)
     return english_translation.capitalize()
 
-# Function to perform speech recognition using the webDriver.
+# Function to perform speech recognition using the configured backend.
 def SpeechRecognition():
-    # Open the HTML file in the browser.
-    driver.get("file:///" + Link)
-    #Start speech recognition by clicking the start button.
-    driver.find_element(by=By.ID, value="start").click()
-    
-    while True:
-        try:
-            # Get the reognized text from the HTML output element.
-            Text = driver.find_element(by=By.ID, value="output").text
-            
-            if Text:
-                # Sto recognition by clicking the stop button
-                driver.find_element(by=By.ID, value="end").click()
-                
-                # If the input language is English, return the modified query.
-                if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
-                    return QueryModifier(Text)
-                else:
-                    # If the input language is not English, translae the text and return it.
-                    SetAssistantStatus("Translating...")
-                    return QueryModifier(UniversalTranslator(Text))
-                
-        except Exception as e:
-            pass
+    # Wait for the backend to push the next recognized text.
+    Text = backend.Measure()
+    if not Text:
+        return None
+
+    # Every recognized utterance starts a new turn; record how long recognition took after speech ended.
+    Tracing.StartTrace("turn", backend=SpeechBackendName)
+    if backend.stats["latencies"]:
+        Tracing.Record("speech_recognition", backend.stats["latencies"][-1])
+
+    # If the input language is English or the text already is, return the modified query.
+    if InputLanguage.lower() == "en" or "en" in InputLanguage.lower() or IsEnglish(Text):
+        return QueryModifier(Text)
+    else:
+        # If the input language is not English, translae the text and return it.
+        SetAssistantStatus("Translating...")
+        with Tracing.Span("translation"):
+            return QueryModifier(UniversalTranslator(Text))
         
 # Main execution block.
 if __name__ == "__main__":
     while True:
         # Continously perform speech recognition and print the recognized text.
         Text = SpeechRecognition()
-        print(Text)
\ No newline at end of file
+        if Text is None:
+            break
+        print(Text)
+    # Print the idle CPU use and end-of-speech latency measured by the backend.
+    print(backend.Report())
+    print(translator.Report())
\ No newline at end of file
@@ -0,0 +1,164 @@
+import os  # Import os for file path handling.
+import re  # Import re to parse the import time report.
+import sys  # Import sys to run the benchmark with the current interpreter.
+import json  # Import json to print the benchmark report.
+import time  # Import time to measure time-to-ready.
+import importlib  # Import importlib to load modules on first use.
+import threading  # Import threading for the background pre-warm.
+import subprocess  # Import subprocess to measure imports in a fresh interpreter.
+
+# Settings read from the .env file, loaded once and shared by every module.
+_env = None
+_env_lock = threading.Lock()
+
+# Function to get the settings from the .env file, reading the file only once per process.
+def Env():
+    global _env
+    with _env_lock:
+        if _env is None:
+            from dotenv import dotenv_values
+            _env = dotenv_values(".env")
+    return _env
+
+
+# Stand-in for a module, an attribute of a module, or a shared object that is
+# imported or created on first use.
+#
+#     pygame = Lazy("pygame")
+#     appopen = Lazy("AppOpener", "open")
+#     answer_cache = Lazy(lambda: AnswerCache(...))
+#
+# Attribute access and calls are passed on to the real object once it is loaded.
+class Lazy:
+
+    def __init__(self, module, attribute=None):
+        self._module = module
+        self._attribute = attribute
+        self._object = None
+        self._lock = threading.Lock()
+
+    # Function to import the module and find the attribute, or create the object, only the first time.
+    def _Load(self):
+        if self._object is None:
+            with self._lock:
+                if self._object is None:
+                    if callable(self._module):
+                        self._object = self._module()
+                    else:
+                        target = importlib.import_module(self._module)
+                        self._object = getattr(target, self._attribute) if self._attribute else target
+        return self._object
+
+    def __getattr__(self, name):
+        return getattr(self._Load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._Load()(*args, **kwargs)
+
+    def __repr__(self):
+        if callable(self._module):
+            name = getattr(self._module, "__qualname__", repr(self._module))
+        else:
+            name = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        return f"<Lazy {name} {'loaded' if self._object is not None else 'not loaded'}>"
+
+
+# Heavy dependencies loaded by the pre-warm, in order of how soon they are usually needed.
+PreWarmModules = ["numpy", "httpx", "groq", "cohere", "edge_tts", "pygame", "mtranslate", "requests",
+                  "PIL.Image", "AppOpener", "keyboard", "bs4", "pywhatkit", "selenium.webdriver"]
+
+# Function to load heavy dependencies and run warm-up functions in a background thread.
+# Missing optional dependencies are skipped. Returns the thread; its `timings` hold seconds per step.
+def PreWarm(modules=PreWarmModules, functions=(), background=True):
+    timings = {}
+
+    def Warm():
+        for name in modules:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception:
+                continue
+            timings[name] = time.perf_counter() - start
+        for function in functions:
+            start = time.perf_counter()
+            try:
+                function()
+            except Exception as e:
+                print(f"Pre-warm of {getattr(function, '__name__', function)} failed: {e}")
+                continue
+            timings[getattr(function, "__name__", repr(function))] = time.perf_counter() - start
+
+    thread = threading.Thread(target=Warm, daemon=True)
+    thread.timings = timings
+    if background:
+        thread.start()
+    else:
+        Warm()
+    return thread
+
+
+# Modules of the assistant measured by the benchmark.
+BenchmarkModules = ["LLMClient", "ChatLogStore", "ContextWindow", "Chatbot", "RealtimeSearchEngine", "Model",
+                    "SpeculativeSearch", "TextToSpeech", "SpeechToText", "Automation", "ImageGeneration"]
+
+# Function to import a module in a fresh interpreter with -X importtime and collect the costs.
+def MeasureImport(module, top=5):
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, cwd=os.getcwd())
+    wall = time.perf_counter() - start
+
+    # Lines look like "import time:       self [us] |  cumulative | imported package".
+    entries = []
+    for line in process.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            entries.append({"module": match.group(4), "self_ms": int(match.group(1)) / 1000,
+                            "cumulative_ms": int(match.group(2)) / 1000, "depth": len(match.group(3)) // 2})
+
+    total = next((e["cumulative_ms"] for e in entries if e["module"] == module and e["depth"] == 0), None)
+    heaviest = sorted((e for e in entries if e["module"] != module), key=lambda e: e["self_ms"], reverse=True)[:top]
+    error = process.stderr.strip().splitlines()[-1] if process.returncode else None
+    return {"module": module, "import_ms": total, "process_ms": wall * 1000, "error": error,
+            "heaviest": [{"module": e["module"], "self_ms": e["self_ms"]} for e in heaviest]}
+
+# Function to measure time-to-ready: importing every module, then optionally waiting for the pre-warm.
+# Modules that fail to import are listed in "failed"; the time is then not a valid time-to-ready and
+# "ready_ms" is None, as a module that stops early makes the import look faster than it is.
+def MeasureReady(modules=BenchmarkModules, prewarm=False):
+    code = ("import sys, json, time, importlib; start = time.perf_counter()\n"
+            "failed = {}\n"
+            f"for name in {modules!r}:\n"
+            "    try: importlib.import_module(name)\n"
+            "    except Exception as e:\n"
+            "        failed[name] = f'{type(e).__name__}: {e}'\n"
+            "        print(f'{name}: {failed[name]}', file=sys.stderr)\n"
+            "ready = time.perf_counter() - start\n"
+            "warm = None\n"
+            f"if {prewarm!r}:\n"
+            "    import Startup; Startup.PreWarm(background=False); warm = time.perf_counter() - start\n"
+            "print(json.dumps({'ready': ready, 'warm': warm, 'failed': failed}))")
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd())
+    lines = process.stdout.strip().splitlines()
+    # A failed measurement reports the child's own error rather than a parse error of its missing output.
+    if process.returncode or not lines:
+        return {"ready_ms": None, "prewarmed_ms": None, "failed": {},
+                "error": process.stderr.strip() or f"exited with code {process.returncode}"}
+    result = json.loads(lines[-1])
+    failed = result["failed"]
+    return {"ready_ms": result["ready"] * 1000 if not failed else None,
+            "prewarmed_ms": result["warm"] * 1000 if result["warm"] is not None and not failed else None,
+            "failed": failed, "error": f"failed to import {', '.join(failed)}" if failed else None}
+
+# Function to run the whole startup benchmark.
+def Benchmark(modules=BenchmarkModules, prewarm=True):
+    return {"modules": [MeasureImport(module) for module in modules], "ready": MeasureReady(modules, prewarm)}
+
+# Entry point to print the startup benchmark, optionally for the modules given on the command line.
+if __name__ == "__main__":
+    report = Benchmark(sys.argv[1:] or BenchmarkModules)
+    for entry in report["modules"]:
+        cost = f"{entry['import_ms']:.1f} ms" if entry["import_ms"] is not None else "failed"
+        print(f"{entry['module']:<22} {cost:>12}   {entry['error'] or ''}")
+    print(json.dumps(report, indent=2))
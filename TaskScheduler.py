@@ -0,0 +1,239 @@
+import time  # Import time to measure task durations.
+import random  # Import random for the benchmark's stubbed actions.
+import asyncio  # Import asyncio to run tasks and stream their results.
+import threading  # Import threading to create the pools safely.
+import contextvars  # Import contextvars so actions are traced as part of the turn that ran them.
+from concurrent.futures import ThreadPoolExecutor  # Import ThreadPoolExecutor for the per-kind thread pools.
+import Tracing  # Import tracing to time automation actions.
+
+# Command kinds in the order their prefixes are matched.
+CommandKinds = ["google search", "youtube search", "open", "close", "play", "content", "system", "general", "realtime"]
+
+# How many commands of each kind may run at the same time.
+DefaultLimits = {"open": 4, "close": 4, "play": 1, "content": 2, "google search": 2, "youtube search": 2, "system": 1}
+
+# Seconds a command of each kind may take, from being queued to finishing.
+DefaultDeadlines = {"open": 20, "close": 10, "play": 15, "content": 180, "google search": 15, "youtube search": 10, "system": 5}
+DefaultDeadline = 30
+
+# Kinds answered by the chat engines rather than by an automation action.
+PassThroughKinds = {"general", "realtime"}
+
+# Commands that look like "open" commands but have nothing to open.
+IgnoredCommands = {"open it", "open file"}
+
+# Function to split a command into its kind and argument, returning (None, command) if no kind matches.
+def ParseCommand(command):
+    for kind in CommandKinds:
+        if command.startswith(kind + " "):
+            return kind, command.removeprefix(kind + " ")
+    return None, command
+
+# Function to find the key of commands that must run in the order they were given.
+# Opening and closing the same app must not overtake each other, and system
+# commands such as mute and unmute act on the same state.
+def OrderKey(kind, argument):
+    if kind in ("open", "close"):
+        return "app:" + argument.strip().lower()
+    if kind == "system":
+        return "system"
+    return None
+
+# Function to mark a future as resolved, once.
+def _Resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+# Function to resolve a future of an event loop from another thread, unless the loop has already closed.
+def _ResolveSoon(loop, future):
+    try:
+        loop.call_soon_threadsafe(_Resolve, future)
+    except RuntimeError:
+        pass
+
+
+# Scheduler for automation commands.
+#
+# Every command kind has its own thread pool, sized to the kind's concurrency
+# limit, so a slow kind cannot hold up the others. Each task has a deadline,
+# commands with the same order key run one after the other, and results are
+# yielded as soon as each task finishes. A thread cannot be stopped, so when
+# an action overruns its deadline its pool is replaced for the next commands
+# of that kind, and the next command with the same order key waits until the
+# action has really ended.
+class TaskScheduler:
+
+    def __init__(self, actions, limits=DefaultLimits, deadlines=DefaultDeadlines):
+        self.actions = actions
+        self.limits = limits
+        self.deadlines = deadlines
+        self.pools = {}
+        self.lock = threading.Lock()
+        self.stats = {"ok": 0, "error": 0, "timeout": 0, "cancelled": 0, "skipped": 0, "unknown": 0, "replaced": 0}
+
+    # Function to get the thread pool of a kind, created on first use.
+    def _Pool(self, kind):
+        with self.lock:
+            if kind not in self.pools:
+                self.pools[kind] = ThreadPoolExecutor(max_workers=self.limits.get(kind, 1), thread_name_prefix=f"automation-{kind.replace(' ', '-')}")
+            return self.pools[kind]
+
+    # Function to retire a pool whose worker is stuck in an action, so the next commands of its kind get a new one.
+    def _Replace(self, kind, pool):
+        with self.lock:
+            if self.pools.get(kind) is not pool:
+                return
+            del self.pools[kind]
+            self.stats["replaced"] += 1
+        pool.shutdown(wait=False)
+
+    # Function to run one command after the command it must follow, returning its result.
+    # `after` and `finished` resolve when the earlier and this command's actions have really ended,
+    # which for an action that overran its deadline is later than its result.
+    async def _Execute(self, command, kind, argument, after, finished):
+        result = {"command": command, "kind": kind, "status": "ok", "result": None, "error": None, "seconds": 0.0}
+        started = False
+        try:
+            if kind is None:
+                result.update(status="unknown", error="no function for this command")
+            elif kind in PassThroughKinds:
+                result.update(status="skipped", error="answered by the chat engine")
+            elif command in IgnoredCommands or kind not in self.actions:
+                result.update(status="skipped", error="nothing to do")
+            if result["status"] != "ok":
+                self.stats[result["status"]] += 1
+                return result
+
+            # The deadline runs from being queued, so waiting for the earlier command counts towards it.
+            deadline = self.deadlines.get(kind, DefaultDeadline)
+            start = time.perf_counter()
+
+            # Ordering only: the outcome of the earlier command does not matter, but it must have ended.
+            if after is not None:
+                await asyncio.wait([after], timeout=deadline)
+                if not after.done():
+                    result.update(status="timeout", error="an earlier command on the same target is still running",
+                                  seconds=time.perf_counter() - start)
+                    self.stats["timeout"] += 1
+                    return result
+
+            loop = asyncio.get_running_loop()
+            pool = self._Pool(kind)
+            future = pool.submit(contextvars.copy_context().run, self.actions[kind], argument)
+            started = True
+            future.add_done_callback(lambda _: _ResolveSoon(loop, finished))
+            try:
+                remaining = max(deadline - (time.perf_counter() - start), 0)
+                result["result"] = await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+            except asyncio.TimeoutError:
+                if not future.cancel() and not future.done():
+                    self._Replace(kind, pool)
+                result.update(status="timeout", error=f"no result within {deadline} seconds")
+            except asyncio.CancelledError:
+                future.cancel()
+                self.stats["cancelled"] += 1
+                raise
+            except Exception as e:
+                result.update(status="error", error=f"{type(e).__name__}: {e}")
+            result["seconds"] = time.perf_counter() - start
+        finally:
+            # A command that never ran ends when the command it was waiting for ends.
+            if not started:
+                if after is not None and not after.done():
+                    after.add_done_callback(lambda _: _Resolve(finished))
+                else:
+                    _Resolve(finished)
+
+        self.stats[result["status"]] += 1
+        Tracing.Record("automation", result["seconds"], kind=kind, status=result["status"])
+        Tracing.Count("automation_actions", kind=kind, status=result["status"])
+        return result
+
+    # Async generator that runs commands and yields their results in completion order.
+    # Closing the generator early cancels the commands that have not finished.
+    async def Run(self, commands):
+        loop = asyncio.get_running_loop()
+        tasks = []
+        last = {}
+        for command in commands:
+            kind, argument = ParseCommand(command)
+            key = OrderKey(kind, argument)
+            finished = loop.create_future()
+            tasks.append(asyncio.create_task(self._Execute(command, kind, argument, last.get(key), finished)))
+            if key is not None:
+                last[key] = finished
+
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # Function to report how the tasks ended.
+    def Report(self):
+        return dict(self.stats)
+
+
+# Function to run commands the way TranslateAndExecute did before the scheduler, for comparison.
+async def _GatherAll(actions, commands):
+    funcs = []
+    for command in commands:
+        kind, argument = ParseCommand(command)
+        if kind in actions and command not in IgnoredCommands:
+            funcs.append(asyncio.to_thread(actions[kind], argument))
+    return await asyncio.gather(*funcs, return_exceptions=True)
+
+# Function to build stubbed actions that sleep for a typical time of each kind, sometimes failing or hanging.
+def _StubActions(scale=0.02, failure_rate=0.05, hang_rate=0.02):
+    typical = {"open": 3, "close": 1, "play": 4, "content": 60, "google search": 2, "youtube search": 1, "system": 0.5}
+
+    def Make(kind):
+        def Action(argument):
+            roll = random.random()
+            if roll < hang_rate:
+                time.sleep(DefaultDeadlines[kind] * scale * 3)
+            elif roll < hang_rate + failure_rate:
+                raise RuntimeError(f"{kind} {argument} failed")
+            else:
+                time.sleep(typical[kind] * scale * random.uniform(0.5, 1.5))
+            return True
+        return Action
+
+    return {kind: Make(kind) for kind in typical}
+
+# Function to benchmark the scheduler against the old gather on mixed batches of stubbed actions.
+async def Benchmark(batches=20, batch_size=8, scale=0.02, seed=1):
+    random.seed(seed)
+    actions = _StubActions(scale)
+    deadlines = {kind: seconds * scale for kind, seconds in DefaultDeadlines.items()}
+    scheduler = TaskScheduler(actions, deadlines=deadlines)
+    commands = ["open chrome", "close chrome", "play song", "content letter", "google search weather",
+                "youtube search music", "system mute", "system unmute", "general hi", "realtime news", "open notepad"]
+
+    report = {"scheduler_first": [], "scheduler_total": [], "gather_total": [], "gather_errors": 0}
+    for _ in range(batches):
+        batch = random.sample(commands, batch_size)
+
+        start = time.perf_counter()
+        first = None
+        async for result in scheduler.Run(batch):
+            if first is None and result["status"] == "ok":
+                first = time.perf_counter() - start
+        report["scheduler_first"].append(first or 0.0)
+        report["scheduler_total"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = await _GatherAll(actions, batch)
+        report["gather_total"].append(time.perf_counter() - start)
+        report["gather_errors"] += sum(isinstance(r, Exception) for r in results)
+
+    summary = {name: sorted(values)[len(values) // 2] for name, values in report.items() if isinstance(values, list)}
+    summary["gather_errors"] = report["gather_errors"]
+    summary["scheduler"] = scheduler.Report()
+    return summary
+
+# Entry point to run the scheduler benchmark.
+if __name__ == "__main__":
+    for name, value in asyncio.run(Benchmark()).items():
+        print(f"{name:<18} {value:.3f} s" if isinstance(value, float) else f"{name:<18} {value}")
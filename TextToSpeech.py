@@ -1,13 +1,60 @@
-import pygame  # Import pygame library for handling audio playback
 import random  # Import random for generating random choices
 import asyncio  # Import asyncio for asynchronous operation
-import edge_tts  # Import edge_tts for text-to-speech functionality
 import os  # Import os for file path handling
-from dotenv import dotenv_values  # Import dotenv for reading variables from a .env file
+import io  # Import io to keep synthesized audio in memory
+import time  # Import time to measure time-to-first-audio
+import queue  # Import queue to hand synthesized sentences to the player
+import threading  # Import threading to synthesize while audio is playing
+import contextvars  # Import contextvars so synthesis stays in the caller's trace
+from AnswerStream import SentenceSplitter  # Import the sentence splitter shared with the chat streams
+import Tracing  # Import tracing to time synthesis and playback
+from AudioCache import AudioCache, AudioKey  # Import the cache of synthesized speech
+from Startup import Env, Lazy  # Import the shared settings and the lazy import helper
+
+# pygame and edge_tts are heavy, so they are loaded when the first sentence is spoken
+pygame = Lazy("pygame")
+edge_tts = Lazy("edge_tts")
 
 # Load environment variables from a .env file
-env_vars = dotenv_values(".env")
+env_vars = Env()
 AssistantVoice = env_vars.get("AssistantVoice")  # Get the AssistantVoice from the environment variable
+PipelineTTS = (env_vars.get("PipelineTTS") or "True").lower() == "true"  # Whether TextToSpeech speaks sentence by sentence
+PrefetchDepth = int(env_vars.get("TTSPrefetch") or 2)  # How many sentences may be synthesized ahead of playback
+AudioCacheMB = float(env_vars.get("TTSCacheMB") or 64)  # Maximum size of the cached speech, in megabytes
+AudioPreWarm = (env_vars.get("TTSPreWarm") or "True").lower() == "true"  # Whether canned phrases are synthesized at startup
+
+# Pitch and rate of the assistant's voice
+VoicePitch = '+5Hz'
+VoiceRate = '+13%'
+
+# Speech synthesized earlier, keyed on text, voice, pitch and rate; opened on first use
+audio_cache = Lazy(lambda: AudioCache(max_bytes=int(AudioCacheMB * 1024 * 1024)))
+
+# Timings of the most recent pipelined TTS call, in seconds
+TTSStats = {"first_audio": None, "synthesis": [], "total": None}
+
+# Function to get the cache key of text spoken in the assistant's voice
+def SpeechKey(text):
+    return AudioKey(text, AssistantVoice, VoicePitch, VoiceRate)
+
+# Asynchronous function to synthesize text to mp3 audio and store it in the cache.
+async def SynthesizeAudio(text) -> bytes:
+    # Stream the audio chunks into memory, and keep them only once the whole text was synthesized
+    chunks = []
+    communicate = edge_tts.Communicate(text, AssistantVoice, pitch=VoicePitch, rate=VoiceRate)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            chunks.append(chunk["data"])
+    audio = b"".join(chunks)
+    audio_cache.Put(SpeechKey(text), audio)
+    return audio
+
+# Asynchronous function to convert text to mp3 audio, from the cache when it was spoken before.
+async def TextToAudio(text) -> bytes:
+    audio = audio_cache.Get(SpeechKey(text))
+    if audio is not None:
+        return audio
+    return await SynthesizeAudio(text)
 
 # Asynchronous function to convert text to an audio file.
 async def TextToAudioFile(text) -> None:
@@ -16,9 +63,108 @@ async def TextToAudioFile(text) -> None:
     if os.path.exists(file_path):  # Check if the file already exists
         os.remove(file_path)  # If it exists, remove it to avoid overwriting errors
 
-    # Create the communicate object to generate speech
-    communicate = edge_tts.Communicate(text, AssistantVoice, pitch='+5Hz', rate='+13%')
-    await communicate.save(r'Data\speech.mp3')  # Save the generated speech as an mp3 file
+    audio = await TextToAudio(text)
+    with open(file_path, "wb") as f:
+        f.write(audio)  # Save the generated speech as an mp3 file
+
+# Asynchronous function to convert text to mp3 audio held in memory.
+async def TextToAudioBuffer(text) -> io.BytesIO:
+    return io.BytesIO(await TextToAudio(text))
+
+# Function to split text into sentences for pipelined synthesis
+def SplitSentences(Text):
+    splitter = SentenceSplitter()
+    return splitter.Feed(str(Text)) + splitter.Flush()
+
+# Function to speak text sentence by sentence, synthesizing the next sentences while the current one plays.
+# Text may be a string or an iterable of sentences, for example the sentences of a streamed answer.
+def PipelinedTTS(Text, func=lambda r=None: True, prefetch=None):
+    sentences = SplitSentences(Text) if isinstance(Text, str) else Text
+    ready = queue.Queue(maxsize=prefetch or PrefetchDepth)  # Bounded so synthesis never runs too far ahead
+    stop = threading.Event()
+    finished = object()
+    started = time.perf_counter()
+
+    TTSStats["first_audio"] = None
+    TTSStats["synthesis"] = []
+    TTSStats["total"] = None
+
+    # Producer that synthesizes each sentence and hands the audio to the player
+    def Synthesize():
+        loop = asyncio.new_event_loop()
+        try:
+            for sentence in sentences:
+                if stop.is_set():
+                    break
+                if not sentence.strip():
+                    continue
+                begin = time.perf_counter()
+                buffer = loop.run_until_complete(TextToAudioBuffer(sentence))  # Returns at once for cached speech
+                TTSStats["synthesis"].append(time.perf_counter() - begin)
+                Tracing.Record("tts_synthesis", TTSStats["synthesis"][-1], characters=len(sentence))
+                Hand(buffer)
+        except Exception as e:
+            print(f"Error in TTS synthesis: {e}")
+        finally:
+            loop.close()
+            Hand(finished)
+
+    # Wait for room in the queue, giving up if playback was stopped
+    def Hand(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    producer = threading.Thread(target=contextvars.copy_context().run, args=(Synthesize,), daemon=True)
+    producer.start()
+
+    try:
+        # Initialize pygame mixer for audio playback
+        pygame.mixer.init()
+
+        while True:
+            buffer = ready.get()
+            if buffer is finished:
+                break
+
+            # Load the in-memory speech into pygame mixer and play it
+            pygame.mixer.music.load(buffer, "mp3")
+            pygame.mixer.music.play()
+            playing = time.perf_counter()
+            if TTSStats["first_audio"] is None:
+                TTSStats["first_audio"] = playing - started
+                Tracing.Record("tts_first_audio", TTSStats["first_audio"])
+
+            # Loop until the audio is done playing or the function stops
+            while pygame.mixer.music.get_busy():
+                if func() == False:  # Check if the external function returns false
+                    stop.set()
+                    break
+                pygame.time.Clock().tick(10)  # Limit the loop to 10 ticks per second
+            Tracing.Record("tts_playback", time.perf_counter() - playing)
+
+            if stop.is_set():
+                break
+
+        return True  # Return True if the audio played successfully
+
+    except Exception as e:  # Handle any exceptions during the process
+        print(f"Error in TTS: {e}")
+
+    finally:
+        stop.set()
+        TTSStats["total"] = time.perf_counter() - started
+        try:
+            # Call the provided function with False to signal the end of TTS
+            func(False)
+            pygame.mixer.music.stop()  # Stop the audio playback
+            pygame.mixer.quit()  # Quit the pygame mixer
+
+        except Exception as e:  # Handle any exceptions during cleanup
+            print(f"Error in finally block: {e}")
 
 # Function to manage text-to-speech (TTS) functionality
 def TTS(Text, func=lambda r=None: True):
@@ -54,41 +200,63 @@ def TTS(Text, func=lambda r=None: True):
         except Exception as e:  # Handle any exceptions during cleanup
             print(f"Error in finally block: {e}")
 
+# List of predefined responses for cases where the text is too long
+Responses = [
+    "The rest of the result has been printed to the chat screen, kindly check it out sir.",
+    "The rest of the text is now on the chat screen, sir, please check it.",
+    "You can see the rest of the text on the chat screen, sir.",
+    "The remaining part of the text is now on the chat screen, sir.",
+    "Sir, you'll find more text on the chat screen for you to see.",
+    "The rest of the answer is now on the chat screen, sir.",
+    "Sir, please look at the chat screen, the rest of the answer is there.",
+    "You'll find the complete answer on the chat screen, sir.",
+    "The next part of the text is on the chat screen, sir.",
+    "Sir, please check the chat screen for more information.",
+    "There's more text on the chat screen for you, sir.",
+    "Sir, take a look at the chat screen for additional text.",
+    "You'll find more to read on the chat screen, sir.",
+    "Sir, check the chat screen for the rest of the text.",
+    "The chat screen has the rest of the text, sir.",
+    "There's more to see on the chat screen, sir, please look.",
+    "Sir, the chat screen holds the continuation of the text.",
+    "You'll find the complete answer on the chat screen, kindly check it out sir.",
+    "Please review the chat screen for the rest of the text, sir.",
+    "Sir, look at the chat screen for the complete answer."
+]
+
+# Short acknowledgements spoken often enough to keep synthesized ahead of time
+Acknowledgements = [
+    "Okay, sir.",
+    "Sure, sir.",
+    "Done, sir.",
+    "Right away, sir.",
+    "Please wait, sir.",
+]
+
+# Function to synthesize phrases ahead of time in the background, sentence by sentence as they will be spoken
+def PreWarmAudio(phrases):
+    sentences = [sentence for phrase in phrases for sentence in SplitSentences(phrase)]
+    audio_cache.PreWarm(sentences, lambda sentence: asyncio.run(SynthesizeAudio(sentence)), SpeechKey)
+
 # Function to manage Text-To-Speech with additional responses for long text
-def TextToSpeech(Text, func=lambda r=None: True):
+# Set truncate=False to speak the whole text and pipelined=False to synthesize it in one piece.
+def TextToSpeech(Text, func=lambda r=None: True, pipelined=None, truncate=True):
+    speak = PipelinedTTS if (PipelineTTS if pipelined is None else pipelined) else TTS
     Data = str(Text).split(".")  # Split the text by periods into a list of sentences
 
-    # List of predefined responses for cases where the text is too long
-    responses = [
-        "The rest of the result has been printed to the chat screen, kindly check it out sir.",
-        "The rest of the text is now on the chat screen, sir, please check it.",
-        "You can see the rest of the text on the chat screen, sir.",
-        "The remaining part of the text is now on the chat screen, sir.",
-        "Sir, you'll find more text on the chat screen for you to see.",
-        "The rest of the answer is now on the chat screen, sir.",
-        "Sir, please look at the chat screen, the rest of the answer is there.",
-        "You'll find the complete answer on the chat screen, sir.",
-        "The next part of the text is on the chat screen, sir.",
-        "Sir, please check the chat screen for more information.",
-        "There's more text on the chat screen for you, sir.",
-        "Sir, take a look at the chat screen for additional text.",
-        "You'll find more to read on the chat screen, sir.",
-        "Sir, check the chat screen for the rest of the text.",
-        "The chat screen has the rest of the text, sir.",
-        "There's more to see on the chat screen, sir, please look.",
-        "Sir, the chat screen holds the continuation of the text.",
-        "You'll find the complete answer on the chat screen, kindly check it out sir.",
-        "Please review the chat screen for the rest of the text, sir.",
-        "Sir, look at the chat screen for the complete answer."
-    ]
-
     # If the text is very long (more than 4 sentences and 50 characters), add a response message
-    if len(Data) > 4 and len(Text) > 250:
-        TTS(" " + ".".join(Text.split(".")[0:2]) + "." + random.choice(responses), func)
+    if truncate and len(Data) > 4 and len(Text) > 250:
+        speak(" " + ".".join(Text.split(".")[0:2]) + ". " + random.choice(Responses), func)
 
     # Otherwise, just play the whole text
     else:
-        TTS(Text, func)
+        speak(Text, func)
+
+# Function to synthesize the canned phrases, plus any given ones, in the background when the assistant starts
+# Called from the startup of the assistant rather than on import, so importing this module stays cheap
+def PreWarmSpeech(phrases=()):
+    if AudioPreWarm:
+        PreWarmAudio(Responses + Acknowledgements + list(phrases))
 
 # Main execution loop
 if __name__ == "__main__":
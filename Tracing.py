@@ -0,0 +1,235 @@
+import os  # Import os for file path handling.
+import json  # Import json to write trace records.
+import time  # Import time to time the spans.
+import uuid  # Import uuid to create trace IDs.
+import bisect  # Import bisect to find histogram buckets.
+import threading  # Import threading to guard the metrics and exporters.
+import contextvars  # Import contextvars to follow the current trace through calls.
+from Startup import Env  # Import the settings from the .env file, loaded once for all modules.
+
+# Load environment variables from the .env file.
+env_vars = Env()
+
+# Whether tracing is on. When it is off every call returns immediately.
+Enabled = (env_vars.get("Tracing") or "False").lower() == "true"
+
+# Files written by the JSONL trace exporter and the Prometheus textfile exporter.
+TracePath = env_vars.get("TraceFile") or os.path.join("Data", "Traces.jsonl")
+MetricsPath = env_vars.get("MetricsFile") or os.path.join("Data", "metrics.prom")
+
+# Seconds between writes of the Prometheus textfile.
+MetricsInterval = 10
+
+# Upper bounds of the latency histogram buckets, in seconds.
+Buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Current trace and span of the running code. Threads that do not copy the
+# context fall back to the most recently started trace.
+_trace = contextvars.ContextVar("trace", default=None)
+_span = contextvars.ContextVar("span", default=None)
+_last_trace = None
+
+# Aggregated metrics: histograms by (name, labels) and counters by (name, labels).
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+_trace_file = None
+_writer = None
+
+
+# Function to turn keyword labels into a hashable, ordered key.
+def _Labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+# Function to add one observation to a histogram.
+def Observe(name, seconds, **labels):
+    if not Enabled:
+        return
+    key = (name, _Labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(Buckets), "sum": 0.0, "count": 0}
+        index = bisect.bisect_left(Buckets, seconds)
+        if index < len(Buckets):
+            histogram["buckets"][index] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+    _StartWriter()
+
+# Function to add to a counter.
+def Count(name, amount=1, **labels):
+    if not Enabled:
+        return
+    key = (name, _Labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    _StartWriter()
+
+# Function to write one trace record to the JSONL exporter.
+def _Export(record):
+    global _trace_file
+    with _lock:
+        if _trace_file is None:
+            os.makedirs(os.path.dirname(TracePath) or ".", exist_ok=True)
+            _trace_file = open(TracePath, "a", encoding="utf-8", buffering=1)
+        _trace_file.write(json.dumps(record) + "\n")
+
+# Function to start a new trace for a turn, returning its ID.
+def StartTrace(name="turn", **attributes):
+    global _last_trace
+    if not Enabled:
+        return None
+    trace_id = uuid.uuid4().hex
+    _trace.set(trace_id)
+    _span.set(None)
+    _last_trace = trace_id
+    _Export({"trace": trace_id, "event": "start", "name": name, "time": time.time(), "attributes": attributes})
+    return trace_id
+
+# Function to get the ID of the current trace.
+def CurrentTrace():
+    return _trace.get() or _last_trace
+
+
+# Span timing one stage of the current trace. On exit it is exported and its
+# duration is added to the "<name>" histogram, labelled with its status.
+class _Span:
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.id = uuid.uuid4().hex[:16]
+
+    # Function to add attributes while the span is running.
+    def Set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.trace = CurrentTrace()
+        self.parent = _span.get()
+        self.token = _span.set(self.id)
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        duration = time.perf_counter() - self.start
+        try:
+            _span.reset(self.token)
+        except ValueError:
+            pass  # Exited in another context, for example a generator finished by another thread.
+        status = "error" if error_type else self.attributes.pop("status", "ok")
+        Observe(self.name, duration, status=status)
+        _Export({"trace": self.trace, "span": self.id, "parent": self.parent, "name": self.name, "time": self.started_at,
+                 "duration": duration, "status": status, "attributes": self.attributes})
+        return False
+
+
+# Span that does nothing, used while tracing is off.
+class _NoSpan:
+
+    def Set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        return False
+
+_no_span = _NoSpan()
+
+# Function to time a stage: `with Span("search", query=query): ...`
+def Span(name, **attributes):
+    if not Enabled:
+        return _no_span
+    return _Span(name, attributes)
+
+# Function to record a stage that was timed elsewhere, such as time-to-first-token.
+def Record(name, seconds, **attributes):
+    if not Enabled:
+        return
+    Observe(name, seconds, status="ok")
+    _Export({"trace": CurrentTrace(), "span": uuid.uuid4().hex[:16], "parent": _span.get(), "name": name,
+             "time": time.time() - seconds, "duration": seconds, "status": "ok", "attributes": attributes})
+
+
+# Function to render the metrics in the Prometheus text format.
+def PrometheusText(prefix="jarvis"):
+    with _lock:
+        histograms = {key: dict(value, buckets=list(value["buckets"])) for key, value in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    if histograms:
+        lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+    for (name, labels), histogram in sorted(histograms.items()):
+        label_text = ",".join([f'stage="{name}"'] + [f'{key}="{value}"' for key, value in labels])
+        cumulative = 0
+        for bound, count in zip(Buckets, histogram["buckets"]):
+            cumulative += count
+            lines.append(f'{prefix}_stage_seconds_bucket{{{label_text},le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}_stage_seconds_bucket{{{label_text},le="+Inf"}} {histogram["count"]}')
+        lines.append(f"{prefix}_stage_seconds_sum{{{label_text}}} {histogram['sum']}")
+        lines.append(f"{prefix}_stage_seconds_count{{{label_text}}} {histogram['count']}")
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for (counter, labels), value in sorted(counters.items()):
+            if counter == name:
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                lines.append(f"{prefix}_{name}_total{{{label_text}}} {value}")
+    return "\n".join(lines) + "\n"
+
+# Function to write the Prometheus textfile, replacing it in one step so scrapers never see half a file.
+def WriteMetrics(path=None):
+    path = path or MetricsPath
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(PrometheusText())
+    os.replace(path + ".tmp", path)
+
+# Function to start the thread that writes the Prometheus textfile every MetricsInterval seconds.
+def _StartWriter():
+    global _writer
+    if _writer is not None:
+        return
+    with _lock:
+        if _writer is not None:
+            return
+
+        def Loop():
+            while True:
+                time.sleep(MetricsInterval)
+                try:
+                    WriteMetrics()
+                except OSError as e:
+                    print(f"Error writing metrics: {e}")
+
+        _writer = threading.Thread(target=Loop, daemon=True)
+        _writer.start()
+
+# Function to turn tracing on or off at run time.
+def Enable(enabled=True):
+    global Enabled
+    Enabled = enabled
+
+
+# Entry point to measure the cost of a span with tracing off and on.
+if __name__ == "__main__":
+    rounds = 200000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        pass
+    empty = time.perf_counter() - start
+    for enabled in (False, True):
+        Enable(enabled)
+        TracePath = os.path.join("Data", "TracingOverhead.jsonl")
+        start = time.perf_counter()
+        for _ in range(rounds if not enabled else rounds // 20):
+            with Span("overhead"):
+                pass
+        spent = (time.perf_counter() - start - (empty if not enabled else empty / 20)) / (rounds if not enabled else rounds // 20)
+        print(f"tracing {'on ' if enabled else 'off'}: {spent * 1e9:.0f} ns per span")
+    os.remove(TracePath)
@@ -0,0 +1,218 @@
+import os  # Import os for file path handling.
+import re  # Import re to split text into words.
+import time  # Import time for LRU bookkeeping.
+import queue  # Import queue to collect utterances waiting for translation.
+import sqlite3  # Import sqlite3 for a persistent translation cache.
+import threading  # Import threading for the batching worker.
+import unicodedata  # Import unicodedata to find the script of each letter.
+from concurrent.futures import Future, TimeoutError as FutureTimeout  # Import Future to wait for a batch result.
+from Startup import Env  # Import the settings from the .env file, loaded once for all modules.
+
+# Load environment variables from the .env file.
+env_vars = Env()
+
+# Database file holding the cached translations.
+TranslationCachePath = os.path.join("Data", "TranslationCache.sqlite")
+
+# Default maximum number of cached translations.
+DefaultMaxEntries = 5000
+
+# Seconds to wait for the translation service before passing the original text through.
+TranslateTimeout = float(env_vars.get("TranslateTimeout") or 3)
+
+# Seconds the worker waits for more utterances before sending a batch, and the largest batch.
+BatchWindow = 0.05
+MaxBatch = 16
+
+# Scripts that identify a language on their own, by the start of their Unicode character names.
+ScriptLanguages = {
+    "DEVANAGARI": "hi", "BENGALI": "bn", "GURMUKHI": "pa", "GUJARATI": "gu", "ORIYA": "or", "TAMIL": "ta",
+    "TELUGU": "te", "KANNADA": "kn", "MALAYALAM": "ml", "ARABIC": "ar", "HEBREW": "he", "CYRILLIC": "ru",
+    "GREEK": "el", "THAI": "th", "HANGUL": "ko", "HIRAGANA": "ja", "KATAKANA": "ja", "CJK": "zh",
+}
+
+# Common English words, including the command words the assistant is usually given.
+EnglishWords = set("""
+a about after all also am an and any are as at be been but by can could did do does for from get give go had has
+have he her him his how i if in is it its just let like make me my no not now of off on one or our out please
+she so some tell than that the their them then there these they this to up us was we were what when where which
+who why will with would you your yes hello hi thanks thank okay ok open close play search google youtube generate
+image images write content reminder remind system volume mute unmute song music video news weather time today
+date who's what's it's i'm don't can't
+""".split())
+
+# Share of English words above which Latin-script text is taken to be English.
+EnglishShare = 0.5
+
+# Function to find the language of the script most letters of a text are written in.
+# Returns "latin" for text in the Latin alphabet and None when there are no letters.
+def DetectScript(text):
+    counts = {}
+    for char in text:
+        if not char.isalpha():
+            continue
+        name = unicodedata.name(char, "")
+        script = "latin" if name.startswith("LATIN") else next(
+            (language for prefix, language in ScriptLanguages.items() if name.startswith(prefix)), "other")
+        counts[script] = counts.get(script, 0) + 1
+    return max(counts, key=counts.get) if counts else None
+
+# Function to guess the language of a text locally: a language code, "en", or None when unsure.
+def DetectLanguage(text):
+    script = DetectScript(text)
+    if script != "latin":
+        return None if script == "other" else script
+    # Accented letters, as in Spanish or French, mean the text is not English.
+    if any(ord(char) > 127 for char in text if char.isalpha()):
+        return None
+    words = re.findall(r"[a-z']+", text.lower())
+    if not words:
+        return None
+    english = sum(word in EnglishWords for word in words)
+    return "en" if english / len(words) >= EnglishShare else None
+
+# Function to check whether a text is already English and needs no translation.
+def IsEnglish(text):
+    return DetectScript(text) is None or DetectLanguage(text) == "en"
+
+# Default backend that translates a list of texts to English with mtranslate in one request.
+def MTranslateBackend(texts):
+    import mtranslate as mt  # Imported here so the cache works without the library.
+    translated = mt.translate("\n".join(texts), "en", "auto").split("\n")
+    if len(translated) != len(texts):
+        # The service merged or split lines, so translate one by one instead.
+        translated = [mt.translate(text, "en", "auto") for text in texts]
+    return translated
+
+
+# Translator with local language detection, a persistent LRU cache, batching
+# of queued utterances and a timeout that passes the original text through.
+#
+# Utterances that are already English never reach the network. The others wait
+# at most `timeout` seconds; a late translation still completes in the
+# background and lands in the cache for the next time.
+class Translator:
+
+    def __init__(self, backend=MTranslateBackend, path=TranslationCachePath, max_entries=DefaultMaxEntries, timeout=TranslateTimeout):
+        self.backend = backend
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.inflight = {}
+        self.worker = None
+        self.stats = {"english": 0, "hits": 0, "misses": 0, "batches": 0, "timeouts": 0, "errors": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS translations (source TEXT PRIMARY KEY, english TEXT NOT NULL, last_used REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+
+    # Function to look up a cached translation, returning None on a miss.
+    def _Get(self, source):
+        with self.lock:
+            row = self.db.execute("SELECT english FROM translations WHERE source = ?", (source,)).fetchone()
+            if row is not None:
+                self.db.execute("UPDATE translations SET last_used = ? WHERE source = ?", (time.time(), source))
+        return row[0] if row else None
+
+    # Function to store translations and evict the least recently used ones.
+    def _Put(self, pairs):
+        now = time.time()
+        with self.lock:
+            self.db.executemany("INSERT OR REPLACE INTO translations (source, english, last_used) VALUES (?, ?, ?)",
+                                [(source, english, now) for source, english in pairs])
+            count = self.db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if count > self.max_entries:
+                self.db.execute("DELETE FROM translations WHERE source IN (SELECT source FROM translations ORDER BY last_used LIMIT ?)",
+                                (count - self.max_entries,))
+
+    # Function to queue a text for the batching worker, joining a request for the same text.
+    def _Submit(self, source):
+        with self.lock:
+            future = self.inflight.get(source)
+            if future is None:
+                future = Future()
+                self.inflight[source] = future
+                self.pending.put(source)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._Work, daemon=True)
+                self.worker.start()
+        return future
+
+    # Function run by the worker: send queued texts in batches and resolve their futures.
+    # The worker marks itself stopped on the way out, so the next submit starts a new one.
+    def _Work(self):
+        try:
+            while True:
+                batch = [self.pending.get()]
+                deadline = time.monotonic() + BatchWindow
+                while len(batch) < MaxBatch:
+                    try:
+                        batch.append(self.pending.get(timeout=max(deadline - time.monotonic(), 0)))
+                    except queue.Empty:
+                        break
+                self._Batch(batch)
+        finally:
+            with self.lock:
+                self.worker = None
+
+    # Function to translate one batch and resolve its futures, whatever the backend returns.
+    def _Batch(self, batch):
+        self.stats["batches"] += 1
+        results, error = {}, None
+        try:
+            translated = list(self.backend(batch))
+            results = {source: english for source, english in zip(batch, translated) if isinstance(english, str)}
+            if len(results) < len(batch):
+                # Texts the backend left out are passed through untranslated and not cached.
+                self.stats["errors"] += 1
+            self._Put(results.items())
+        except Exception as e:
+            self.stats["errors"] += 1
+            error = e
+
+        with self.lock:
+            futures = [(source, self.inflight.pop(source, None)) for source in batch]
+        for source, future in futures:
+            if future is None or future.done():
+                continue
+            if error is None:
+                future.set_result(results.get(source, source))
+            else:
+                future.set_exception(error)
+
+    # Function to translate a text to English, returning the original text if that is not possible in time.
+    def Translate(self, text):
+        source = text.strip()
+        if not source or IsEnglish(source):
+            self.stats["english"] += 1
+            return text
+
+        cached = self._Get(source)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        self.stats["misses"] += 1
+        try:
+            return self._Submit(source).result(timeout=self.timeout)
+        except FutureTimeout:
+            self.stats["timeouts"] += 1
+        except Exception as e:
+            print(f"Error translating text: {e}")
+        return text
+
+    # Function to remove every cached translation.
+    def Clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM translations")
+
+    # Function to report how often translation was skipped, cached, batched or timed out.
+    def Report(self):
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        total = self.stats["english"] + self.stats["hits"] + self.stats["misses"]
+        return dict(self.stats, entries=entries,
+                    off_critical_path=(self.stats["english"] + self.stats["hits"]) / total if total else 0.0)
@@ -0,0 +1,64 @@
+import re  # Import re to split text into words.
+import zlib  # Import zlib for a fast, stable hash of features.
+from Startup import Lazy  # Import the lazy import helper.
+
+# numpy is loaded on the first fit or transform.
+np = Lazy("numpy")
+
+# Pattern matching lowercase words, keeping apostrophes inside words.
+WordPattern = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Function to split text into lowercase words.
+def Tokenize(text):
+    return WordPattern.findall(str(text).lower())
+
+# Function to turn text into features: words, word pairs and character trigrams.
+def Features(text):
+    words = Tokenize(text)
+    features = [f"w:{w}" for w in words]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f" {w} "
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return features
+
+
+# TF-IDF vectorizer using the hashing trick, so no vocabulary has to be stored.
+# Vectors are L2 normalized, the dot product of two vectors is their cosine similarity.
+class HashingVectorizer:
+
+    def __init__(self, n_features=2 ** 14):
+        self.n_features = n_features
+        self.idf = np.ones(n_features, dtype=np.float32)
+
+    # Function to map a feature to its column.
+    def _Index(self, feature):
+        return zlib.crc32(feature.encode("utf-8")) % self.n_features
+
+    # Function to build the raw term-frequency matrix.
+    def _Counts(self, texts):
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in Features(text):
+                matrix[row, self._Index(feature)] += 1.0
+        return matrix
+
+    # Function to learn inverse document frequencies from a corpus.
+    def Fit(self, texts):
+        counts = self._Counts(texts)
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    # Function to turn texts into normalized TF-IDF vectors.
+    def Transform(self, texts):
+        matrix = self._Counts(texts)
+        np.log1p(matrix, out=matrix)  # Dampen repeated features.
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    # Function to fit on a corpus and return its vectors.
+    def FitTransform(self, texts):
+        return self.Fit(texts).Transform(texts)
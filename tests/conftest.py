@@ -0,0 +1,5 @@
+import os  # Import os for file path handling.
+import sys  # Import sys to make the modules importable from the tests.
+
+# The modules live at the top of the repository.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,98 @@
+import os  # Import os for file path handling.
+import shutil  # Import shutil to copy segments when simulating a crash.
+from ChatLogStore import ChatLogStore  # Import the store under test.
+
+
+# Function to build a message with a recognizable number.
+def Message(i):
+    return {"role": "user", "content": f"message {i}"}
+
+
+def test_append_and_read(tmp_path):
+    store = ChatLogStore(str(tmp_path), segment_records=4, max_segments=0)
+    store.Append(Message(0))
+    store.Extend([Message(i) for i in range(1, 10)])
+    assert len(store) == 10
+    assert store.Count() == 10
+    assert store.Read() == [Message(i) for i in range(10)]
+    assert store.Read(3, 7) == [Message(i) for i in range(3, 7)]
+    assert store.Tail(2) == [Message(8), Message(9)]
+    assert len(store._Segments()) == 3
+
+
+def test_partial_line_is_not_read(tmp_path):
+    store = ChatLogStore(str(tmp_path), segment_records=100, max_segments=0)
+    store.Extend([Message(0), Message(1)])
+    # A write that stopped halfway: the offset is indexed but the line is incomplete.
+    data_path, index_path = store._Paths(0)
+    size = os.path.getsize(data_path)
+    with open(data_path, "ab") as f:
+        f.write(b'{"role": "user", "con')
+    with open(index_path, "ab") as f:
+        f.write(size.to_bytes(8, "little"))
+    assert store.Read() == [Message(0), Message(1)]
+
+
+def test_compact_keeps_sequence_numbers(tmp_path):
+    store = ChatLogStore(str(tmp_path), segment_records=3, max_segments=0)
+    store.Extend([Message(i) for i in range(10)])
+    store.Compact()
+    assert len(store._Segments()) == 2
+    assert store.Read() == [Message(i) for i in range(10)]
+
+    store.Compact(keep_records=4)
+    assert store.First() == 6
+    assert len(store) == 10
+    assert store.Read(6) == [Message(i) for i in range(6, 10)]
+    store.Append(Message(10))
+    assert store.Read(9) == [Message(9), Message(10)]
+
+
+def test_compaction_rolls_over_automatically(tmp_path):
+    store = ChatLogStore(str(tmp_path), segment_records=2, max_segments=2)
+    for i in range(20):
+        store.Append(Message(i))
+    assert len(store._Segments()) <= 3
+    assert store.Read() == [Message(i) for i in range(20)]
+
+
+def test_crash_after_replace_loses_nothing(tmp_path):
+    directory = tmp_path / "log"
+    store = ChatLogStore(str(directory), segment_records=3, max_segments=0)
+    store.Extend([Message(i) for i in range(10)])
+    before = tmp_path / "before"
+    shutil.copytree(directory, before)
+    store.Compact()
+    compacted = sorted(os.listdir(directory))
+
+    # Put the superseded segments back, as if the process died right after the merged segment was moved into place.
+    for name in os.listdir(before):
+        if not os.path.exists(directory / name):
+            shutil.copy(before / name, directory / name)
+    assert store.Read() == [Message(i) for i in range(10)]
+
+    # The next compaction removes what was left behind.
+    store.Compact()
+    assert sorted(os.listdir(directory)) == compacted
+    assert len(store._Segments()) == 2
+    assert store.Read() == [Message(i) for i in range(10)]
+
+
+def test_crash_before_replace_loses_nothing(tmp_path):
+    store = ChatLogStore(str(tmp_path), segment_records=3, max_segments=0)
+    store.Extend([Message(i) for i in range(10)])
+    # A merged segment that was written but never moved into place is ignored.
+    data_path, index_path = store._Paths(0)
+    shutil.copy(data_path, data_path + ".tmp")
+    shutil.copy(index_path, index_path + ".tmp")
+    assert store.Read() == [Message(i) for i in range(10)]
+    store.Compact()
+    assert store.Read() == [Message(i) for i in range(10)]
+
+
+def test_clear(tmp_path):
+    store = ChatLogStore(str(tmp_path), segment_records=3, max_segments=0)
+    store.Extend([Message(i) for i in range(5)])
+    store.Clear()
+    assert len(store) == 0
+    assert store.Read() == []
@@ -0,0 +1,78 @@
+from ChatLogStore import ChatLogStore  # Import the chat log store the window reads from.
+from ContextWindow import ContextWindow, ExtractiveSummarizer, MessageTokens, MaxNewBlocks  # Import the context window under test.
+
+
+# Summarizer whose summary names every message folded into it, in order.
+class RecordingSummarizer:
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, previous, messages):
+        self.calls += 1
+        return " ".join([previous] + [" ".join(message["content"].split()[:2]) for message in messages]).strip()
+
+
+# Function to build a context window over a fresh store.
+def Window(tmp_path, budget, summarizer):
+    store = ChatLogStore(str(tmp_path / "ChatLog"), max_segments=0)
+    window = ContextWindow(store, budget=budget, recent_messages=6, block_size=8, summarizer=summarizer,
+                           cache_path=str(tmp_path / "summaries.json"))
+    return store, window
+
+
+# Function to make one turn's worth of messages.
+def Turn(i, words=5):
+    return [{"role": "user", "content": f"question {i} " + "word " * words},
+            {"role": "assistant", "content": f"answer {i} " + "word " * words}]
+
+
+def test_prompt_fits_the_budget(tmp_path):
+    store, window = Window(tmp_path, 800, ExtractiveSummarizer)
+    system = [{"role": "system", "content": "You are a helpful assistant."}]
+    query = {"role": "user", "content": "next question"}
+    for i in range(30):
+        store.Extend(Turn(i, words=20))
+        prompt = window.Build(system, query)
+        assert sum(MessageTokens(m) for m in prompt) <= 800
+        assert prompt[0] == system[0] and prompt[-1] == query
+
+
+def test_every_message_is_kept_or_summarized(tmp_path):
+    summarizer = RecordingSummarizer()
+    store, window = Window(tmp_path, 800, summarizer)
+    query = {"role": "user", "content": "next question"}
+    for i in range(60):
+        # Some turns are too long to fit verbatim, so the recent window overflows.
+        store.Extend(Turn(i, words=300 if i % 7 == 0 else 5))
+        calls = summarizer.calls
+        prompt = window.Build([], query)
+        assert summarizer.calls - calls <= MaxNewBlocks
+
+        # The verbatim messages are the newest ones, and the summary reaches at least the oldest of them.
+        expected = [m["content"].split()[:2] for m in store.Read()]
+        verbatim = [m["content"].split()[:2] for m in prompt[:-1] if m["role"] != "system"]
+        summary = [m["content"].split(":", 1)[1].split() for m in prompt if m["role"] == "system"]
+        summarized = [words[i:i + 2] for words in summary for i in range(0, len(words), 2)]
+        start = len(expected) - len(verbatim)
+        assert verbatim == expected[start:]
+        assert summarized == expected[:len(summarized)]
+        assert len(summarized) >= start
+
+
+def test_short_history_has_no_summary(tmp_path):
+    summarizer = RecordingSummarizer()
+    store, window = Window(tmp_path, 3000, summarizer)
+    store.Extend(Turn(0) + Turn(1))
+    query = {"role": "user", "content": "next question"}
+    assert window.Build([], query) == Turn(0) + Turn(1) + [query]
+    assert summarizer.calls == 0
+
+
+def test_cold_start_is_capped(tmp_path):
+    summarizer = RecordingSummarizer()
+    store, window = Window(tmp_path, 3000, summarizer)
+    for i in range(50):
+        store.Extend(Turn(i))
+    window.Build([], {"role": "user", "content": "next question"})
+    assert summarizer.calls == MaxNewBlocks
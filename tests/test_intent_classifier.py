@@ -0,0 +1,57 @@
+import pytest  # Import pytest for fixtures and parametrized cases.
+from IntentClassifier import IntentClassifier, DefaultThreshold, InheritedConfidence  # Import the classifier under test.
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    return IntentClassifier(corpus_path=str(tmp_path / "IntentCorpus.jsonl"))
+
+
+@pytest.mark.parametrize("prompt, tasks", [
+    ("open chrome then close firefox", ["open chrome", "close firefox"]),
+    ("open chrome and how are you", ["open chrome", "general how are you"]),
+    ("open chrome, what is the weather", ["open chrome", "realtime what is the weather"]),
+    ("hey jarvis please open chrome", ["open chrome"]),
+    ("search cats on youtube", ["youtube search cats"]),
+    ("write an application for leave", ["content application for leave"]),
+    ("mute", ["system mute"]),
+    ("bye jarvis", ["exit"]),
+])
+def test_commands_are_split(classifier, prompt, tasks):
+    assert classifier.Classify(prompt)[0] == tasks
+
+
+def test_questions_joined_by_and_stay_one_query(classifier):
+    tasks, _ = classifier.Classify("how are you and what is python")
+    assert tasks == ["general how are you and what is python"]
+
+
+def test_comma_carries_the_verb_over(classifier):
+    tasks, confidence = classifier.Classify("open chrome, telegram")
+    assert tasks == ["open chrome", "open telegram"]
+    assert confidence == InheritedConfidence
+
+
+def test_unclear_segment_lowers_confidence(classifier):
+    # "and telegram" is neither a command nor a clear question, so the decision goes to the model.
+    tasks, confidence = classifier.Classify("open chrome and telegram")
+    assert tasks[0] == "open chrome"
+    assert confidence < DefaultThreshold
+
+
+@pytest.mark.parametrize("prompt, task", [
+    ("what is the time", "general what is the time"),
+    ("latest news about india", "realtime latest news about india"),
+    ("who is he", "general who is he"),
+])
+def test_confident_queries(classifier, prompt, task):
+    tasks, confidence = classifier.Classify(prompt)
+    assert tasks == [task]
+    assert confidence >= DefaultThreshold
+
+
+def test_added_examples_are_kept_once(classifier):
+    assert classifier.AddExample("Open the pod bay doors", "general")
+    assert not classifier.AddExample("open the pod bay doors", "general")
+    assert classifier.AddExample("open the pod bay doors", "realtime")
+    assert classifier.Collected() == [("open the pod bay doors", "realtime")]
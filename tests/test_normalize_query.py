@@ -0,0 +1,62 @@
+from DecisionCache import NormalizeQuery, DecisionCache  # Import the normalization and the decision cache under test.
+
+
+def test_filler_words_and_punctuation_are_dropped():
+    assert NormalizeQuery("Hey Jarvis, open Chrome please!") == "open chrome"
+    assert NormalizeQuery("open   chrome") == NormalizeQuery("OPEN CHROME.")
+    assert NormalizeQuery("what's the time") == "what's the time"
+
+
+def test_non_latin_queries_keep_their_words():
+    assert NormalizeQuery("मौसम कैसा है") == "मौसम कैसा है"
+    assert NormalizeQuery("मौसम कैसा है?") != NormalizeQuery("नमस्ते")
+    assert NormalizeQuery("Привет, мир") == "привет мир"
+
+
+def test_filler_only_queries_normalize_to_nothing():
+    assert NormalizeQuery("ok jarvis now") == ""
+    assert NormalizeQuery("?!") == ""
+
+
+def test_empty_key_is_never_cached(tmp_path):
+    cache = DecisionCache(str(tmp_path / "decisions.sqlite"))
+    cache.Put("ok jarvis now", ["general ok jarvis now"])
+    assert cache.Get("please") is None
+    assert cache.Report()["entries"] == 0
+
+
+def test_different_scripts_do_not_collide(tmp_path):
+    cache = DecisionCache(str(tmp_path / "decisions.sqlite"))
+    cache.Put("मौसम कैसा है", ["realtime मौसम कैसा है"])
+    cache.Put("नमस्ते", ["general नमस्ते"])
+    assert cache.Get("मौसम कैसा है") == ["realtime मौसम कैसा है"]
+    assert cache.Get("Jarvis, नमस्ते") == ["general नमस्ते"]
+
+
+def test_search_cache_bypasses_empty_keys(tmp_path):
+    from SearchCache import SearchCache  # Import the search cache, which shares the normalization.
+    calls = []
+
+    # Function standing in for the search backend.
+    def Backend(query, num_results=5):
+        calls.append(query)
+        return [{"title": query, "description": "", "url": ""}]
+
+    cache = SearchCache(Backend, str(tmp_path / "search.sqlite"))
+    assert cache.Search("ok jarvis") == [{"title": "ok jarvis", "description": "", "url": ""}]
+    assert cache.Search("please now") == [{"title": "please now", "description": "", "url": ""}]
+    assert calls == ["ok jarvis", "please now"]
+    assert cache.Report()["entries"] == 0
+
+    cache.Search("weather in Delhi")
+    cache.Search("Weather in delhi?")
+    assert calls[-1] == "weather in Delhi"
+    assert cache.Report()["hits"] == 1
+
+
+def test_query_ttl_sees_filler_news_words():
+    from SearchCache import QueryTTL, NewsTTL, FactTTL, DefaultTTL  # Import the TTL rules.
+    assert QueryTTL("what is happening now") == NewsTTL
+    assert QueryTTL("latest headlines") == NewsTTL
+    assert QueryTTL("jarvis who is Ada Lovelace") == FactTTL
+    assert QueryTTL("python tutorials") == DefaultTTL
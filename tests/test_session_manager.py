@@ -0,0 +1,62 @@
+import gc  # Import gc to drop closed sessions nobody holds.
+import pytest  # Import pytest for fixtures.
+from Session import SessionManager, DefaultSessionId  # Import the session table under test.
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    # The default session writes under Data, keep it inside the test folder.
+    monkeypatch.chdir(tmp_path)
+    return SessionManager(directory=str(tmp_path / "Sessions"), max_sessions=2)
+
+
+def test_least_recently_used_is_closed(manager):
+    manager.Get("a")
+    manager.Get("b")
+    manager.Get("a")
+    manager.Get("c")
+    assert list(manager.sessions) == ["a", "c"]
+    assert manager.Report() == {"opened": 3, "closed": 1, "reopened": 0, "open": 2}
+
+
+def test_single_session_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = SessionManager(directory=str(tmp_path / "Sessions"), max_sessions=1)
+    first = manager.Get("a")
+    second = manager.Get("b")
+    assert second.id == "b"
+    assert list(manager.sessions) == ["b"]
+    assert manager.Get("a") is first
+
+    # The default session is kept, but the session being opened must not be closed in its place.
+    manager.Get(DefaultSessionId)
+    assert manager.Get("c").id == "c"
+    assert list(manager.sessions) == [DefaultSessionId, "c"]
+
+
+def test_default_session_is_never_closed(manager):
+    manager.Get(DefaultSessionId)
+    manager.Get("a")
+    manager.Get("b")
+    manager.Get("c")
+    assert DefaultSessionId in manager.sessions
+    assert list(manager.sessions)[-1] == "c"
+
+
+def test_closed_session_in_use_is_reopened(manager):
+    held = manager.Get("a")
+    manager.Get("b")
+    manager.Get("c")
+    assert "a" not in manager.sessions
+    assert manager.Get("a") is held
+    assert manager.stats["reopened"] == 1
+
+
+def test_closed_session_not_in_use_is_dropped(manager):
+    manager.Get("a")
+    manager.Get("b")
+    manager.Get("c")
+    gc.collect()
+    assert "a" not in manager.closed
+    manager.Get("a")
+    assert manager.stats["opened"] == 4